@@ -0,0 +1,54 @@
+"""
+Join throughput of CrossDataset, for two datasets of file names matched by stem.
+
+    python benchmarks/cross_dataset_join.py [--count 10000000] [--missing 0.01]
+
+Key computation (one `hash_fn` call per item) and the join itself are timed separately.
+"""
+
+import os
+import time
+
+import click
+import numpy as np
+
+from dl_cm.common.data.datasets.items_dataset import (
+    CrossDataset,
+    ItemsDataset,
+    dataset_keys,
+    join_indices,
+)
+
+
+def file_stem(file_name: str) -> str:
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+@click.command()
+@click.option("--count", type=int, default=10_000_000, help="Number of items per dataset")
+@click.option("--missing", type=float, default=0.01, help="Fraction of unmatched labels")
+def main(count, missing):
+    rng = np.random.default_rng(0)
+    images = ItemsDataset(items=[f"images/{i:09d}.jpg" for i in range(count)])
+    labels_ids = rng.permutation(count)[: int(count * (1 - missing))]
+    labels = ItemsDataset(items=[f"labels/{i:09d}.png" for i in labels_ids.tolist()])
+
+    start = time.perf_counter()
+    keys = [dataset_keys(images, file_stem), dataset_keys(labels, file_stem)]
+    keys_time = time.perf_counter() - start
+    for join in ("inner", "left"):
+        start = time.perf_counter()
+        relative_indices = join_indices(keys, join)
+        join_time = time.perf_counter() - start
+        click.echo(
+            f"{join:>5} join of {count:,} items: keys {keys_time:6.2f}s, join {join_time:6.2f}s, "
+            f"{len(relative_indices):,} rows, {relative_indices.nbytes / 2**20:.0f} MiB indices"
+        )
+
+    start = time.perf_counter()
+    CrossDataset(datasets=[images, labels], hash_fns=file_stem)
+    click.echo(f"CrossDataset construction: {time.perf_counter() - start:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Construction time of FilteredItemsDataset and OrderedItemsDataset over file names.
+
+    python benchmarks/filter_order.py [--count 2000000] [--num-workers 4]
+
+Filters keep the ".png" files, orders sort by file stem. Per item functions are run
+serially, in a process pool and in a thread pool, and compared with vectorized functions
+of whole columns and with a second construction reading the keys cache.
+"""
+
+import os
+import tempfile
+import time
+
+import click
+import numpy as np
+
+from dl_cm.common.data.datasets import FilteredItemsDataset, ItemsDataset, OrderedItemsDataset
+
+
+def is_png(file_name: str) -> bool:
+    return file_name.endswith(".png")
+
+
+def are_png(file_names: np.ndarray) -> np.ndarray:
+    return np.char.endswith(file_names, ".png")
+
+
+def file_stem(file_name: str) -> str:
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+
+def files_stems(file_names: np.ndarray) -> np.ndarray:
+    return np.char.partition(np.char.rpartition(file_names, "/")[:, 2], ".")[:, 0]
+
+
+@click.command()
+@click.option("--count", type=int, default=2_000_000, help="Number of items")
+@click.option("--num-workers", type=int, default=4, help="Number of pool workers")
+def main(count, num_workers):
+    rng = np.random.default_rng(0)
+    names = [
+        f"images/{i:09d}.{'png' if i % 2 else 'jpg'}" for i in rng.permutation(count).tolist()
+    ]
+    items = ItemsDataset(items=names)
+    cache_dir = tempfile.mkdtemp()
+    runs = {
+        "serial": dict(),
+        "process pool": dict(num_workers=num_workers),
+        "thread pool": dict(num_workers=num_workers, parallel_backend="thread"),
+        "vectorized": dict(vectorized=True),
+        "cache miss": dict(vectorized=True, cache_dir=cache_dir),
+        "cache hit": dict(vectorized=True, cache_dir=cache_dir),
+    }
+    for dataset_cls, fns in (
+        (FilteredItemsDataset, (is_png, are_png)),
+        (OrderedItemsDataset, (file_stem, files_stems)),
+    ):
+        fn_name = "filter_fn" if dataset_cls is FilteredItemsDataset else "order_fn"
+        for name, kwargs in runs.items():
+            fn = fns[1] if kwargs.get("vectorized") else fns[0]
+            start = time.perf_counter()
+            dataset = dataset_cls(parent_dataset=items, **{fn_name: fn}, **kwargs)
+            elapsed = time.perf_counter() - start
+            print(f"{dataset_cls.__name__:<22}{name:<14}{elapsed:>8.2f} s  {len(dataset)} items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Decode throughput of the image decoders, per backend and per file format.
+
+    python benchmarks/image_decoding.py [--directory DIR] [--count 64] [--size 512]
+
+Without a directory, random images are written in every benchmarked format.
+"""
+
+import os
+import tempfile
+import time
+
+import click
+import numpy as np
+import PIL.Image
+
+from dl_cm.common.data.image_decoders import (
+    PILDecoder,
+    SkimageDecoder,
+    TifffileDecoder,
+    TorchvisionDecoder,
+)
+
+BACKENDS_EXTENSIONS = {
+    "skimage": (SkimageDecoder(), (".jpg", ".png", ".tif")),
+    "torchvision": (TorchvisionDecoder(), (".jpg", ".png")),
+    "pil": (PILDecoder(), (".jpg", ".png", ".tif")),
+    "pil_draft_1/4": (None, (".jpg",)),
+    "tifffile": (TifffileDecoder(), (".tif",)),
+}
+
+
+def write_synthetic_images(directory: str, count: int, size: int) -> None:
+    rng = np.random.default_rng(0)
+    # Smooth random images, closer to natural images compression ratios than noise
+    low_res = rng.integers(0, 256, (count, size // 16, size // 16, 3), dtype=np.uint8)
+    for i, c_low_res in enumerate(low_res):
+        image = PIL.Image.fromarray(c_low_res).resize((size, size), PIL.Image.BILINEAR)
+        for extension in (".jpg", ".png", ".tif"):
+            image.save(os.path.join(directory, f"{i}{extension}"))
+
+
+@click.command()
+@click.option("--directory", type=click.Path(exists=True, file_okay=False), default=None)
+@click.option("--count", type=int, default=64, help="Number of synthetic images per format")
+@click.option("--size", type=int, default=512, help="Side of synthetic images")
+def main(directory, count, size):
+    with tempfile.TemporaryDirectory() as tmp_directory:
+        if directory is None:
+            directory = tmp_directory
+            write_synthetic_images(directory, count, size)
+        files = sorted(os.path.join(directory, n) for n in os.listdir(directory))
+        for backend, (decoder, extensions) in BACKENDS_EXTENSIONS.items():
+            for extension in extensions:
+                c_files = [f for f in files if f.lower().endswith(extension)]
+                if not c_files:
+                    continue
+                if decoder is None:
+                    width, height = PIL.Image.open(c_files[0]).size
+                    decoder = PILDecoder(draft_size=(width // 4, height // 4))
+                decoder(c_files[0])  # warm up
+                start = time.perf_counter()
+                for c_file in c_files:
+                    decoder(c_file)
+                elapsed = time.perf_counter() - start
+                click.echo(f"{backend:>15} {extension:>5}: {len(c_files) / elapsed:8.1f} images/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Startup time of the DL-CM command line and package imports, each in a fresh interpreter.
+
+    python benchmarks/import_time.py [--repeats 5] [--target-ms 300]
+
+Registered third party classes (torchmetrics, segmentation_models_pytorch losses, lightning
+loggers and plugins) are imported on first lookup, so that listing the commands does not
+import them. The best of the repeats of `dl_cm --help` is checked against the target.
+"""
+
+import subprocess
+import sys
+import time
+
+import click
+
+STATEMENTS = {
+    "dl_cm --help": [sys.executable, "-m", "dl_cm", "--help"],
+    "import dl_cm": [sys.executable, "-c", "import dl_cm"],
+    "import dl_cm.common": [sys.executable, "-c", "import dl_cm.common"],
+}
+
+
+def run_time(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--repeats", type=int, default=5, help="Runs of every statement, the best is kept")
+@click.option("--target-ms", type=float, default=300, help="Target time of dl_cm --help")
+def main(repeats, target_ms):
+    best_times = {}
+    for name, command in STATEMENTS.items():
+        best_times[name] = min(run_time(command) for _ in range(repeats))
+        print(f"{name:<22}{best_times[name] * 1000:>10.0f} ms")
+    help_ms = best_times["dl_cm --help"] * 1000
+    status = "OK" if help_ms <= target_ms else "ABOVE TARGET"
+    print(f"dl_cm --help: {help_ms:.0f} ms for a {target_ms:.0f} ms target, {status}")
+
+
+if __name__ == "__main__":
+    main()
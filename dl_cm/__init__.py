@@ -39,5 +39,5 @@ def get_schema_path():
 
 DEFAULT_SCHEMA_PATH = get_schema_path()
 PREDICTION_SCHEMA_PATH = Path(DEFAULT_SCHEMA_PATH).with_name("pred_schema.yaml")
-
-from .third_party_integration import *
\ No newline at end of file
+# Compiled configs and schemas, overridden by the DL_CM_CACHE_DIR environment variable
+DEFAULT_CACHE_DIR = Path(os.environ.get("DL_CM_CACHE_DIR", Path.home() / ".cache" / "dl_cm"))
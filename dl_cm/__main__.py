@@ -0,0 +1,5 @@
+from dl_cm.scripts.cli import cli
+
+# pylint: disable=no-value-for-parameter
+if __name__ == "__main__":
+    cli(prog_name="dl_cm")
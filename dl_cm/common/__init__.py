@@ -1,3 +1,5 @@
+import functools
+
 from dl_cm import _logger as logger
 from dl_cm.utils.registery import registeredClassMixin
 
@@ -15,8 +17,12 @@ class DLCM(registeredClassMixin):
             logger.warning(f"Unused kwargs: {kwargs} in {self.__class__.__name__}")
 
     @staticmethod
+    @functools.cache
     def base_class_adapter(external_cls: type, base_cls: type) -> type:
-        """Decorator to make any external class inherit from BaseClass"""
+        """
+        Decorator to make any external class inherit from BaseClass, the wrapper class is
+        created once per (external class, base class) pair
+        """
 
         class WrappedClass(external_cls, base_cls, wrapped_name=external_cls.__name__):
             def __init__(self, *args, **kwargs):
@@ -28,5 +34,6 @@ class DLCM(registeredClassMixin):
 
 
 from . import data, learning, models, tasks, trainer
+from dl_cm import third_party_integration
 
 __all__ = ["data", "learning", "models", "tasks", "trainer"]
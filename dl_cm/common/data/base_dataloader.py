@@ -1,13 +1,46 @@
+import functools
+import math
+
+import numpy as np
 import torch
+from torch.utils.data._utils.collate import collate, default_collate_fn_map
 
 from dl_cm.common.data.samplers import SamplersFactory
-from dl_cm.common.functions import FunctionsFactory
+from dl_cm.common.functions import FUNCTIONS_REGISTERY, FunctionsFactory
 from dl_cm.utils.ppattern.factory import BaseFactory
 from dl_cm.utils.registery import Registry
+from dl_cm.utils.shared_memory import shared_memory_pickling
 
 DATALOADERS_REGISTRY = Registry("Dataloaders")
 
 
+def _collate_arrays_fn(batch, *, collate_fn_map=None):
+    shape = (len(batch), *batch[0].shape)
+    dtype = torch.from_numpy(np.empty(0, dtype=batch[0].dtype)).dtype
+    if torch.utils.data.get_worker_info() is not None:
+        # As the default collate does, stack directly in shared memory to avoid
+        # a copy when sending the batch to the main process
+        template = torch.empty(0, dtype=dtype)
+        storage = template._typed_storage()._new_shared(math.prod(shape))
+        out = template.new(storage).view(shape)
+    else:
+        out = torch.empty(shape, dtype=dtype)
+    np.stack(batch, out=out.numpy())
+    return out
+
+
+@FUNCTIONS_REGISTERY.register()
+def views_collate(batch):
+    """
+    Collate function stacking numpy arrays with `np.stack`, which copies strided views
+    (eg: flipped or rotated arrays) directly into the batch. The default collate function
+    fails on arrays of negative strides, as torch tensors do not support them.
+    """
+    return collate(
+        batch, collate_fn_map=default_collate_fn_map | {np.ndarray: _collate_arrays_fn}
+    )
+
+
 class BaseDataloader:
     param_factory_map: dict[str, BaseFactory] = {
         "sampler": SamplersFactory,
@@ -38,6 +71,7 @@ class BaseDataloader:
         return DATALOADERS_REGISTRY
 
 
+@functools.cache
 def base_dataloader_adapter(dataloader_cls: type):
     """Decorator to make any external dataloader inherit from BaseDataloader
     """
@@ -50,6 +84,12 @@ def base_dataloader_adapter(dataloader_cls: type):
             kwargs = self.instantiate_params(kwargs)
             dataloader_cls.__init__(self, **kwargs)
 
+        def _get_iterator(self):
+            # Workers started by spawn or forkserver receive the dataset large attributes
+            # through shared memory instead of pickled copies
+            with shared_memory_pickling():
+                return super()._get_iterator()
+
     return WrappedDataloader
 
 
@@ -4,10 +4,16 @@ import lightning as pl
 
 from dl_cm.common import DLCM
 from dl_cm.common.data.base_dataloader import BaseDataloader, DataloadersFactory
-from dl_cm.common.data.datasets import BaseDataset, DatasetFactory
+from dl_cm.common.data.datasets import (
+    DATASETS_REGISTERY,
+    BaseDataset,
+    DatasetFactory,
+)
 from dl_cm.common.data.datasets.augmented_dataset import AugmentedDataset
+from dl_cm.common.data.datasets.iterable_dataset import IterableSplitDataset
 from dl_cm.common.data.datasets.preprocessed_dataset import PreprocessedDataset
 from dl_cm.common.data.datasets.split_datasets import SplitDataset
+from dl_cm.common.data.transformations.batch_transformation import BatchAugmentation
 from dl_cm.common.data.transformations.general_transformation import (
     GeneralTransformation,
     GeneralTransformationFactory,
@@ -34,6 +40,8 @@ class BaseDataModule(pl.LightningDataModule, DLCM):
         dataloaders: dict[str, namedEntitySchema | BaseDataloader],
         preprocessing: Optional[dict] = None,
         augmentation: Optional[dict] = None,
+        cache: Optional[dict] = None,
+        device_preprocessing: Optional[dict] = None,
         common_dataloader_params: Optional[dict] = None,
         extra: Optional[dict] = None,
     ):
@@ -43,7 +51,7 @@ class BaseDataModule(pl.LightningDataModule, DLCM):
         self.datasets: dict[str, BaseDataset] = {}
         for c_dataset in loaded_datasets:
             # Add parts of splitDataset
-            if isinstance(c_dataset, SplitDataset):
+            if isinstance(c_dataset, (SplitDataset, IterableSplitDataset)):
                 self.datasets |= {
                     d_reference_name: c_dataset.get_dataset_by_ref_name(
                         d_reference_name
@@ -64,16 +72,38 @@ class BaseDataModule(pl.LightningDataModule, DLCM):
                     PreprocessedDataset, preprocessing_fn=preprocessing_fn
                 )
 
+        # Caching of preprocessed items (eg: CachedDataset, MemoryCachedDataset), in order
+        if cache and cache.get("apply", True):
+            for c_cache in cache.get("caches"):
+                cache_cls = DATASETS_REGISTERY.get(c_cache.get("name"))
+                for c_dataset_ref_name, c_dataset in self.datasets.items():
+                    self.datasets[c_dataset_ref_name] = c_dataset.compose(
+                        cache_cls, **c_cache.get("params", {})
+                    )
+
         # Data augmentation
+        # On device, datasets only emit augmentation ids and the task augments whole batches
+        # once transferred, before its steps and the callbacks receive them
+        self.device_augmentation: Optional[BatchAugmentation] = None
         if augmentation and augmentation.get("apply", True):
             augmentations: list[GeneralTransformation] = (
                 GeneralTransformationFactory.create(augmentation.get("augmentations"))
             )
+            on_device = augmentation.get("on_device", False)
+            if on_device:
+                self.device_augmentation = BatchAugmentation(augmentations)
             for c_dataset_ref_name, c_dataset in self.datasets.items():
                 self.datasets[c_dataset_ref_name] = c_dataset.compose(
-                    AugmentedDataset, augmentations=augmentations
+                    AugmentedDataset, augmentations=augmentations, deferred=on_device
                 )
 
+        # Batch preprocessing applied by the task on its device (eg: BatchNormalization of uint8 images)
+        self.device_preprocessing: Optional[GeneralTransformation] = None
+        if device_preprocessing and device_preprocessing.get("apply", True):
+            self.device_preprocessing = GeneralTransformationFactory.create(
+                device_preprocessing
+            )
+
         # Dataloaders
         self.dataloaders: dict[str, BaseDataloader] = {}
         for dataloader_mode, dataloader_config in dataloaders.items():
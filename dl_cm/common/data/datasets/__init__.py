@@ -1,11 +1,17 @@
+import collections.abc
 import copy
 from abc import ABC, abstractmethod
 from collections import defaultdict
 from functools import cached_property
-from typing import Generic, Type, TypeVar
+from typing import Any, Generic, Type, TypeVar
+
+import numpy as np
 
 from dl_cm.common import DLCM
 from dl_cm.common.typing import namedEntitySchema
+from dl_cm.utils.fingerprint import fingerprint
+from dl_cm.utils.indices import index_dtype
+from dl_cm.utils.shared_memory import shared_value, sharing_min_bytes
 from dl_cm.utils.ppattern.factory import BaseFactory
 from dl_cm.utils.registery import Registry
 
@@ -18,6 +24,10 @@ COMPOSITION_DATASET_CLASS = TypeVar(
 
 class BaseDataset(DLCM):
     _non_ref_datasets_counter = defaultdict(int)
+    # Attributes that do not define the dataset content, ignored by `fingerprint`
+    _fingerprint_excluded_attributes = frozenset(
+        {"_ref_name", "__orig_class__", "_shared_memory_exports"}
+    )
 
     @staticmethod
     def registry() -> Registry:
@@ -46,6 +56,77 @@ class BaseDataset(DLCM):
     def is_in_memory(self) -> bool:
         return self._is_in_memory
 
+    @property
+    def is_epoch_dependent(self) -> bool:
+        """Whether the order of the items changes with `set_epoch`."""
+        return False
+
+    def set_epoch(self, epoch: int) -> None:
+        """
+        Set the current training epoch, eg: to reshuffle items. Compositions propagate it
+        to their parent datasets.
+        """
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[Any]:
+        """
+        Retrieve a batch of items at once.
+
+        This is the batched counterpart of `__getitem__`, used by torch DataLoader
+        when automatic batching is enabled. Datasets able to fetch many items faster
+        than one at a time should override it.
+
+        Args:
+            indices (Sequence[int]): Indices of the requested items.
+
+        Returns:
+            list: Requested items, in the same order as the given indices.
+        """
+        return [self[index] for index in indices]
+
+    def __reduce_ex__(self, protocol):
+        """
+        Within a `shared_memory_pickling` context, large arrays and lists of strings
+        attributes are pickled as shared memory handles instead of copies. Shared
+        counterparts are created once per attribute value and reused by later pickles
+        (eg: workers of every epoch).
+        """
+        reduced = super().__reduce_ex__(protocol)
+        if len(reduced) < 3 or not isinstance(reduced[2], dict):
+            return reduced
+        state = {k: v for k, v in reduced[2].items() if k != "_shared_memory_exports"}
+        min_bytes = sharing_min_bytes()
+        if min_bytes is not None:
+            exports = self.__dict__.setdefault("_shared_memory_exports", {})
+            for k, v in state.items():
+                if k not in exports or exports[k][0] is not v:
+                    exports[k] = (v, shared_value(v, min_bytes))
+                state[k] = exports[k][1]
+        return (*reduced[:2], state, *reduced[3:])
+
+    def fingerprint_state(self) -> dict[str, Any]:
+        """
+        Attributes defining the dataset content, hashed by `fingerprint`.
+        """
+        return {
+            k: v
+            for k, v in vars(self).items()
+            if k not in self._fingerprint_excluded_attributes
+            and not isinstance(getattr(type(self), k, None), cached_property)
+        }
+
+    def fingerprint(self) -> str:
+        """
+        Stable fingerprint of the dataset content, used to key on-disk caches.
+
+        It is computed from the dataset class and its attributes (parent dataset, items,
+        indices, transformations, ...), so it is the same across runs for datasets built
+        from the same configuration, whatever their reference names.
+
+        Returns:
+            str: Hexadecimal digest.
+        """
+        return fingerprint(type(self), self.fingerprint_state())
+
     def compose(
         self, composition_cls: Type[COMPOSITION_DATASET_CLASS], *args, **kwargs
     ) -> COMPOSITION_DATASET_CLASS:
@@ -78,6 +159,10 @@ TOP_DATASET_CLASS = TypeVar("TOP_DATASET_CLASS", bound=BaseDataset)
 class CompositionDataset(
     BaseDataset, ABC, Generic[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
 ):
+    _fingerprint_excluded_attributes = (
+        BaseDataset._fingerprint_excluded_attributes | {"_top_index_map"}
+    )
+
     def __init__(
         self,
         parent_dataset: namedEntitySchema | COMPOSED_DATASET_CLASS,
@@ -90,6 +175,7 @@ class CompositionDataset(
         self._parent_dataset: COMPOSED_DATASET_CLASS = (
             copy.copy(parent_dataset) if copy_parent else parent_dataset
         )
+        self._top_index_map: np.ndarray | None = None
 
     @property
     def parent_dataset(self) -> COMPOSED_DATASET_CLASS:
@@ -99,6 +185,16 @@ class CompositionDataset(
     def is_in_memory(self) -> bool:
         return self.parent_dataset.is_in_memory
 
+    @property
+    def is_epoch_dependent(self) -> bool:
+        return self.parent_dataset.is_epoch_dependent
+
+    def set_epoch(self, epoch: int) -> None:
+        """Propagate the epoch to the parent datasets, and drop stale compiled index maps."""
+        self.parent_dataset.set_epoch(epoch)
+        if self.is_epoch_dependent:
+            self._top_index_map = None
+
     @abstractmethod
     def parent_index(self, index: int) -> int:
         """
@@ -112,6 +208,25 @@ class CompositionDataset(
         """
         return index
 
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        """
+        Vectorized counterpart of `parent_index`, mapping a whole batch of indices at once.
+
+        Subclasses with an array-backed index mapping should override it to avoid
+        the per-index python call.
+
+        Args:
+            indices (Sequence[int]): Indices in the current dataset.
+
+        Returns:
+            np.ndarray: Corresponding int64 indices in the parent dataset.
+        """
+        return np.fromiter(
+            (self.parent_index(index) for index in indices),
+            dtype=np.int64,
+            count=len(indices),
+        )
+
     def top_parent_index(self, index):
         """
         Recursively retrieve the index in the top-level parent dataset
@@ -123,12 +238,61 @@ class CompositionDataset(
         Returns:
             int: Corresponding index in the top-level parent dataset.
         """
-
+        if self._top_index_map is not None:
+            return self._top_index_map[index]
         if not isinstance(self.parent_dataset, CompositionDataset):
             return self.parent_index(index)
         else:
             return self.parent_dataset.top_parent_index(self.parent_index(index))
 
+    def top_parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        """
+        Vectorized counterpart of `top_parent_index`.
+
+        Uses the compiled index map when available, otherwise maps the indices
+        through every level of the chain with `parent_indices`. A compiled parent
+        map is reused, so composing on top of a compiled dataset stays cheap.
+
+        Args:
+            indices (Sequence[int]): Indices in the current dataset.
+
+        Returns:
+            np.ndarray: Corresponding int64 indices in the top-level parent dataset.
+        """
+        if self._top_index_map is not None:
+            return self._top_index_map[np.asarray(indices, dtype=np.int64)].astype(
+                np.int64, copy=False
+            )
+        parent_indices = self.parent_indices(indices)
+        if not isinstance(self.parent_dataset, CompositionDataset):
+            return parent_indices
+        return self.parent_dataset.top_parent_indices(parent_indices)
+
+    def compile_index_map(self) -> np.ndarray:
+        """
+        Collapse the composition chain into a single precomputed map to the top dataset.
+
+        Once compiled, `top_parent_index` and `top_parent_indices` become plain array
+        reads, and index only chains fetch items directly from the top dataset.
+
+        Returns:
+            np.ndarray: Map of length `len(self)` to indices of the top-level parent dataset,
+                int32 unless the top dataset exceeds the int32 range.
+        """
+        self._top_index_map = None
+        top_index_map = self.top_parent_indices(np.arange(len(self), dtype=np.int64))
+        self._top_index_map = top_index_map.astype(index_dtype(len(self.top_dataset)))
+        return self._top_index_map
+
+    @property
+    def top_index_map(self) -> np.ndarray:
+        """
+        Precomputed map to the top dataset indices, compiled on first access.
+        """
+        if self._top_index_map is None:
+            self.compile_index_map()
+        return self._top_index_map
+
     @cached_property
     def top_dataset(self) -> TOP_DATASET_CLASS:
         """
@@ -143,36 +307,108 @@ class CompositionDataset(
             return self.parent_dataset.top_dataset
 
 
-class IdentityCompositionDataset(
+class IndexCompositionDataset(
     CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
 ):
+    """
+    Composition dataset whose items are the parent items themselves, only reindexed.
+
+    Subclasses only define the index mapping (`parent_index` and `parent_indices`),
+    single and batched retrieval are forwarded to the parent dataset so that a whole
+    chain of such compositions resolves a batch with one array lookup per level.
+    When the chain up to the top dataset is only made of index compositions and its
+    index map is compiled, items are fetched from the top dataset in a single lookup.
+    """
+
+    @cached_property
+    def is_index_only_chain(self) -> bool:
+        """
+        Whether every composition up to the top dataset only reindexes its parent items.
+        """
+        if not isinstance(self.parent_dataset, CompositionDataset):
+            return True
+        return (
+            isinstance(self.parent_dataset, IndexCompositionDataset)
+            and self.parent_dataset.is_index_only_chain
+        )
+
+    def __getitem__(self, index):
+        if self._top_index_map is not None and self.is_index_only_chain:
+            return self.top_dataset[self._top_index_map[index]]
+        return self.parent_dataset[self.parent_index(index)]
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[Any]:
+        if self._top_index_map is not None and self.is_index_only_chain:
+            return self.top_dataset.__getitems__(self.top_parent_indices(indices))
+        return self.parent_dataset.__getitems__(self.parent_indices(indices))
+
+
+class IdentityCompositionDataset(
+    IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    def __len__(self):
+        return len(self.parent_dataset)
+
     def parent_index(self, index: int) -> int:
         return index
 
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64)
+
 
 from .augmented_dataset import AugmentedDataset
+from .cached_dataset import CachedDataset
 from .filtered_dataset import FilteredItemsDataset
 from .items_dataset import ItemsDataset, UniqueItemsDataset
+from .memmap_dataset import MemmapTensorDataset
+from .memory_cached_dataset import MemoryCachedDataset
 from .ordered_dataset import OrderedItemsDataset
+from .shards_dataset import ShardsDataset
 from .preprocessed_dataset import PreprocessedDataset
 from .shuffled_dataset import ShuffledDataset
 from .split_datasets import SplitDataset
 from .sub_dataset import SubDataset
+from .metadata_dataset import MetadataFilteredDataset, MetadataOrderedDataset
 from .folder_dataset import ListDirectoryDataset, FilesWithinDirectoryDataset
+from .iterable_dataset import (
+    IterableAugmentedDataset,
+    IterableBaseDataset,
+    IterableCompositionDataset,
+    IterableFilteredDataset,
+    IterablePreprocessedDataset,
+    IterableShuffledDataset,
+    IterableSplitDataset,
+    ShardedDataset,
+)
 
 __all__ = [
     "AugmentedDataset",
     "BaseDataset",
+    "CachedDataset",
     "CompositionDataset",
     "FilteredItemsDataset",
     "ItemsDataset",
+    "MemmapTensorDataset",
+    "MemoryCachedDataset",
+    "MetadataFilteredDataset",
+    "MetadataOrderedDataset",
     "OrderedItemsDataset",
     "PreprocessedDataset",
+    "ShardsDataset",
     "ShuffledDataset",
     "SplitDataset",
     "SubDataset",
     "UniqueItemsDataset",
     "IdentityCompositionDataset",
+    "IndexCompositionDataset",
     "ListDirectoryDataset",
     "FilesWithinDirectoryDataset",
+    "IterableAugmentedDataset",
+    "IterableBaseDataset",
+    "IterableCompositionDataset",
+    "IterableFilteredDataset",
+    "IterablePreprocessedDataset",
+    "IterableShuffledDataset",
+    "IterableSplitDataset",
+    "ShardedDataset",
 ]
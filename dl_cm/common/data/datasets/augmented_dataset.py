@@ -1,3 +1,7 @@
+import collections.abc
+
+import numpy as np
+
 from dl_cm.common.data.datasets import COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS
 from dl_cm.common.data.transformations import TRANSFORMATION_REGISTRY
 from dl_cm.common.data.transformations.general_transformation import (
@@ -22,15 +26,30 @@ class TransIdentity(GeneralRevrsibleTransformation):
             rwdfn=TransIdentity.identity,
         )
 
+    def strided_op(self, reverse=False) -> tuple[None, tuple]:
+        return None, ()
+
 
 class AugmentedDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
+    """
+    A composition dataset yielding every parent item once per augmentation.
+
+    If deferred, augmentations are not applied: items are emitted as (item, augmentation id)
+    pairs, for a BatchAugmentation to augment whole collated batches, eg: on device.
+    """
+
     def __init__(
-        self, augmentations: list[str | GeneralTransformation], *args, **kwargs
+        self,
+        augmentations: list[str | GeneralTransformation],
+        deferred: bool = False,
+        *args,
+        **kwargs,
     ):
         super().__init__(*args, **kwargs)
         self.augmentations: list[GeneralTransformation] = (
             GeneralTransformationFactory.create(augmentations)
         )
+        self.deferred = deferred
 
     def __len__(self):
         return len(self.parent_dataset) * len(self.augmentations)
@@ -39,10 +58,26 @@ class AugmentedDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CL
         parent_item_idx = index // (len(self.augmentations))
         return parent_item_idx
 
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64) // len(self.augmentations)
+
     def __getitem__(self, idx):
         parent_item_idx = self.parent_index(idx)
         c_augmentation_idx = idx % (len(self.augmentations))
         c_augmentation = self.augmentations[c_augmentation_idx]
 
         parent_item = self.parent_dataset[parent_item_idx]
+        if self.deferred:
+            return parent_item, c_augmentation_idx
         return c_augmentation(parent_item)
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list:
+        indices = np.asarray(indices, dtype=np.int64)
+        parent_items = self.parent_dataset.__getitems__(self.parent_indices(indices))
+        augmentations_ids = indices % len(self.augmentations)
+        if self.deferred:
+            return list(zip(parent_items, augmentations_ids.tolist()))
+        return [
+            self.augmentations[c_augmentation_idx](parent_item)
+            for c_augmentation_idx, parent_item in zip(augmentations_ids, parent_items)
+        ]
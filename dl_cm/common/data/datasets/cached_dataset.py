@@ -0,0 +1,165 @@
+import collections.abc
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+
+from dl_cm import _logger as logger
+from dl_cm.common.data.datasets import (
+    COMPOSED_DATASET_CLASS,
+    TOP_DATASET_CLASS,
+    CompositionDataset,
+    IndexCompositionDataset,
+)
+from dl_cm.common.data.datasets.augmented_dataset import AugmentedDataset
+from dl_cm.utils.fingerprint import fingerprint
+
+CACHED_ITEM_SUFFIX = ".pt"
+
+
+def _discard_batch(batch):
+    """Collate function of the warm-up loader, items only need to be written to the cache."""
+    return None
+
+
+class CachedDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
+    """
+    A composition dataset persisting the parent items on disk, so that the parent
+    pipeline (decoding, preprocessing, ...) runs once per item instead of once per epoch.
+
+    Items are stored one file per item with `torch.save` within sharded directories,
+    and read back memory-mapped: tensors of the returned items are zero-copy views
+    of the page cache shared by all DataLoader workers. The cache is filled lazily on
+    first access or explicitly with `warm_up`.
+
+    Items are keyed by their index in the top dataset, within a directory named after
+    a fingerprint of the top dataset and of the item transformations along the chain.
+    Index only compositions (subsets, shuffles, filters, ...) thus share the same cache,
+    while changing a preprocessing configuration invalidates it.
+
+    Cached items should be made of tensors, numbers, strings and containers of them.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        shard_size: int = 1000,
+        fingerprint_suffix: str = None,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        dataset = self.parent_dataset
+        while isinstance(dataset, CompositionDataset):
+            if isinstance(dataset, AugmentedDataset):
+                raise TypeError(
+                    "CachedDataset cannot be composed over an AugmentedDataset, cache items before augmenting them!"
+                )
+            dataset = dataset.parent_dataset
+        self.shard_size = shard_size
+        self.content_fingerprint = self.compute_content_fingerprint()
+        if fingerprint_suffix:
+            self.content_fingerprint = f"{self.content_fingerprint}_{fingerprint_suffix}"
+        self.cache_dir = Path(cache_dir, self.content_fingerprint)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def compute_content_fingerprint(self) -> str:
+        """
+        Fingerprint of the top dataset and of the item transformations along the chain.
+
+        Index only compositions are skipped since items are keyed by top dataset index.
+        """
+        tokens = []
+        dataset = self.parent_dataset
+        while isinstance(dataset, CompositionDataset):
+            if not isinstance(dataset, IndexCompositionDataset):
+                state = dataset.fingerprint_state()
+                state.pop("_parent_dataset")
+                tokens.append((type(dataset), state))
+            dataset = dataset.parent_dataset
+        tokens.append(dataset.fingerprint())
+        return fingerprint(*tokens)
+
+    def __len__(self):
+        return len(self.parent_dataset)
+
+    def parent_index(self, index: int) -> int:
+        return index
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64)
+
+    def item_path(self, key: int) -> Path:
+        return self.cache_dir / f"{key // self.shard_size:06d}" / f"{key}{CACHED_ITEM_SUFFIX}"
+
+    @staticmethod
+    def read_item(path: Path) -> Any:
+        return torch.load(path, mmap=True, weights_only=True)
+
+    @staticmethod
+    def write_item(path: Path, item: Any) -> None:
+        path.parent.mkdir(exist_ok=True)
+        # Write then rename, so that concurrent workers never read a partial item
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        torch.save(item, tmp_path)
+        os.replace(tmp_path, path)
+
+    def cached_keys(self) -> set[int]:
+        """Keys of all items already in the cache, listed shard by shard."""
+        keys = set()
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(CACHED_ITEM_SUFFIX):
+                    keys.add(int(entry.name[: -len(CACHED_ITEM_SUFFIX)]))
+        return keys
+
+    def __getitem__(self, index):
+        path = self.item_path(int(self.top_parent_index(index)))
+        if path.is_file():
+            return self.read_item(path)
+        item = self.parent_dataset[index]
+        self.write_item(path, item)
+        return item
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list:
+        indices = np.asarray(indices, dtype=np.int64)
+        paths = [self.item_path(key) for key in self.top_parent_indices(indices).tolist()]
+        items = [self.read_item(p) if p.is_file() else None for p in paths]
+        missing_positions = [i for i, item in enumerate(items) if item is None]
+        if missing_positions:
+            missing_items = self.parent_dataset.__getitems__(indices[missing_positions])
+            for position, item in zip(missing_positions, missing_items):
+                self.write_item(paths[position], item)
+                items[position] = item
+        return items
+
+    def warm_up(self, num_workers: int = 0, batch_size: int = 32) -> None:
+        """
+        Fill the cache with all items not cached yet.
+
+        Args:
+            num_workers (int): Number of DataLoader worker processes computing items in parallel.
+            batch_size (int): Number of items computed per worker task.
+        """
+        cached_keys = self.cached_keys()
+        missing_indices = [
+            index
+            for index, key in enumerate(self.top_parent_indices(np.arange(len(self))).tolist())
+            if key not in cached_keys
+        ]
+        if not missing_indices:
+            return
+        logger.info(f"Caching {len(missing_indices)} items of {self.reference_name} to {self.cache_dir}")
+        loader = torch.utils.data.DataLoader(
+            self,
+            batch_size=batch_size,
+            sampler=missing_indices,
+            num_workers=num_workers,
+            collate_fn=_discard_batch,
+        )
+        for _ in loader:
+            pass
@@ -1,6 +1,9 @@
 import bisect
+import collections.abc
 import itertools
 
+import numpy as np
+
 from dl_cm.common.data.datasets import BaseDataset, DatasetFactory
 from dl_cm.common.typing import namedEntitySchema
 
@@ -20,10 +23,22 @@ class CombinedDataset(BaseDataset):
     def __len__(self):
         return self.total_length
 
+    @property
+    def is_epoch_dependent(self) -> bool:
+        return any(d.is_epoch_dependent for d in self.datasets)
+
+    def set_epoch(self, epoch: int) -> None:
+        for c_dataset in self.datasets:
+            c_dataset.set_epoch(epoch)
+
     def respective_dataset_index(self, index):
         dataset_idx = bisect.bisect_right(self.cumulative_lengths, index) - 1
         return dataset_idx
 
+    def respective_datasets_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        """Vectorized counterpart of `respective_dataset_index`."""
+        return np.searchsorted(self.cumulative_lengths, indices, side="right") - 1
+
     def __getitem__(self, idx):
         if idx < 0:
             idx += len(self)
@@ -35,3 +50,22 @@ class CombinedDataset(BaseDataset):
         dataset_idx = self.respective_dataset_index(idx)
         dataset_offset = self.cumulative_lengths[dataset_idx]
         return self.datasets[dataset_idx][idx - dataset_offset]
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list:
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = np.where(indices < 0, indices + len(self), indices)
+        if len(indices) and (indices.min() < 0 or indices.max() >= self.cumulative_lengths[-1]):
+            raise IndexError("Index out of range")
+
+        datasets_ids = self.respective_datasets_indices(indices)
+        items = [None] * len(indices)
+        # Fetch each dataset's share of the batch at once, then restore the batch order
+        for dataset_idx in np.unique(datasets_ids):
+            batch_positions = np.flatnonzero(datasets_ids == dataset_idx)
+            dataset_offset = self.cumulative_lengths[dataset_idx]
+            dataset_items = self.datasets[dataset_idx].__getitems__(
+                indices[batch_positions] - dataset_offset
+            )
+            for batch_position, item in zip(batch_positions, dataset_items):
+                items[batch_position] = item
+        return items
@@ -1,32 +1,78 @@
+import collections.abc
+from pathlib import Path
 from typing import Callable
 
+import numpy as np
+
 from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
-    CompositionDataset,
+    IndexCompositionDataset,
+)
+from dl_cm.common.data.datasets.items_keys import (
+    DEFAULT_CHUNK_SIZE,
+    compute_items_keys,
+    truth_mask,
 )
 from dl_cm.common.functions import FunctionsFactory
+from dl_cm.utils.indices import CompactIndices, compact_indices, take_indices
 
 
 class FilteredItemsDataset(
-    CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+    IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
 ):
-    def __init__(self, filter_fn: str | Callable, *args, **kwargs):
+    """
+    Parent items for which a filter function is true.
+
+    The filter is evaluated by chunks of items, see `compute_items_keys`: optionally on
+    whole columns of items (`vectorized`), in a process or thread pool, and cached on
+    disk by the fingerprints of the parent dataset and of the filter.
+
+    Args:
+        filter_fn (str | Callable): Filter of an item, or of the columns of a chunk of
+            items returning a boolean mask if vectorized.
+        vectorized (bool): Evaluate the filter on the columns of chunks of items.
+        num_workers (int): Number of processes or threads evaluating the filter.
+        parallel_backend (str): "process" or "thread".
+        chunk_size (int): Number of items evaluated at once.
+        cache_dir (str | Path): Directory of the cached masks, not cached if None.
+    """
+
+    def __init__(
+        self,
+        filter_fn: str | Callable,
+        vectorized: bool = False,
+        num_workers: int = 0,
+        parallel_backend: str = "process",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        cache_dir: str | Path = None,
+        *args,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         if not self.is_in_memory:
             raise TypeError(f"Expected ItemsDataset, got {type(self.parent_dataset)}")
         filter_fn = FunctionsFactory.create(filter_fn)
-        self.filtered_items_indices = []
-
-        for idx, item in enumerate(self.parent_dataset):
-            if filter_fn(item):
-                self.filtered_items_indices.append(idx)
+        mask = truth_mask(
+            compute_items_keys(
+                self.parent_dataset,
+                filter_fn,
+                vectorized=vectorized,
+                num_workers=num_workers,
+                parallel_backend=parallel_backend,
+                chunk_size=chunk_size,
+                cache_dir=cache_dir,
+            )
+        )
+        self.filtered_items_indices: CompactIndices = compact_indices(
+            np.flatnonzero(mask), len(self.parent_dataset)
+        )
 
     def __len__(self):
         return len(self.filtered_items_indices)
 
-    def __getitem__(self, index):
-        return self.parent_dataset[self.parent_index(index)]
-
     def parent_index(self, index):
         return self.filtered_items_indices[index]
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return take_indices(self.filtered_items_indices, indices)
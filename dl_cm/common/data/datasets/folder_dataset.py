@@ -1,16 +1,43 @@
-import os, glob
+import os
+import collections.abc
 from pathlib import Path
 from typing import Callable
 
+import numpy as np
+
 from dl_cm.common.data.datasets import CompositionDataset, COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS
-from dl_cm.common.data.datasets import ItemsDataset, FilteredItemsDataset
+from dl_cm.common.data.datasets import ItemsDataset
 from dl_cm.common.functions import FunctionsFactory
+from dl_cm.utils.directory_scan import scan_directory
 
 class ListDirectoryDataset(ItemsDataset):
-    def __init__(self, directory_path: Path, *args, **kwargs):
+    """
+    Dataset of the sorted paths of the (non hidden) entries of a directory.
+
+    Entries are listed with `os.scandir`: optionally recursively (files only), with
+    `num_workers` threads listing subdirectories concurrently, keeping only files
+    ending with one of `extensions`. A `manifest_path` persists the listing, so that
+    later runs only list again the directories modified in between.
+    """
+
+    def __init__(
+        self,
+        directory_path: Path,
+        extensions: collections.abc.Iterable[str] = None,
+        recursive: bool = False,
+        num_workers: int = 1,
+        manifest_path: Path = None,
+        *args,
+        **kwargs,
+    ):
         assert os.path.isdir(directory_path), "Folder not found"
-        items_paths = glob.glob(os.path.join(directory_path, "*"))
-        #items_paths = [Path(i) for i in items_paths]
+        items_paths = scan_directory(
+            directory_path,
+            extensions=extensions,
+            recursive=recursive,
+            num_workers=num_workers,
+            manifest_path=manifest_path,
+        )
         super().__init__(items=items_paths, *args, **kwargs)
 
 class FilesWithinDirectoryDataset(
@@ -21,6 +48,9 @@ class FilesWithinDirectoryDataset(
         directory_path: Path,
         extension_loader_map: dict[str | frozenset, Callable | str], # A dict of relative file loader to every extension
         extension_key_map: dict = {}, # a dict of allowed extension and relative key in item dict
+        recursive: bool = False,
+        num_workers: int = 1,
+        manifest_path: Path = None,
         *args,
         **kwargs,
     ):
@@ -40,9 +70,12 @@ class FilesWithinDirectoryDataset(
             for c_ext in k_to_flatten:
                 self.extension_key_map[c_ext]=c_value
                 
-        parent_dataset = FilteredItemsDataset(
-            filter_fn=lambda x: Path(x).suffix.lower() in extension_loader_map.keys(),
-            parent_dataset=ListDirectoryDataset(directory_path=directory_path),
+        parent_dataset = ListDirectoryDataset(
+            directory_path=directory_path,
+            extensions=[k for k in self.extension_loader_map if isinstance(k, str)],
+            recursive=recursive,
+            num_workers=num_workers,
+            manifest_path=manifest_path,
         )
         super().__init__(parent_dataset=parent_dataset, *args, **kwargs)
 
@@ -52,8 +85,16 @@ class FilesWithinDirectoryDataset(
     def parent_index(self, index: int) -> int:
         return index
 
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64)
+
     def __getitem__(self, index):
-        item_fp = self.parent_dataset[index]
+        return self.load_item(self.parent_dataset[index])
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[dict]:
+        return [self.load_item(item_fp) for item_fp in self.parent_dataset.__getitems__(indices)]
+
+    def load_item(self, item_fp: str) -> dict:
         item_extension = Path(item_fp).suffix
         extension_relative_key = self.extension_key_map.get(item_extension, item_extension) # TODO: add test for frozenset option. Eg: (png, jpg,...) 
         extension_file_loader = self.extension_loader_map.get(item_extension)
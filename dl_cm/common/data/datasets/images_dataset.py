@@ -1,17 +1,18 @@
 import collections
-from functools import partial
+import collections.abc
+from pathlib import Path
 
+import numpy as np
 import torch
 from pydantic import DirectoryPath
-from skimage.io import imread
 
 from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
     CompositionDataset,
 )
-from dl_cm.common.data.datasets.filtered_dataset import FilteredItemsDataset
 from dl_cm.common.data.datasets.folder_dataset import ListDirectoryDataset
+from dl_cm.common.data.image_decoders import BaseImageDecoder, ImageDecodersFactory
 
 
 DEFAULT_IMAGES_EXTENSIONS = tuple([".tif", ".jpeg", ".png", "jpg"])
@@ -26,17 +27,24 @@ class ImagesWithinDirectoryDataset(
         directory_path: DirectoryPath,
         image_extensions: collections.abc.Iterable[str] = DEFAULT_IMAGES_EXTENSIONS,
         image_key: str = IMAGE_KEY,  # used as key for image tensor within getitem dict
+        decoder: str | dict | BaseImageDecoder = None,  # defaults to per extension decoders
+        image_dtype: str = "float32",  # None keeps the decoded dtype, eg: to convert whole batches
+        recursive: bool = False,
+        num_workers: int = 1,
+        manifest_path: Path = None,
         *args,
         **kwargs,
     ):
         self.image_key = image_key
+        self.decoder: BaseImageDecoder = ImageDecodersFactory.create(decoder)
+        self.image_dtype = getattr(torch, image_dtype) if image_dtype else None
 
-        parent_dataset = FilteredItemsDataset(
-            filter_fn=partial(
-                ImagesWithinDirectoryDataset.is_image_fp,
-                image_extensions=image_extensions,
-            ),
-            parent_dataset=ListDirectoryDataset(directory_path=directory_path),
+        parent_dataset = ListDirectoryDataset(
+            directory_path=directory_path,
+            extensions=image_extensions,
+            recursive=recursive,
+            num_workers=num_workers,
+            manifest_path=manifest_path,
         )
         super().__init__(parent_dataset=parent_dataset, *args, **kwargs)
 
@@ -53,19 +61,25 @@ class ImagesWithinDirectoryDataset(
     def parent_index(self, index: int) -> int:
         return index
 
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64)
+
     @staticmethod
-    def read_image(fp):
-        loaded_tensor = torch.from_numpy(imread(fp))
-        if len(loaded_tensor.shape) == 2:
-            # if 2D image, add band dimension as last dimension
-            loaded_tensor = loaded_tensor.unsqueeze(-1)
+    def read_image(fp: str, decoder: BaseImageDecoder = None) -> torch.Tensor:
+        """Decode an image into a [C, H, W] tensor, with the per extension decoders by default."""
+        if decoder is None:
+            decoder = ImageDecodersFactory.create(None)
+        return decoder(fp)
 
-        permutation_index = [i for i in range(2, len(loaded_tensor.shape))] + [0, 1]
-        # Apply the permutation to the tensor
-        reshaped_tensor = loaded_tensor.permute(*permutation_index)
-        return reshaped_tensor
+    def load_item(self, item_fp: str) -> dict:
+        image = self.read_image(item_fp, self.decoder)
+        if self.image_dtype is not None:
+            image = image.to(self.image_dtype)
+        item = {"id": item_fp, self.image_key: image}
+        return item
 
     def __getitem__(self, index):
-        item_fp = self.parent_dataset[index]
-        item = {"id": item_fp, self.image_key: self.read_image(item_fp).float()}
-        return item
+        return self.load_item(self.parent_dataset[index])
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[dict]:
+        return [self.load_item(item_fp) for item_fp in self.parent_dataset.__getitems__(indices)]
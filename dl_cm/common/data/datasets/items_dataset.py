@@ -3,6 +3,8 @@ import collections.abc
 import numbers
 from typing import Any, Callable
 
+import numpy as np
+
 from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
@@ -36,6 +38,10 @@ class ItemsDataset(BaseDataset):
     def __getitem__(self, index: int | slice) -> Any | list[Any]:
         return self._items_list[index]
 
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[Any]:
+        items_list = self._items_list
+        return [items_list[index] for index in indices]
+
 
 class UniqueItemsDataset(SubDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
     """
@@ -81,50 +87,129 @@ class UniqueItemsDataset(SubDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
         return self._index_map[self.hash_fn(item)]
 
 
+JOIN_TYPES = ("inner", "left")
+
+
+def dataset_keys(
+    dataset: BaseDataset, key_fn: Callable, batch_size: int = 4096
+) -> np.ndarray:
+    """
+    Keys of all the items of a dataset, computed once per item.
+
+    Returns:
+        np.ndarray: Keys, of object dtype unless they are all numbers or all strings.
+    """
+    keys = []
+    for start in range(0, len(dataset), batch_size):
+        indices = range(start, min(start + batch_size, len(dataset)))
+        keys.extend(key_fn(item) for item in dataset.__getitems__(indices))
+    keys_types = set(map(type, keys))
+    if len(keys_types) == 1 and issubclass(keys_types.pop(), (str, numbers.Number)):
+        # Keys of a single plain type are joined by sorting
+        return np.asarray(keys)
+    keys_array = np.empty(len(keys), dtype=object)
+    keys_array[:] = keys
+    return keys_array
+
+
+def first_occurrences(keys: np.ndarray) -> np.ndarray:
+    """Increasing positions of the first occurrence of every distinct key."""
+    if keys.dtype == object:
+        first_positions = {}
+        for position, key in enumerate(keys.tolist()):
+            first_positions.setdefault(key, position)
+        return np.fromiter(first_positions.values(), dtype=np.int64, count=len(first_positions))
+    return np.sort(np.unique(keys, return_index=True)[1]).astype(np.int64)
+
+
+def lookup_keys(keys: np.ndarray, searched_keys: np.ndarray) -> np.ndarray:
+    """
+    Position in `keys` of the first occurrence of every searched key, -1 if missing.
+
+    Numbers and strings keys are looked up by sorting, other keys with a hash table.
+    """
+    if keys.dtype == object or searched_keys.dtype == object:
+        first_positions = {}
+        for position, key in enumerate(keys.tolist()):
+            first_positions.setdefault(key, position)
+        return np.fromiter(
+            (first_positions.get(key, -1) for key in searched_keys.tolist()),
+            dtype=np.int64,
+            count=len(searched_keys),
+        )
+    if not len(keys):
+        return np.full(len(searched_keys), -1, dtype=np.int64)
+    unique_keys, first_positions = np.unique(keys, return_index=True)
+    sorted_positions = np.searchsorted(unique_keys, searched_keys).clip(max=len(unique_keys) - 1)
+    found = unique_keys[sorted_positions] == searched_keys
+    return np.where(found, first_positions[sorted_positions], -1)
+
+
+def join_indices(keys: list[np.ndarray], join: str = "inner") -> np.ndarray:
+    """
+    Join the items of several datasets on their keys.
+
+    Every distinct key of the first dataset, at its first item, is matched with the first
+    item of the same key of every other dataset: datasets are deduplicated on their keys.
+    An inner join keeps keys matched in all datasets, a left join keeps all distinct keys
+    of the first dataset, missing matches being -1.
+
+    Returns:
+        np.ndarray: int32 (int64 for larger datasets) [N, len(keys)] indices of joined items.
+    """
+    if join not in JOIN_TYPES:
+        raise ValueError(f"Unknown join {join}, expected one of {JOIN_TYPES}")
+    first_positions = first_occurrences(keys[0])
+    columns = [first_positions]
+    columns += [lookup_keys(c_keys, keys[0][first_positions]) for c_keys in keys[1:]]
+    joined_indices = np.stack(columns, axis=1)
+    if join == "inner":
+        joined_indices = joined_indices[(joined_indices >= 0).all(axis=1)]
+    index_dtype = np.int32 if max(map(len, keys)) <= np.iinfo(np.int32).max else np.int64
+    return joined_indices.astype(index_dtype)
+
+
 class CrossDataset(BaseDataset):
     """
     A dataset class that combines multiple datasets into a single cross-referenced dataset.
 
-    This class ensures that all datasets are fully loaded and that each item can be cross-referenced
-    across all provided datasets. It is useful for scenarios where you need to ensure that items
-    from different datasets correspond to each other based on a specified hash function.
+    Items of the datasets are joined on their keys, computed once per item by the hash functions.
+    It is useful for scenarios where you need to ensure that items from different datasets
+    correspond to each other, eg: images and their labels of the same file name.
+    Datasets are deduplicated on their keys: if several items of a dataset share a key, the
+    first one is joined, and lengths checks compare the numbers of distinct keys.
 
     Attributes:
-        datasets: A list of UniqueItemsDataset instances created from the provided datasets.
-        relative_indices: A list of tuples containing the indices of each item across all datasets.
+        datasets: The joined datasets.
+        relative_indices: int32 [N, len(datasets)] array of the indices of joined items,
+            -1 for items missing from a left join.
     """
 
     def __init__(
         self,
         datasets: list[namedEntitySchema] | list[ItemsDataset],
         hash_fns: OneOrMany[str | Callable],
-        strict_length: bool = False,  # if true, all datasets must have the same length
+        strict_length: bool = False,  # if true, all datasets must have the same number of keys
         strict_minimum_length: bool = False,  # if true, cross-dataset length must be at least the length of the shortest dataset
+        join: str = "inner",  # "left" keeps all items of the first dataset
         *args,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
-        aux_datasets: list[ItemsDataset] = DatasetFactory.create(datasets)
+        self.datasets: list[BaseDataset] = DatasetFactory.create(datasets)
         hash_fns = FunctionsFactory.create(hash_fns)
         if isinstance(hash_fns, Callable):
-            hash_fns = [hash_fns] * len(aux_datasets)
-        elif len(hash_fns) != len(aux_datasets):
+            hash_fns = [hash_fns] * len(self.datasets)
+        elif len(hash_fns) != len(self.datasets):
             raise RuntimeError("Hash functions must have the same length as datasets!")
-        self.datasets: list[UniqueItemsDataset] = []
-        for dataset_idx, c_dataset in enumerate(aux_datasets):
-            self.datasets.append(
-                UniqueItemsDataset(c_dataset, hash_fn=hash_fns[dataset_idx])
-            )
-        if strict_length and len(set(map(len, self.datasets))) != 1:
+        keys = [dataset_keys(d, hash_fn) for d, hash_fn in zip(self.datasets, hash_fns)]
+        # Lengths of the deduplicated datasets
+        unique_lengths = [len(first_occurrences(c_keys)) for c_keys in keys]
+        if strict_length and len(set(unique_lengths)) != 1:
             raise RuntimeError("Datasets must have the same length")
-        self.relative_indices: list[tuple[int]] = []
-        for item in self.datasets[0]:
-            requested_indices = tuple(d.index(item) for d in self.datasets if item in d)
-            if len(requested_indices) == len(self.datasets):
-                self.relative_indices.append(requested_indices)
-        if strict_minimum_length and len(self.relative_indices) < min(
-            map(len, self.datasets)
-        ):
+        self.join = join
+        self.relative_indices: np.ndarray = join_indices(keys, join)
+        if strict_minimum_length and len(self.relative_indices) < min(unique_lengths):
             raise RuntimeError(
                 "Cross-dataset length must be at least the length of the shortest dataset"
             )
@@ -134,18 +219,21 @@ class CrossDataset(BaseDataset):
 
     def __getitem__(self, index: int | slice) -> dict[str, Any] | dict[str, list[Any]]:
         if isinstance(index, numbers.Integral):
-            cross_dataset_indices: tuple[int] | list[tuple[int]] = (
-                self.relative_indices[index]
-            )
-            respective_datasets_items = [
-                d[cross_dataset_indices[i]] for i, d in enumerate(self.datasets)
-            ]
-            return respective_datasets_items
+            return self.__getitems__([index])[0]
         elif isinstance(index, slice):
-            sub_indices = range(
-                index.start, index.stop, index.step if index.step else 1
-            )
-            loaded_slice = [self.__getitem__(i) for i in sub_indices]
-            return loaded_slice
+            return self.__getitems__(range(len(self))[index])
         else:
             raise OutOfTypesException(index, (numbers.Integral, slice))
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[list[Any]]:
+        cross_dataset_indices = self.relative_indices[np.asarray(indices, dtype=np.int64)]
+        respective_datasets_items = []
+        for c_indices, d in zip(cross_dataset_indices.T, self.datasets):
+            found = c_indices >= 0
+            c_items = [None] * len(c_indices)
+            for position, item in zip(
+                np.flatnonzero(found).tolist(), d.__getitems__(c_indices[found].tolist())
+            ):
+                c_items[position] = item
+            respective_datasets_items.append(c_items)
+        return [list(c_items) for c_items in zip(*respective_datasets_items)]
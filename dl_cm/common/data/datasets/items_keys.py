@@ -0,0 +1,183 @@
+"""
+Evaluation of a function over all the items of a dataset, eg: filter masks or sort keys.
+
+Items are fetched by chunks through `__getitems__`, and the function is called either on
+every item, or once per chunk on the columns of its items (`vectorized`):
+
+* a numpy array of the chunk items, eg: an array of strings for a list of file names,
+* a dict of numpy arrays for dict items, one array per key, eg: memmap columns.
+
+Chunks are evaluated concurrently in a process pool (CPU bound functions) or a thread
+pool (I/O bound items, eg: decoded images) when `num_workers` > 1. Process workers
+receive the dataset once, through shared memory for its large attributes.
+
+Results can be cached on disk, keyed by the fingerprints of the dataset and of the
+function, so that views over millions of items are built once across runs.
+"""
+
+import collections.abc
+import concurrent.futures
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import torch
+
+from dl_cm import _logger as logger
+from dl_cm.common.data.datasets import BaseDataset
+from dl_cm.utils.fingerprint import fingerprint
+from dl_cm.utils.shared_memory import shared_memory_pickling
+
+PARALLEL_BACKENDS = ("process", "thread")
+DEFAULT_CHUNK_SIZE = 2**14
+ITEMS_KEYS_CACHE_FOLDER = "items_keys"
+
+# Dataset and function of the current process pool worker
+_worker_state: dict[str, Any] = {}
+
+
+def _column(values: list) -> np.ndarray:
+    if values and isinstance(values[0], torch.Tensor):
+        return torch.stack(values).cpu().numpy()
+    return np.asarray(values)
+
+
+def items_columns(items: list) -> np.ndarray | dict[str, np.ndarray]:
+    """Columns of a chunk of items, passed to vectorized functions."""
+    if items and isinstance(items[0], collections.abc.Mapping):
+        return {key: _column([item[key] for item in items]) for key in items[0]}
+    return _column(items)
+
+
+def values_array(values: list) -> np.ndarray:
+    """1D array of values, an object array for tuples or ragged values."""
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = None
+    if array is None or array.ndim != 1:
+        array = np.fromiter(values, dtype=object, count=len(values))
+    return array
+
+
+def _evaluate_chunk(
+    dataset: BaseDataset, fn: Callable, vectorized: bool, start: int, stop: int
+) -> np.ndarray:
+    items = dataset.__getitems__(range(start, stop))
+    if not vectorized:
+        return values_array([fn(item) for item in items])
+    values = fn(items_columns(items))
+    values = values.cpu().numpy() if isinstance(values, torch.Tensor) else np.asarray(values)
+    if values.shape != (stop - start,):
+        raise ValueError(
+            f"Vectorized function returned values of shape {values.shape} for {stop - start} items"
+        )
+    return values
+
+
+def _init_worker(dataset: BaseDataset, fn: Callable, vectorized: bool) -> None:
+    _worker_state.update(dataset=dataset, fn=fn, vectorized=vectorized)
+
+
+def _evaluate_worker_chunk(start: int, stop: int) -> np.ndarray:
+    return _evaluate_chunk(
+        _worker_state["dataset"], _worker_state["fn"], _worker_state["vectorized"], start, stop
+    )
+
+
+def _evaluate(
+    dataset: BaseDataset,
+    fn: Callable,
+    vectorized: bool,
+    num_workers: int,
+    parallel_backend: str,
+    chunk_size: int,
+) -> np.ndarray:
+    starts = list(range(0, len(dataset), chunk_size))
+    stops = [min(start + chunk_size, len(dataset)) for start in starts]
+    if num_workers <= 1 or len(starts) <= 1:
+        chunks = [_evaluate_chunk(dataset, fn, vectorized, *r) for r in zip(starts, stops)]
+    elif parallel_backend == "thread":
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+            chunks = list(
+                executor.map(
+                    lambda start, stop: _evaluate_chunk(dataset, fn, vectorized, start, stop),
+                    starts,
+                    stops,
+                )
+            )
+    else:
+        # Workers started by spawn or forkserver receive the large attributes of the
+        # dataset through shared memory
+        with shared_memory_pickling(), concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_worker,
+            initargs=(dataset, fn, vectorized),
+        ) as executor:
+            chunks = list(executor.map(_evaluate_worker_chunk, starts, stops))
+    if not chunks:
+        return np.empty(0)
+    return np.concatenate(chunks)
+
+
+def compute_items_keys(
+    dataset: BaseDataset,
+    fn: Callable,
+    vectorized: bool = False,
+    num_workers: int = 0,
+    parallel_backend: str = "process",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache_dir: str | Path = None,
+) -> np.ndarray:
+    """
+    Values of a function over all the items of a dataset.
+
+    Args:
+        dataset (BaseDataset): Dataset whose items are evaluated.
+        fn (Callable): Function of an item, or of the columns of a chunk of items.
+        vectorized (bool): Call fn once per chunk on the columns of its items, see
+            `items_columns`, it must return one value per item.
+        num_workers (int): Number of processes or threads evaluating chunks concurrently.
+        parallel_backend (str): "process" or "thread".
+        chunk_size (int): Number of items fetched and evaluated at once.
+        cache_dir (str | Path): Directory of the cached values, not cached if None.
+
+    Returns:
+        np.ndarray: 1D array of the values of the items, an object array for tuples.
+    """
+    if parallel_backend not in PARALLEL_BACKENDS:
+        raise ValueError(
+            f"Unknown parallel backend {parallel_backend}, expected one of {PARALLEL_BACKENDS}"
+        )
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size should be positive, got {chunk_size}")
+    if cache_dir is None:
+        return _evaluate(dataset, fn, vectorized, num_workers, parallel_backend, chunk_size)
+
+    cache_path = Path(
+        cache_dir, ITEMS_KEYS_CACHE_FOLDER, f"{fingerprint(dataset, fn, vectorized)}.npy"
+    )
+    try:
+        values = np.load(cache_path, allow_pickle=True)
+        if values.shape == (len(dataset),):
+            return values
+    except (OSError, ValueError, EOFError):
+        pass
+    values = _evaluate(dataset, fn, vectorized, num_workers, parallel_backend, chunk_size)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # np.save appends the .npy suffix to the temporary file name
+        tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, values, allow_pickle=True)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not cache the items keys to {cache_path}: {e}")
+    return values
+
+
+def truth_mask(values: np.ndarray) -> np.ndarray:
+    """Boolean mask of the truth values of values (eg: results of a filter)."""
+    if values.dtype.kind in "biuf":
+        return values.astype(bool)
+    return np.fromiter(map(bool, values), dtype=bool, count=len(values))
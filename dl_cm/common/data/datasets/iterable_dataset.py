@@ -0,0 +1,354 @@
+"""
+Streaming datasets, for datasets too large to be listed or indexed up front (eg: shards).
+
+Streaming datasets are torch `IterableDataset`s: items are only iterated, never indexed,
+so no index map is ever materialized. Sources split their shards across distributed ranks
+and DataLoader workers, so that every item is read once per epoch by a single worker.
+Compositions (filter, preprocess, augment, shuffle buffer, split) wrap a parent stream,
+and composing a streaming dataset with a map-style composition class (eg: from the
+datamodule preprocessing or augmentation sections) selects its streaming counterpart.
+
+Shards and shuffle buffers are reshuffled from the epoch set with `set_epoch`, eg: by
+`DatasetsEpochCallback`. The epoch does not reach persistent DataLoader workers.
+"""
+
+import copy
+import glob
+import itertools
+import zlib
+from abc import abstractmethod
+from functools import cached_property
+from typing import Any, Callable, Generic, Iterator, Type
+
+import numpy as np
+import torch
+
+from dl_cm.common.data.datasets import (
+    COMPOSED_DATASET_CLASS,
+    COMPOSITION_DATASET_CLASS,
+    TOP_DATASET_CLASS,
+    BaseDataset,
+    DatasetFactory,
+)
+from dl_cm.common.data.datasets.augmented_dataset import AugmentedDataset
+from dl_cm.common.data.datasets.filtered_dataset import FilteredItemsDataset
+from dl_cm.common.data.datasets.preprocessed_dataset import PreprocessedDataset
+from dl_cm.common.data.datasets.shuffled_dataset import ShuffledDataset
+from dl_cm.common.data.transformations.general_transformation import (
+    GeneralTransformation,
+    GeneralTransformationFactory,
+)
+from dl_cm.common.functions import FunctionsFactory
+from dl_cm.common.typing import namedEntitySchema
+from dl_cm.utils.fingerprint import fingerprint
+
+
+def stream_position() -> tuple[int, int]:
+    """
+    Position of the current process among all the processes iterating a stream, ie: over
+    distributed ranks and their DataLoader workers, and the number of such processes.
+    """
+    rank, world_size = 0, 1
+    if torch.distributed.is_available() and torch.distributed.is_initialized():
+        rank, world_size = torch.distributed.get_rank(), torch.distributed.get_world_size()
+    worker_info = torch.utils.data.get_worker_info()
+    if worker_info is None:
+        return rank, world_size
+    return rank * worker_info.num_workers + worker_info.id, world_size * worker_info.num_workers
+
+
+class IterableBaseDataset(BaseDataset, torch.utils.data.IterableDataset):
+    _fingerprint_excluded_attributes = BaseDataset._fingerprint_excluded_attributes | {
+        "epoch"
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.epoch = 0
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[Any]:
+        pass
+
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch seeding shards and shuffle buffers order, propagated to parents."""
+        self.epoch = epoch
+
+    def compose(
+        self, composition_cls: Type[COMPOSITION_DATASET_CLASS], *args, **kwargs
+    ) -> COMPOSITION_DATASET_CLASS:
+        """Compose a new streaming dataset, map-style compositions are replaced by their
+        streaming counterparts (eg: PreprocessedDataset by IterablePreprocessedDataset)."""
+        composition_cls = STREAMING_COUNTERPARTS.get(composition_cls, composition_cls)
+        if not issubclass(composition_cls, IterableCompositionDataset):
+            raise TypeError(f"{composition_cls.__name__} can not compose streaming datasets")
+        return super().compose(composition_cls, *args, **kwargs)
+
+
+class IterableCompositionDataset(
+    IterableBaseDataset, Generic[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    def __init__(
+        self,
+        parent_dataset: namedEntitySchema | COMPOSED_DATASET_CLASS,
+        copy_parent: bool = False,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        parent_dataset: COMPOSED_DATASET_CLASS = DatasetFactory.create(parent_dataset)
+        if not isinstance(parent_dataset, IterableBaseDataset):
+            raise TypeError(f"Expected a streaming dataset, got {type(parent_dataset)}")
+        self._parent_dataset: COMPOSED_DATASET_CLASS = (
+            copy.copy(parent_dataset) if copy_parent else parent_dataset
+        )
+
+    @property
+    def parent_dataset(self) -> COMPOSED_DATASET_CLASS:
+        return self._parent_dataset
+
+    def set_epoch(self, epoch: int) -> None:
+        super().set_epoch(epoch)
+        self.parent_dataset.set_epoch(epoch)
+
+    @cached_property
+    def top_dataset(self) -> TOP_DATASET_CLASS:
+        if not isinstance(self.parent_dataset, IterableCompositionDataset):
+            return self.parent_dataset
+        return self.parent_dataset.top_dataset
+
+
+class ShardedDataset(IterableBaseDataset):
+    """
+    Stream of the items of a list of shards (eg: files of a sharded dataset).
+
+    Shards are assigned round-robin to every (rank, worker) process. If there are fewer
+    shards than processes, processes sharing a shard read it strided item-wise.
+    Ranks may thus yield different numbers of items, uneven shards should be
+    compensated for (eg: with a limited number of steps per epoch).
+
+    Args:
+        shards (str | Iterable[str]): Shards, or a glob pattern of shard files.
+        read_shard_fn (str | Callable): Function returning an iterable of the items of a shard.
+        shuffle_shards (bool): Shuffle the shards order every epoch.
+        seed (int): Seed of shards shuffling, combined with the epoch.
+    """
+
+    def __init__(
+        self,
+        shards: str | list[str],
+        read_shard_fn: str | Callable[[Any], Any],
+        shuffle_shards: bool = False,
+        seed: int = 0,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if isinstance(shards, str):
+            shards = sorted(glob.glob(shards, recursive=True))
+        self.shards = list(shards)
+        if not self.shards:
+            raise ValueError("No shards to stream")
+        self.read_shard_fn = FunctionsFactory.create(read_shard_fn)
+        self.shuffle_shards = shuffle_shards
+        self.seed = seed
+
+    def epoch_shards(self) -> list:
+        """Shards in their order of the current epoch, the same for all processes."""
+        if not self.shuffle_shards:
+            return self.shards
+        order = np.random.default_rng([self.seed, self.epoch]).permutation(len(self.shards))
+        return [self.shards[i] for i in order]
+
+    def __iter__(self) -> Iterator[Any]:
+        position, processes_count = stream_position()
+        shards = self.epoch_shards()
+        if len(shards) >= processes_count:
+            for shard in shards[position::processes_count]:
+                yield from self.read_shard_fn(shard)
+            return
+        # Processes sharing a shard read every `sharing_count` item, with their own offset
+        shard_index = position % len(shards)
+        sharing_count = len(range(shard_index, processes_count, len(shards)))
+        yield from itertools.islice(
+            self.read_shard_fn(shards[shard_index]), position // len(shards), None, sharing_count
+        )
+
+
+class IterableFilteredDataset(
+    IterableCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    def __init__(self, filter_fn: str | Callable, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.filter_fn = FunctionsFactory.create(filter_fn)
+
+    def __iter__(self) -> Iterator[Any]:
+        return filter(self.filter_fn, self.parent_dataset)
+
+
+class IterablePreprocessedDataset(
+    IterableCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    def __init__(self, preprocessing_fn: str | Callable = "id", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preprocessing_callable = GeneralTransformationFactory.create(preprocessing_fn)
+
+    def __iter__(self) -> Iterator[Any]:
+        return map(self.preprocessing_callable, self.parent_dataset)
+
+
+class IterableAugmentedDataset(
+    IterableCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    """
+    Streaming counterpart of AugmentedDataset, yielding every parent item once per augmentation.
+    """
+
+    def __init__(
+        self,
+        augmentations: list[str | GeneralTransformation],
+        deferred: bool = False,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.augmentations: list[GeneralTransformation] = (
+            GeneralTransformationFactory.create(augmentations)
+        )
+        self.deferred = deferred
+
+    def __iter__(self) -> Iterator[Any]:
+        for parent_item in self.parent_dataset:
+            for c_augmentation_idx, c_augmentation in enumerate(self.augmentations):
+                if self.deferred:
+                    yield parent_item, c_augmentation_idx
+                else:
+                    yield c_augmentation(parent_item)
+
+
+class IterableShuffledDataset(
+    IterableCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    """
+    Approximate shuffling of a stream with a buffer: every item is swapped with a random
+    item of the buffer, which is yielded instead.
+
+    Args:
+        buffer_size (int): Number of buffered items, the larger the better mixed.
+        seed (int): Seed of the buffer, combined with the epoch and the process position.
+    """
+
+    def __init__(self, buffer_size: int = 1000, seed: int = 0, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffer_size = buffer_size
+        self.seed = seed
+
+    def __iter__(self) -> Iterator[Any]:
+        position, _ = stream_position()
+        rng = np.random.default_rng([self.seed, self.epoch, position])
+        buffer = []
+        for item in self.parent_dataset:
+            if len(buffer) < self.buffer_size:
+                buffer.append(item)
+                continue
+            swapped_index = rng.integers(self.buffer_size)
+            yield buffer[swapped_index]
+            buffer[swapped_index] = item
+        rng.shuffle(buffer)
+        yield from buffer
+
+
+class IterableSplitDataset(
+    IterableCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    """
+    Streaming counterpart of SplitDataset. Every item is assigned to a split from a
+    stable hash of its key, so that splits do not depend on the items order nor on
+    the number of processes. Every split streams the whole parent stream.
+
+    Args:
+        reference_names (Iterable[str]): Reference names of the splits.
+        split_ratios (Iterable[float]): Expected fraction of items of every split.
+        key_fn (str | Callable): Key of an item, hashed to assign it to a split.
+            By default the fingerprint of the item itself.
+        seed (int): Seed of the hash.
+    """
+
+    def __init__(
+        self,
+        reference_names: list[str],
+        split_ratios: list[float],
+        key_fn: str | Callable = None,
+        seed: int = 0,
+        *args,
+        **kwargs,
+    ):
+        self.reference_names = reference_names
+        self.split_ratios = split_ratios
+        if len(self.reference_names) != len(self.split_ratios):
+            raise ValueError(
+                "Parameters 'reference_names' and 'split_ratios' should have the same length!"
+            )
+        if sum(split_ratios) > 1:
+            raise ValueError("The sum of the split ratios must not exceed 1.")
+        super().__init__(*args, **kwargs)
+        key_fn = FunctionsFactory.create(key_fn) if key_fn is not None else fingerprint
+        bounds = np.cumsum([0.0, *split_ratios])
+        self._ref_datasets_map = {
+            ref_name: IterableSplitPartDataset(
+                parent_dataset=self.parent_dataset,
+                lower_bound=lower_bound,
+                upper_bound=upper_bound,
+                key_fn=key_fn,
+                seed=seed,
+                reference_name=ref_name,
+            )
+            for ref_name, lower_bound, upper_bound in zip(
+                self.reference_names, bounds[:-1], bounds[1:]
+            )
+        }
+
+    def get_dataset_by_ref_name(self, ref_name: str) -> IterableBaseDataset:
+        return self._ref_datasets_map.get(ref_name)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.parent_dataset)
+
+
+class IterableSplitPartDataset(
+    IterableCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    """Items of a parent stream whose hashed key falls within [lower_bound, upper_bound)."""
+
+    def __init__(
+        self,
+        lower_bound: float,
+        upper_bound: float,
+        key_fn: str | Callable,
+        seed: int = 0,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.lower_bound = float(lower_bound)
+        self.upper_bound = float(upper_bound)
+        self.key_fn = FunctionsFactory.create(key_fn)
+        self.seed = seed
+
+    def item_fraction(self, item) -> float:
+        """Stable pseudo random number in [0, 1) of an item."""
+        return zlib.crc32(f"{self.seed}:{self.key_fn(item)}".encode()) / 2**32
+
+    def __iter__(self) -> Iterator[Any]:
+        for item in self.parent_dataset:
+            if self.lower_bound <= self.item_fraction(item) < self.upper_bound:
+                yield item
+
+
+# Streaming counterpart of map-style compositions, selected by IterableBaseDataset.compose
+STREAMING_COUNTERPARTS: dict[type, type[IterableCompositionDataset]] = {
+    AugmentedDataset: IterableAugmentedDataset,
+    FilteredItemsDataset: IterableFilteredDataset,
+    PreprocessedDataset: IterablePreprocessedDataset,
+    ShuffledDataset: IterableShuffledDataset,
+}
@@ -0,0 +1,294 @@
+"""
+Columnar memory-mapped storage of fixed shape samples.
+
+Every leaf of the (nested dict) sample structure is stored as a column: a raw binary
+file holding the leaf of all samples contiguously, memory-mapped when reading. A small
+JSON header describes the dtype and shape of every column:
+
+    directory/
+        header.json
+        inputs.image.bin     [items, *shape] array of the "inputs" -> "image" leaves
+        targets.label.bin
+        id.offsets.bin       [items + 1] int64 boundaries of the "id" strings
+        id.data.bin          utf-8 bytes of the "id" strings, concatenated
+        ...
+
+Items read from memory-mapped columns are zero-copy views of the page cache, which is
+shared by all processes reading the dataset (eg: DataLoader workers) instead of every
+worker decoding and preprocessing files. Tensors, arrays and numbers are stored in
+columns, strings in pairs of offsets and bytes columns (the `StringsArray` layout).
+"""
+
+import collections.abc
+import json
+import numbers
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import torch
+
+from dl_cm.common.data.datasets import BaseDataset
+from dl_cm.utils.shared_memory import StringsArray
+
+HEADER_FILE = "header.json"
+COLUMN_SUFFIX = ".bin"
+KEYS_SEPARATOR = "."
+
+
+def _flatten_item(item, prefix: tuple = ()) -> dict[tuple, Any]:
+    if isinstance(item, collections.abc.Mapping):
+        leaves = {}
+        for k, v in item.items():
+            if not isinstance(k, str) or KEYS_SEPARATOR in k:
+                raise ValueError(f"Keys of stored items must be strings without dots: {k!r}")
+            leaves |= _flatten_item(v, (*prefix, k))
+        return leaves
+    return {prefix: item}
+
+
+def _unflatten_item(leaves: dict[tuple, Any]):
+    if () in leaves:
+        return leaves[()]
+    item = {}
+    for key_path, value in leaves.items():
+        container = item
+        for key in key_path[:-1]:
+            container = container.setdefault(key, {})
+        container[key_path[-1]] = value
+    return item
+
+
+def _leaf_array(leaf) -> np.ndarray:
+    if isinstance(leaf, torch.Tensor):
+        return leaf.detach().cpu().numpy()
+    return np.asarray(leaf)
+
+
+def _column_name(key_path: tuple) -> str:
+    return KEYS_SEPARATOR.join(key_path) or "item"
+
+
+def _leaf_kind(leaf) -> str:
+    if isinstance(leaf, torch.Tensor):
+        return "tensor"
+    if isinstance(leaf, numbers.Number):
+        return "number"
+    return "array"
+
+
+def column_path(directory: str | Path, name: str) -> Path:
+    return Path(directory, f"{name}{COLUMN_SUFFIX}")
+
+
+def strings_paths(directory: str | Path, name: str) -> tuple[Path, Path]:
+    """Paths of the offsets and bytes columns of a string leaf."""
+    return column_path(directory, f"{name}.offsets"), column_path(directory, f"{name}.data")
+
+
+def create_memmap_columns(item, directory: str | Path, length: int) -> dict:
+    """
+    Allocate the column files of `length` items shaped as the given one.
+
+    Returns:
+        dict: Header of the columns, string columns being written by `write_memmap_strings`.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    header = {"length": length, "columns": {}, "strings": []}
+    for key_path, leaf in _flatten_item(item).items():
+        if isinstance(leaf, str):
+            header["strings"].append(
+                {"key_path": list(key_path), "name": _column_name(key_path)}
+            )
+            continue
+        array = _leaf_array(leaf)
+        if array.dtype == object:
+            raise TypeError(f"Leaf {_column_name(key_path)} of type {type(leaf)} can not be stored")
+        name = _column_name(key_path)
+        header["columns"][name] = {
+            "key_path": list(key_path),
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "kind": _leaf_kind(leaf),
+        }
+        with open(column_path(directory, name), "wb") as column_file:
+            column_file.truncate(length * array.nbytes)
+    return header
+
+
+def fill_memmap_columns(
+    dataset: BaseDataset,
+    directory: str | Path,
+    header: dict,
+    start: int = 0,
+    stop: int = None,
+    batch_size: int = 64,
+) -> list[list[str]]:
+    """
+    Write the items of a dataset within [start, stop) into allocated columns, see
+    `create_memmap_columns`. Disjoint ranges can be written concurrently.
+
+    Returns:
+        list[list[str]]: Values of the string leaves of the written items, in header order.
+    """
+    stop = header["length"] if stop is None else stop
+    columns = {
+        tuple(column["key_path"]): np.memmap(
+            column_path(directory, name),
+            dtype=np.dtype(column["dtype"]),
+            mode="r+",
+            shape=(header["length"], *column["shape"]),
+        )
+        for name, column in header["columns"].items()
+    }
+    strings = {tuple(c_strings["key_path"]): [] for c_strings in header["strings"]}
+    for batch_start in range(start, stop, batch_size):
+        indices = list(range(batch_start, min(batch_start + batch_size, stop)))
+        for index, item in zip(indices, dataset.__getitems__(indices)):
+            leaves = _flatten_item(item)
+            if leaves.keys() != columns.keys() | strings.keys():
+                raise ValueError(f"Item {index} does not share the structure of the first item")
+            for key_path, column in columns.items():
+                column[index] = _leaf_array(leaves[key_path])
+            for key_path, values in strings.items():
+                values.append(leaves[key_path])
+    for column in columns.values():
+        column.flush()
+    return list(strings.values())
+
+
+def write_memmap_strings(
+    directory: str | Path, header: dict, strings_values: list[collections.abc.Iterable[str]]
+) -> None:
+    """Write the offsets and bytes columns of the string leaves, values in header order."""
+    for c_strings, values in zip(header["strings"], strings_values):
+        strings = StringsArray.from_strings(values)
+        if len(strings) != header["length"]:
+            raise ValueError(f"Expected {header['length']} {c_strings['name']} strings")
+        offsets_path, data_path = strings_paths(directory, c_strings["name"])
+        strings.offsets.astype(np.int64).tofile(offsets_path)
+        strings.data.tofile(data_path)
+
+
+def write_memmap_header(directory: str | Path, header: dict) -> Path:
+    """Write the header of a columns directory, last as a directory without it is incomplete."""
+    header_path = Path(directory, HEADER_FILE)
+    tmp_path = header_path.with_name(f"{HEADER_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as header_file:
+        json.dump(header, header_file)
+    os.replace(tmp_path, header_path)
+    return header_path
+
+
+def write_memmap_dataset(
+    dataset: BaseDataset, directory: str | Path, batch_size: int = 64
+) -> Path:
+    """
+    Store the items of a dataset into memory-mappable columns, see `MemmapTensorDataset`.
+
+    All items must share the structure, dtypes and shapes of the first one.
+
+    Args:
+        dataset (BaseDataset): Dataset to store.
+        directory (str | Path): Output directory, created if missing.
+        batch_size (int): Number of items fetched at once with `__getitems__`.
+
+    Returns:
+        Path: Path of the written header.
+    """
+    header = create_memmap_columns(dataset[0], directory, len(dataset))
+    strings_values = fill_memmap_columns(dataset, directory, header, batch_size=batch_size)
+    write_memmap_strings(directory, header, strings_values)
+    return write_memmap_header(directory, header)
+
+
+class MemmapTensorDataset(BaseDataset):
+    """
+    Dataset of fixed shape samples stored by `write_memmap_dataset`.
+
+    `__getitem__` and `__getitems__` return zero-copy views of memory-mapped columns.
+    Columns are mapped copy-on-write: writing into a returned tensor does not modify the
+    stored dataset, and only copies the written pages. Columns are mapped lazily in every
+    process, so that pickling the dataset (eg: to DataLoader workers) does not copy them.
+
+    Args:
+        directory (str | Path): Directory written by `write_memmap_dataset`.
+    """
+
+    _fingerprint_excluded_attributes = BaseDataset._fingerprint_excluded_attributes | {
+        "_columns",
+        "_strings",
+    }
+
+    def __init__(self, directory: str | Path, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.directory = Path(directory)
+        with open(self.directory / HEADER_FILE) as header_file:
+            self.header: dict = json.load(header_file)
+        self._columns: dict[str, np.memmap] | None = None
+        self._strings: dict[str, StringsArray] | None = None
+
+    def __len__(self):
+        return self.header["length"]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_columns"] = None
+        state["_strings"] = None
+        return state
+
+    @property
+    def columns(self) -> dict[str, np.memmap]:
+        if self._columns is None:
+            self._columns = {
+                name: np.memmap(
+                    column_path(self.directory, name),
+                    dtype=np.dtype(column["dtype"]),
+                    mode="c",
+                    shape=(len(self), *column["shape"]),
+                )
+                for name, column in self.header["columns"].items()
+            }
+        return self._columns
+
+    @property
+    def strings(self) -> dict[str, StringsArray]:
+        if self._strings is None:
+            self._strings = {}
+            for c_strings in self.header["strings"]:
+                offsets_path, data_path = strings_paths(self.directory, c_strings["name"])
+                offsets = np.memmap(offsets_path, dtype=np.int64, mode="r")
+                # Empty files can not be mapped
+                data = (
+                    np.memmap(data_path, dtype=np.uint8, mode="r")
+                    if os.path.getsize(data_path)
+                    else np.empty(0, dtype=np.uint8)
+                )
+                self._strings[c_strings["name"]] = StringsArray(offsets, data)
+        return self._strings
+
+    def _leaf(self, name: str, index: int):
+        value = self.columns[name][index]
+        kind = self.header["columns"][name]["kind"]
+        if kind == "tensor":
+            if isinstance(value, np.ndarray):
+                return torch.from_numpy(value)
+            return torch.tensor(value)
+        if kind == "number":
+            return value.item()
+        return value
+
+    def __getitem__(self, index: int) -> Any:
+        index = int(index)
+        leaves = {
+            tuple(column["key_path"]): self._leaf(name, index)
+            for name, column in self.header["columns"].items()
+        }
+        for c_strings in self.header["strings"]:
+            leaves[tuple(c_strings["key_path"])] = self.strings[c_strings["name"]][index]
+        return _unflatten_item(leaves)
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[Any]:
+        return [self[index] for index in indices]
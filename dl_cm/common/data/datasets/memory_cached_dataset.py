@@ -0,0 +1,220 @@
+import collections.abc
+import multiprocessing
+import pickle
+
+import numpy as np
+import torch
+
+from dl_cm import _logger as logger
+from dl_cm.common.data.datasets import (
+    COMPOSED_DATASET_CLASS,
+    TOP_DATASET_CLASS,
+    CompositionDataset,
+)
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class MemoryCachedDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
+    """
+    A composition dataset keeping recently used parent items in a bounded RAM cache
+    shared by all DataLoader workers.
+
+    The cache is a set-associative arena of fixed size slots allocated in shared memory
+    before workers start, so an item computed by one worker is served to all of them.
+    Items are pickled into slots. By default, slots are sized after the first parent item
+    (with `slot_headroom` for items of varying sizes), which is loaded and cached when the
+    dataset is built. Items larger than a slot are not cached: they are counted as
+    rejected, and a warning is logged once per process. When a set is full, the least
+    recently used (`lru`) or least frequently used (`lfu`) item of the set is evicted,
+    recency being tracked with a shared clock.
+
+    Hit, miss and rejection counters are shared as well and exposed through `cache_stats`.
+    """
+
+    _fingerprint_excluded_attributes = CompositionDataset._fingerprint_excluded_attributes | {
+        "_arena",
+        "_slots_keys",
+        "_slots_sizes",
+        "_slots_last_access",
+        "_slots_frequency",
+        "_clock",
+        "_stats",
+        "_locks",
+        "_oversized_warned",
+    }
+
+    def __init__(
+        self,
+        max_bytes: int,
+        slot_bytes: int = None,
+        slot_headroom: float = 1.5,
+        ways: int = 8,
+        eviction_policy: str = "lru",
+        locks_count: int = 64,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy {eviction_policy}, expected one of {EVICTION_POLICIES}"
+            )
+        self.eviction_policy = eviction_policy
+        first_item = None
+        if slot_bytes is None:
+            first_item = self.parent_dataset[0] if len(self.parent_dataset) else None
+            first_bytes = len(pickle.dumps(first_item, protocol=pickle.HIGHEST_PROTOCOL))
+            # Rounded up to cache lines
+            slot_bytes = -(-int(first_bytes * slot_headroom) // 64) * 64
+        self.slot_bytes = slot_bytes
+        slots_count = max(1, max_bytes // slot_bytes)
+        self.ways = min(ways, slots_count)
+        self.sets_count = slots_count // self.ways
+        slots_count = self.sets_count * self.ways
+
+        self._arena = torch.empty((slots_count, slot_bytes), dtype=torch.uint8).share_memory_()
+        self._slots_keys = torch.full((slots_count,), -1, dtype=torch.int64).share_memory_()
+        self._slots_sizes = torch.zeros(slots_count, dtype=torch.int64).share_memory_()
+        self._slots_last_access = torch.zeros(slots_count, dtype=torch.int64).share_memory_()
+        self._slots_frequency = torch.zeros(slots_count, dtype=torch.int64).share_memory_()
+        # Shared by all sets, hence incremented under its own lock
+        self._clock = multiprocessing.Value("q", 0)
+        # Hits, misses and rejections counted per lock, so that counters are updated under
+        # a lock
+        self._stats = torch.zeros((locks_count, 3), dtype=torch.int64).share_memory_()
+        self._locks = [multiprocessing.Lock() for _ in range(locks_count)]
+        self._oversized_warned = False
+        if first_item is not None:
+            self._store(0, first_item)
+
+    def __len__(self):
+        return len(self.parent_dataset)
+
+    def set_epoch(self, epoch: int) -> None:
+        super().set_epoch(epoch)
+        if self.is_epoch_dependent:
+            # Items are cached by index, which maps to other parent items after a reshuffle
+            self._slots_keys.fill_(-1)
+            self._slots_sizes.zero_()
+
+    def parent_index(self, index: int) -> int:
+        return index
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64)
+
+    def _set_slots(self, key: int) -> tuple[int, int]:
+        set_start = (key % self.sets_count) * self.ways
+        return set_start, set_start + self.ways
+
+    def _lock_index(self, key: int) -> int:
+        return (key % self.sets_count) % len(self._locks)
+
+    def _tick(self) -> int:
+        with self._clock.get_lock():
+            self._clock.value += 1
+            return self._clock.value
+
+    def _load(self, key: int) -> bytes | None:
+        set_start, set_end = self._set_slots(key)
+        lock_index = self._lock_index(key)
+        with self._locks[lock_index]:
+            matches = np.flatnonzero(self._slots_keys.numpy()[set_start:set_end] == key)
+            if len(matches) == 0:
+                self._stats.numpy()[lock_index, 1] += 1
+                return None
+            slot = set_start + int(matches[0])
+            payload = self._arena.numpy()[slot, : self._slots_sizes.numpy()[slot]].tobytes()
+            self._slots_last_access.numpy()[slot] = self._tick()
+            self._slots_frequency.numpy()[slot] += 1
+            self._stats.numpy()[lock_index, 0] += 1
+        return payload
+
+    def _store(self, key: int, item) -> None:
+        payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        lock_index = self._lock_index(key)
+        if len(payload) > self.slot_bytes:
+            with self._locks[lock_index]:
+                self._stats.numpy()[lock_index, 2] += 1
+            if not self._oversized_warned:
+                self._oversized_warned = True
+                logger.warning(
+                    f"Item {key} of {len(payload)} bytes exceeds the {self.slot_bytes} bytes"
+                    f" slots of {self.reference_name} and is not cached, increase slot_bytes"
+                )
+            return
+        set_start, set_end = self._set_slots(key)
+        with self._locks[lock_index]:
+            set_keys = self._slots_keys.numpy()[set_start:set_end]
+            if (set_keys == key).any():
+                # Already stored by another worker
+                return
+            empty_slots = np.flatnonzero(set_keys == -1)
+            if len(empty_slots):
+                victim = int(empty_slots[0])
+            elif self.eviction_policy == "lru":
+                victim = int(np.argmin(self._slots_last_access.numpy()[set_start:set_end]))
+            else:
+                victim = int(
+                    np.lexsort(
+                        (
+                            self._slots_last_access.numpy()[set_start:set_end],
+                            self._slots_frequency.numpy()[set_start:set_end],
+                        )
+                    )[0]
+                )
+            slot = set_start + victim
+            self._arena.numpy()[slot, : len(payload)] = np.frombuffer(payload, dtype=np.uint8)
+            self._slots_sizes.numpy()[slot] = len(payload)
+            self._slots_keys.numpy()[slot] = key
+            self._slots_last_access.numpy()[slot] = self._tick()
+            self._slots_frequency.numpy()[slot] = 1
+
+    def __getitem__(self, index):
+        key = int(index) % len(self)
+        payload = self._load(key)
+        if payload is not None:
+            return pickle.loads(payload)
+        item = self.parent_dataset[index]
+        self._store(key, item)
+        return item
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list:
+        keys = (np.asarray(indices, dtype=np.int64) % len(self)).tolist()
+        items = []
+        missing_positions = []
+        for position, key in enumerate(keys):
+            payload = self._load(key)
+            items.append(None if payload is None else pickle.loads(payload))
+            if payload is None:
+                missing_positions.append(position)
+        if missing_positions:
+            missing_items = self.parent_dataset.__getitems__(
+                [keys[position] for position in missing_positions]
+            )
+            for position, item in zip(missing_positions, missing_items):
+                self._store(keys[position], item)
+                items[position] = item
+        return items
+
+    def cache_stats(self) -> dict[str, float]:
+        """
+        Cache counters, aggregated over all processes using the cache.
+
+        Returns:
+            dict: hits, misses, hit rate, number of items rejected for exceeding a slot,
+                number of cached items and cached bytes.
+        """
+        hits, misses, rejected = self._stats.sum(dim=0).tolist()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "rejected": rejected,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "cached_items": int((self._slots_keys >= 0).sum()),
+            "cached_bytes": int(self._slots_sizes.sum()),
+        }
+
+    def reset_stats(self) -> None:
+        self._stats.zero_()
@@ -0,0 +1,102 @@
+import collections.abc
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from dl_cm.common.data.datasets import (
+    COMPOSED_DATASET_CLASS,
+    TOP_DATASET_CLASS,
+    IndexCompositionDataset,
+)
+from dl_cm.common.data.datasets.items_keys import truth_mask
+from dl_cm.common.data.datasets.metadata_index import MetadataIndex, as_metadata_index
+from dl_cm.utils.indices import CompactIndices, compact_indices, take_indices
+
+
+class MetadataFilteredDataset(
+    IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    """
+    Parent items for which an expression over a metadata index is true.
+
+    The items are not loaded: their rows are looked up by key in the index, see
+    `build_metadata_index`, and the expression is evaluated on whole columns.
+
+    Args:
+        metadata_index (str | Path | MetadataIndex): Index or sidecar directory of the index.
+        expression (str | Callable): Vectorized expression of the columns, eg:
+            "(height >= 256) & (class_3 > 0)", see `MetadataIndex.query`.
+        key_fn (Callable): Key of an item, see `item_keys`.
+    """
+
+    def __init__(
+        self,
+        metadata_index: str | Path | MetadataIndex,
+        expression: str | Callable,
+        key_fn: Callable = None,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        index = as_metadata_index(metadata_index)
+        rows = index.dataset_rows(self.parent_dataset, key_fn)
+        mask = truth_mask(index.query(expression, rows))
+        self.filtered_items_indices: CompactIndices = compact_indices(
+            np.flatnonzero(mask), len(self.parent_dataset)
+        )
+
+    def __len__(self):
+        return len(self.filtered_items_indices)
+
+    def parent_index(self, index):
+        return self.filtered_items_indices[index]
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return take_indices(self.filtered_items_indices, indices)
+
+
+class MetadataOrderedDataset(
+    IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+):
+    """
+    Parent items sorted by an expression over a metadata index, ties keep the parent order.
+
+    Args:
+        metadata_index (str | Path | MetadataIndex): Index or sidecar directory of the index.
+        expression (str | Callable): Vectorized expression of the columns giving the sort
+            key of every item, eg: "height * width", see `MetadataIndex.query`.
+        descending (bool): Sort by decreasing keys.
+        key_fn (Callable): Key of an item, see `item_keys`.
+    """
+
+    def __init__(
+        self,
+        metadata_index: str | Path | MetadataIndex,
+        expression: str | Callable,
+        descending: bool = False,
+        key_fn: Callable = None,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        index = as_metadata_index(metadata_index)
+        rows = index.dataset_rows(self.parent_dataset, key_fn)
+        keys = index.query(expression, rows)
+        if descending:
+            # Reversed twice, ties keep the parent order
+            order = len(keys) - 1 - np.argsort(keys[::-1], kind="stable")[::-1]
+        else:
+            order = np.argsort(keys, kind="stable")
+        self.reordered_items_indices: CompactIndices = compact_indices(
+            order, len(self.parent_dataset)
+        )
+
+    def __len__(self):
+        return len(self.parent_dataset)
+
+    def parent_index(self, index):
+        return self.reordered_items_indices[index]
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return take_indices(self.reordered_items_indices, indices)
@@ -0,0 +1,460 @@
+"""
+Metadata sidecar index of dataset items.
+
+Filtering or ordering items by their content (image size, class histogram, label
+presence, ...) should not load every sample on every run. A `MetadataIndex` stores
+per item statistics computed once by a statistics function over any dataset, in a
+columnar sidecar directory:
+
+* `metadata_index.json`: header (columns dtypes and shapes, statistics fingerprint)
+* `keys_offsets.npy`, `keys_data.npy`: keys identifying the items, packed strings
+* `keys_stamps.npy`: modification time and size of the keys naming files
+* `<column>.npy`: one array per statistic, memory-mapped when loaded
+
+Items are identified by keys, by default the items of the in-memory top dataset of a
+composition chain, eg: the file paths of a directory dataset, read without loading the
+items. Building the index again over a dataset only computes the statistics of the items
+whose keys are not indexed yet (eg: new files of a directory), or whose files were
+modified since. Files are replaced atomically, the header last, so that processes
+reading the previous index (eg: DataLoader workers) keep mapping its files.
+
+Columns are queried with vectorized expressions over the columns aligned on the items
+of a dataset, eg: `"(height >= 256) & (class_3 > 0)"`, or callables of the columns.
+"""
+
+import ast
+import collections.abc
+import json
+import operator
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+from dl_cm import _logger as logger
+from dl_cm.common.data.datasets import BaseDataset, CompositionDataset, SubDataset
+from dl_cm.common.data.datasets.items_keys import (
+    DEFAULT_CHUNK_SIZE,
+    compute_items_keys,
+    items_columns,
+)
+from dl_cm.utils.fingerprint import fingerprint
+from dl_cm.utils.shared_memory import StringsArray
+
+METADATA_INDEX_VERSION = 2
+METADATA_HEADER_FILE = "metadata_index.json"
+KEYS_FILES = ("keys_offsets.npy", "keys_data.npy")
+STAMPS_FILE = "keys_stamps.npy"
+
+# Operators and functions allowed in query expressions
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+_UNARY_OPERATORS = {
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+    ast.Invert: operator.invert,
+    ast.Not: np.logical_not,
+}
+_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+_BOOLEAN_OPERATORS = {ast.And: np.logical_and, ast.Or: np.logical_or}
+QUERY_FUNCTIONS = {
+    "abs": np.abs,
+    "minimum": np.minimum,
+    "maximum": np.maximum,
+    "sqrt": np.sqrt,
+    "log": np.log,
+    "exp": np.exp,
+    "where": np.where,
+}
+
+
+def item_keys(dataset: BaseDataset, key_fn: Callable = None) -> list[str]:
+    """
+    Keys identifying the items of a dataset in a metadata index.
+
+    Args:
+        dataset (BaseDataset): Dataset whose items are identified.
+        key_fn (Callable): Key of an item, the items are then loaded. By default, the keys
+            are the items of the top dataset of a composition chain (eg: file paths), or
+            the items of an in-memory dataset, read without loading the items.
+
+    Returns:
+        list[str]: Key of every item.
+    """
+    if key_fn is not None:
+        keys = compute_items_keys(dataset, key_fn).tolist()
+    elif isinstance(dataset, CompositionDataset) and dataset.top_dataset.is_in_memory:
+        keys = dataset.top_dataset.__getitems__(dataset.top_index_map)
+    elif dataset.is_in_memory:
+        keys = dataset.__getitems__(range(len(dataset)))
+    else:
+        raise ValueError(
+            f"Items of {type(dataset).__name__} can not be identified without loading them,"
+            " a key_fn is required"
+        )
+    return [str(key) for key in keys]
+
+
+def keys_stamps(keys: collections.abc.Iterable[str]) -> np.ndarray:
+    """int64 [N, 2] modification time (ns) and size of the files named by keys, -1 if none."""
+    stamps = []
+    for key in keys:
+        try:
+            stat = os.stat(key)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except (OSError, ValueError):
+            stamps.append((-1, -1))
+    return np.array(stamps, dtype=np.int64).reshape(-1, 2)
+
+
+def _evaluate_node(node: ast.AST, columns: collections.abc.Mapping):
+    if isinstance(node, ast.Expression):
+        return _evaluate_node(node.body, columns)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float)):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in columns:
+            raise NameError(f"Unknown column {node.id}, expected one of {sorted(columns)}")
+        return columns[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        return _BINARY_OPERATORS[type(node.op)](
+            _evaluate_node(node.left, columns), _evaluate_node(node.right, columns)
+        )
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+        return _UNARY_OPERATORS[type(node.op)](_evaluate_node(node.operand, columns))
+    if isinstance(node, ast.BoolOp) and type(node.op) in _BOOLEAN_OPERATORS:
+        return _BOOLEAN_OPERATORS[type(node.op)].reduce(
+            [_evaluate_node(value, columns) for value in node.values]
+        )
+    if isinstance(node, ast.Compare) and all(
+        type(op) in _COMPARE_OPERATORS for op in node.ops
+    ):
+        # Chained comparisons, eg: 64 <= height < 512
+        left = _evaluate_node(node.left, columns)
+        result = True
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate_node(comparator, columns)
+            result = np.logical_and(result, _COMPARE_OPERATORS[type(op)](left, right))
+            left = right
+        return result
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in QUERY_FUNCTIONS
+        and not node.keywords
+    ):
+        return QUERY_FUNCTIONS[node.func.id](
+            *(_evaluate_node(arg, columns) for arg in node.args)
+        )
+    if isinstance(node, ast.Subscript):
+        # Elements of array columns, eg: histogram[:, 3]
+        return _evaluate_node(node.value, columns)[_evaluate_index(node.slice, columns)]
+    raise ValueError(f"Unsupported query expression: {ast.unparse(node)}")
+
+
+def _evaluate_index(node: ast.AST, columns: collections.abc.Mapping):
+    if isinstance(node, ast.Slice):
+        return slice(
+            *(
+                None if bound is None else _evaluate_node(bound, columns)
+                for bound in (node.lower, node.upper, node.step)
+            )
+        )
+    if isinstance(node, ast.Tuple):
+        return tuple(_evaluate_index(element, columns) for element in node.elts)
+    return _evaluate_node(node, columns)
+
+
+def evaluate_query(expression: str, columns: collections.abc.Mapping) -> Any:
+    """
+    Evaluate a query expression over columns.
+
+    Expressions are parsed rather than evaluated as python code: only columns names,
+    numbers, arithmetic, bitwise, comparison and boolean operators, indexing of array
+    columns and the functions of `QUERY_FUNCTIONS` are allowed.
+    """
+    return _evaluate_node(ast.parse(expression, mode="eval"), columns)
+
+
+class _RowsColumns(collections.abc.Mapping):
+    # Columns at the given rows, gathered when accessed by an expression
+    def __init__(self, columns: dict[str, np.ndarray], rows: np.ndarray | None):
+        self.columns = columns
+        self.rows = rows
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        column = self.columns[name]
+        return np.asarray(column if self.rows is None else column[self.rows])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.columns)
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    # np.save appends the .npy suffix to the temporary file name
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class MetadataIndex:
+    """
+    Columns of per item statistics, identified by item keys.
+
+    Args:
+        keys (Sequence[str]): Key of every row.
+        columns (dict[str, np.ndarray]): Statistics columns, one row per key.
+        stats_fingerprint (str): Fingerprint of the statistics function of the columns.
+        stamps (np.ndarray): int64 [N, 2] stamps of the keys files, see `keys_stamps`.
+    """
+
+    def __init__(
+        self,
+        keys: collections.abc.Sequence[str],
+        columns: dict[str, np.ndarray],
+        stats_fingerprint: str = None,
+        stamps: np.ndarray = None,
+    ):
+        self.keys = keys
+        self.columns = columns
+        self.stats_fingerprint = stats_fingerprint
+        if stamps is None:
+            stamps = np.full((len(keys), 2), -1, dtype=np.int64)
+        self.stamps = stamps
+        for name, column in [*columns.items(), ("stamps", stamps)]:
+            if len(column) != len(keys):
+                raise ValueError(f"Column {name} has {len(column)} rows for {len(keys)} keys")
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @cached_property
+    def keys_rows(self) -> dict[str, int]:
+        """Row of every key, the first one for duplicated keys."""
+        rows = {}
+        for row, key in enumerate(self.keys):
+            rows.setdefault(key, row)
+        return rows
+
+    def rows(self, keys: collections.abc.Iterable[str]) -> np.ndarray:
+        """int64 rows of the given keys, -1 for keys missing from the index."""
+        keys_rows = self.keys_rows
+        return np.fromiter((keys_rows.get(key, -1) for key in keys), dtype=np.int64)
+
+    def dataset_rows(self, dataset: BaseDataset, key_fn: Callable = None) -> np.ndarray:
+        """Rows of the items of a dataset, see `item_keys`."""
+        rows = self.rows(item_keys(dataset, key_fn))
+        missing = int((rows < 0).sum())
+        if missing:
+            raise KeyError(
+                f"{missing} items of {dataset.reference_name} are missing from the metadata"
+                " index, update it with build_metadata_index"
+            )
+        return rows
+
+    def query(
+        self,
+        expression: str | Callable[[collections.abc.Mapping], Any],
+        rows: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Evaluate a vectorized expression over the columns.
+
+        Args:
+            expression (str | Callable): Expression of the columns, see `evaluate_query`,
+                eg: "(height >= 256) & (class_3 > 0)", or a callable of the columns mapping.
+            rows (np.ndarray): Rows the columns are taken at (eg: `dataset_rows`), all if None.
+
+        Returns:
+            np.ndarray: Value of the expression for every row.
+        """
+        columns = _RowsColumns(self.columns, rows)
+        if callable(expression):
+            values = expression(columns)
+        else:
+            values = evaluate_query(expression, columns)
+        length = len(self) if rows is None else len(rows)
+        return np.broadcast_to(np.asarray(values), (length,))
+
+    def save(self, directory: str | Path) -> None:
+        """
+        Write the index to a sidecar directory. Every file is replaced atomically and the
+        header last, files mapped by readers of the previous index are left untouched.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        keys = self.keys if isinstance(self.keys, StringsArray) else StringsArray.from_strings(
+            self.keys
+        )
+        header = {
+            "version": METADATA_INDEX_VERSION,
+            "length": len(self),
+            "stats_fingerprint": self.stats_fingerprint,
+            "columns": {},
+        }
+        for file_name, array in zip(KEYS_FILES, (keys.offsets, keys.data)):
+            _save_array(directory / file_name, array)
+        _save_array(directory / STAMPS_FILE, np.asarray(self.stamps, dtype=np.int64))
+        for name, column in self.columns.items():
+            column = np.asarray(column)
+            if column.dtype == object:
+                raise TypeError(f"Column {name} of {column.dtype} dtype can not be stored")
+            _save_array(directory / f"{name}.npy", column)
+            header["columns"][name] = {"dtype": column.dtype.str, "shape": column.shape[1:]}
+        tmp_path = directory / f"{METADATA_HEADER_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as header_file:
+            json.dump(header, header_file)
+        os.replace(tmp_path, directory / METADATA_HEADER_FILE)
+
+    @classmethod
+    def load(cls, directory: str | Path) -> "MetadataIndex":
+        """Read an index from its sidecar directory, columns are memory-mapped."""
+        directory = Path(directory)
+        with open(directory / METADATA_HEADER_FILE) as header_file:
+            header = json.load(header_file)
+        if header.get("version") != METADATA_INDEX_VERSION:
+            raise ValueError(f"Unsupported metadata index version in {directory}")
+        keys = StringsArray(*(np.load(directory / file_name) for file_name in KEYS_FILES))
+        columns = {
+            name: np.load(directory / f"{name}.npy", mmap_mode="r")
+            for name in header["columns"]
+        }
+        stamps = np.load(directory / STAMPS_FILE)
+        return cls(keys, columns, header["stats_fingerprint"], stamps)
+
+
+def as_metadata_index(metadata_index: "str | Path | MetadataIndex") -> MetadataIndex:
+    """Index of a sidecar directory, or the index itself."""
+    if isinstance(metadata_index, MetadataIndex):
+        return metadata_index
+    return MetadataIndex.load(metadata_index)
+
+
+def _stats_columns(values: np.ndarray) -> dict[str, np.ndarray]:
+    stats = values.tolist()
+    if not stats:
+        return {}
+    if not isinstance(stats[0], collections.abc.Mapping):
+        raise TypeError(f"Statistics function should return a dict, got {type(stats[0])}")
+    return items_columns(stats)
+
+
+def _load_index(index_directory: str | Path, stats_fingerprint: str) -> MetadataIndex | None:
+    if not Path(index_directory, METADATA_HEADER_FILE).exists():
+        return None
+    try:
+        index = MetadataIndex.load(index_directory)
+    except ValueError:
+        logger.info(f"Unsupported metadata index, rebuilding {index_directory} index")
+        return None
+    if index.stats_fingerprint != stats_fingerprint:
+        logger.info(f"Statistics function changed, rebuilding {index_directory} index")
+        return None
+    return index
+
+
+def build_metadata_index(
+    dataset: BaseDataset,
+    stats_fn: Callable[[Any], dict],
+    index_directory: str | Path,
+    key_fn: Callable = None,
+    num_workers: int = 0,
+    parallel_backend: str = "process",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> MetadataIndex:
+    """
+    Compute the statistics of the items of a dataset, or update an existing index.
+
+    When the directory already holds an index of the same statistics function, only the
+    items whose keys are missing from it, or whose files were modified since (see
+    `keys_stamps`), are loaded. The rows of the other keys are kept (eg: an index shared
+    by several splits of a directory).
+
+    Args:
+        dataset (BaseDataset): Dataset whose items are indexed.
+        stats_fn (Callable): Statistics of an item, as a dict of scalars or fixed shape arrays.
+        index_directory (str | Path): Sidecar directory of the index.
+        key_fn (Callable): Key of an item, see `item_keys`.
+        num_workers (int): Number of processes or threads computing statistics.
+        parallel_backend (str): "process" or "thread".
+        chunk_size (int): Number of items loaded at once.
+
+    Returns:
+        MetadataIndex: The updated index.
+    """
+    stats_fingerprint = fingerprint(stats_fn)
+    keys = item_keys(dataset, key_fn)
+    stamps = keys_stamps(keys)
+    index = _load_index(index_directory, stats_fingerprint)
+
+    rows = np.full(len(keys), -1) if index is None else index.rows(keys)
+    outdated = rows < 0
+    if index is not None:
+        indexed = np.flatnonzero(~outdated)
+        outdated[indexed] = (index.stamps[rows[indexed]] != stamps[indexed]).any(axis=1)
+    # Items sharing a key (eg: augmented items) are computed once
+    outdated_positions = {}
+    for position in np.flatnonzero(outdated).tolist():
+        outdated_positions.setdefault(keys[position], position)
+    if index is not None and not outdated_positions:
+        return index
+    logger.info(f"Computing the metadata of {len(outdated_positions)} items")
+
+    positions = np.fromiter(outdated_positions.values(), dtype=np.int64)
+    values = compute_items_keys(
+        SubDataset(dataset, indices=positions.tolist()),
+        stats_fn,
+        num_workers=num_workers,
+        parallel_backend=parallel_backend,
+        chunk_size=chunk_size,
+    )
+    new_columns = _stats_columns(values)
+    new_keys = list(outdated_positions)
+    new_stamps = stamps[positions]
+    if index is not None:
+        if set(new_columns) != set(index.columns):
+            raise ValueError(
+                f"Statistics columns {sorted(new_columns)} differ from the indexed ones"
+                f" {sorted(index.columns)}"
+            )
+        # Rows of modified files are overwritten, new keys appended
+        updated_rows = rows[positions]
+        modified = updated_rows >= 0
+        columns = {}
+        for name, column in new_columns.items():
+            columns[name] = np.array(index.columns[name])
+            columns[name][updated_rows[modified]] = column[modified]
+            columns[name] = np.concatenate([columns[name], column[~modified]])
+        new_columns = columns
+        index_stamps = np.array(index.stamps)
+        index_stamps[updated_rows[modified]] = new_stamps[modified]
+        new_stamps = np.concatenate([index_stamps, new_stamps[~modified]])
+        new_keys = [
+            *index.keys,
+            *(key for key, c_modified in zip(new_keys, modified.tolist()) if not c_modified),
+        ]
+    index = MetadataIndex(new_keys, new_columns, stats_fingerprint, new_stamps)
+    index.save(index_directory)
+    return MetadataIndex.load(index_directory)
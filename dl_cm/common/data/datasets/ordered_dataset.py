@@ -1,29 +1,70 @@
+import collections.abc
+from pathlib import Path
 from typing import Callable
 
+import numpy as np
+
 from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
-    CompositionDataset,
+    IndexCompositionDataset,
 )
+from dl_cm.common.data.datasets.items_keys import DEFAULT_CHUNK_SIZE, compute_items_keys
 from dl_cm.common.functions import FunctionsFactory
+from dl_cm.utils.indices import CompactIndices, compact_indices, take_indices
 
 
 class OrderedItemsDataset(
-    CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
+    IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]
 ):
-    def __init__(self, order_fn: str | Callable, *args, **kwargs):
+    """
+    Parent items sorted by the values of an order function, ties keep the parent order.
+
+    The sort keys are evaluated by chunks of items, see `compute_items_keys`: optionally
+    on whole columns of items (`vectorized`), in a process or thread pool, and cached on
+    disk by the fingerprints of the parent dataset and of the order function.
+
+    Args:
+        order_fn (str | Callable): Sort key of an item, or of the columns of a chunk of
+            items returning one key per item if vectorized.
+        vectorized (bool): Evaluate the order function on the columns of chunks of items.
+        num_workers (int): Number of processes or threads evaluating the sort keys.
+        parallel_backend (str): "process" or "thread".
+        chunk_size (int): Number of items evaluated at once.
+        cache_dir (str | Path): Directory of the cached sort keys, not cached if None.
+    """
+
+    def __init__(
+        self,
+        order_fn: str | Callable,
+        vectorized: bool = False,
+        num_workers: int = 0,
+        parallel_backend: str = "process",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        cache_dir: str | Path = None,
+        *args,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
         element_to_value = FunctionsFactory.create(order_fn)
-        indices = list(range(len(self.parent_dataset)))
-        self.reordered_items_indices = sorted(
-            indices, key=lambda index: element_to_value(self.parent_dataset[index])
+        keys = compute_items_keys(
+            self.parent_dataset,
+            element_to_value,
+            vectorized=vectorized,
+            num_workers=num_workers,
+            parallel_backend=parallel_backend,
+            chunk_size=chunk_size,
+            cache_dir=cache_dir,
+        )
+        self.reordered_items_indices: CompactIndices = compact_indices(
+            np.argsort(keys, kind="stable"), len(self.parent_dataset)
         )
 
     def __len__(self):
         return len(self.parent_dataset)
 
-    def __getitem__(self, index):
-        return self.parent_dataset[self.reordered_items_indices[index]]
-
     def parent_index(self, index):
         return self.reordered_items_indices[index]
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return take_indices(self.reordered_items_indices, indices)
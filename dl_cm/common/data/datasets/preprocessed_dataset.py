@@ -1,5 +1,8 @@
+import collections.abc
 from typing import Callable
 
+import numpy as np
+
 from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
@@ -25,5 +28,14 @@ class PreprocessedDataset(
     def __getitem__(self, index):
         return self.preprocessing_callable(self.parent_dataset[index])
 
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list:
+        return [
+            self.preprocessing_callable(parent_item)
+            for parent_item in self.parent_dataset.__getitems__(indices)
+        ]
+
     def parent_index(self, index):
         return index
+
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return np.asarray(indices, dtype=np.int64)
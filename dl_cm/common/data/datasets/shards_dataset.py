@@ -0,0 +1,310 @@
+"""
+Datasets packed into large sequential shard files.
+
+One file per item is slow to list and to open on network file systems. `write_shards`
+packs the items of any dataset into a few large shards, either tar archives (one pickled
+member per item, readable with standard tools) or plain concatenations of the pickled
+items ("binary"). Every shard comes with an index of the byte offset and size of its
+items, so that items are read back without parsing the shard:
+
+    shards_directory/
+        shards.json          format, shard names and items count
+        shard-00000.tar      (or .bin)
+        shard-00000.idx.npy  int64 [items, 2] array of (offset, size)
+
+`ShardsDataset` reads shards with random access through the index, and
+`read_shard_items` streams a single shard sequentially, eg: as the `read_shard_fn`
+of a `ShardedDataset`.
+"""
+
+import collections.abc
+import io
+import json
+import math
+import os
+import pickle
+import tarfile
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from dl_cm.common.data.datasets import BaseDataset
+from dl_cm.common.functions import FUNCTIONS_REGISTERY
+
+SHARD_FORMATS = {"tar": ".tar", "binary": ".bin"}
+SHARDS_METADATA_FILE = "shards.json"
+INDEX_SUFFIX = ".idx.npy"
+TAR_BLOCK_SIZE = tarfile.BLOCKSIZE
+
+
+def shard_index_path(shard_path: str | Path) -> Path:
+    shard_path = Path(shard_path)
+    return shard_path.with_name(shard_path.stem + INDEX_SUFFIX)
+
+
+class _ShardWriter:
+    def __init__(self, shard_path: Path, shard_format: str):
+        self.shard_path = shard_path
+        self.shard_format = shard_format
+        self.offsets_sizes: list[tuple[int, int]] = []
+        self.file = open(shard_path, "wb")
+        self.tar = tarfile.open(fileobj=self.file, mode="w") if shard_format == "tar" else None
+
+    @property
+    def written_bytes(self) -> int:
+        return self.tar.offset if self.tar is not None else self.file.tell()
+
+    def write(self, key: int, payload: bytes) -> None:
+        if self.tar is None:
+            self.offsets_sizes.append((self.file.tell(), len(payload)))
+            self.file.write(payload)
+            return
+        member = tarfile.TarInfo(f"{key:09d}.pickle")
+        member.size = len(payload)
+        self.tar.addfile(member, io.BytesIO(payload))
+        # Data is followed by padding up to the next tar block
+        padded_size = math.ceil(len(payload) / TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+        self.offsets_sizes.append((self.tar.offset - padded_size, len(payload)))
+
+    def close(self) -> None:
+        if self.tar is not None:
+            self.tar.close()
+        self.file.close()
+        np.save(
+            shard_index_path(self.shard_path),
+            np.asarray(self.offsets_sizes, dtype=np.int64).reshape(-1, 2),
+        )
+
+
+def _dataset_items(
+    dataset: BaseDataset, start: int, stop: int, batch_size: int
+) -> Iterator[tuple[int, Any]]:
+    for batch_start in range(start, stop, batch_size):
+        indices = list(range(batch_start, min(batch_start + batch_size, stop)))
+        yield from zip(indices, dataset.__getitems__(indices))
+
+
+def shard_name(shard_id: int, shard_format: str, prefix: str = "shard") -> str:
+    return f"{prefix}-{shard_id:05d}{SHARD_FORMATS[shard_format]}"
+
+
+def write_shard(
+    dataset: BaseDataset,
+    shard_path: str | Path,
+    shard_format: str = "tar",
+    start: int = 0,
+    stop: int = None,
+    batch_size: int = 64,
+) -> list[Path]:
+    """
+    Pack the items of a dataset within [start, stop) into a single shard along with its index.
+
+    Returns:
+        list[Path]: Paths of the written shard and of its index.
+    """
+    stop = len(dataset) if stop is None else stop
+    writer = _ShardWriter(Path(shard_path), shard_format)
+    for key, item in _dataset_items(dataset, start, stop, batch_size):
+        writer.write(key, pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+    writer.close()
+    return [writer.shard_path, shard_index_path(writer.shard_path)]
+
+
+def write_shards_metadata(
+    output_directory: str | Path, shard_format: str, shards: list[str], items_count: int
+) -> None:
+    """Write the metadata file listing the shards of a directory, read by `ShardsDataset`."""
+    with open(Path(output_directory, SHARDS_METADATA_FILE), "w") as metadata_file:
+        json.dump(
+            {"format": shard_format, "shards": shards, "items_count": items_count},
+            metadata_file,
+        )
+
+
+def write_shards(
+    dataset: BaseDataset,
+    output_directory: str | Path,
+    shard_format: str = "tar",
+    shard_max_bytes: int = 2**30,
+    shard_max_items: int = None,
+    batch_size: int = 64,
+    prefix: str = "shard",
+) -> list[Path]:
+    """
+    Pack the items of a dataset, in order, into shards along with their offset index.
+
+    Args:
+        dataset (BaseDataset): Dataset to pack, items must be picklable.
+        output_directory (str | Path): Directory of the shards, created if missing.
+        shard_format (str): "tar" or "binary".
+        shard_max_bytes (int): A new shard is started once a shard exceeds this size.
+        shard_max_items (int): Maximum number of items per shard, unbounded if None.
+        batch_size (int): Number of items fetched at once with `__getitems__`.
+        prefix (str): Prefix of the shard file names.
+
+    Returns:
+        list[Path]: Paths of the written shards.
+    """
+    if shard_format not in SHARD_FORMATS:
+        raise ValueError(
+            f"Unknown shard format {shard_format}, expected one of {list(SHARD_FORMATS)}"
+        )
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    shards_paths: list[Path] = []
+    writer: _ShardWriter | None = None
+
+    for key, item in _dataset_items(dataset, 0, len(dataset), batch_size):
+        if writer is None or writer.written_bytes >= shard_max_bytes or (
+            shard_max_items and len(writer.offsets_sizes) >= shard_max_items
+        ):
+            if writer is not None:
+                writer.close()
+            shards_paths.append(
+                output_directory / shard_name(len(shards_paths), shard_format, prefix)
+            )
+            writer = _ShardWriter(shards_paths[-1], shard_format)
+        writer.write(key, pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+    if writer is not None:
+        writer.close()
+
+    write_shards_metadata(
+        output_directory, shard_format, [p.name for p in shards_paths], len(dataset)
+    )
+    return shards_paths
+
+
+@FUNCTIONS_REGISTERY.register()
+def read_shard_items(shard_path: str | Path, readahead_bytes: int = 2**24) -> Iterator[Any]:
+    """
+    Stream the items of a shard written by `write_shards`, reading it sequentially.
+
+    Args:
+        shard_path (str | Path): Path of the shard.
+        readahead_bytes (int): Size of the read buffer.
+    """
+    offsets_sizes = np.load(shard_index_path(shard_path))
+    with open(shard_path, "rb", buffering=readahead_bytes) as shard_file:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(shard_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        position = 0
+        for offset, size in offsets_sizes.tolist():
+            if offset != position:
+                # Skip tar headers and paddings
+                shard_file.seek(offset - position, os.SEEK_CUR)
+            yield pickle.loads(shard_file.read(size))
+            position = offset + size
+
+
+class ShardsDataset(BaseDataset):
+    """
+    Items of shards written by `write_shards`, with random access through their offset index.
+
+    Items are read with positional reads on file descriptors opened lazily in every process.
+    Batched retrieval sorts the requested items by position and merges reads of items
+    closer than `coalesce_gap_bytes` into single sequential reads.
+
+    Args:
+        shards_directory (str | Path): Directory written by `write_shards`.
+        coalesce_gap_bytes (int): Maximum gap between items read at once by `__getitems__`.
+    """
+
+    _fingerprint_excluded_attributes = BaseDataset._fingerprint_excluded_attributes | {
+        "_file_descriptors",
+        "_file_descriptors_pid",
+        "_index",
+    }
+
+    def __init__(
+        self,
+        shards_directory: str | Path,
+        coalesce_gap_bytes: int = 2**16,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.shards_directory = Path(shards_directory)
+        with open(self.shards_directory / SHARDS_METADATA_FILE) as metadata_file:
+            metadata = json.load(metadata_file)
+        self.shard_format: str = metadata["format"]
+        self.shards: list[str] = metadata["shards"]
+        self.coalesce_gap_bytes = coalesce_gap_bytes
+        shards_indices = [
+            np.load(shard_index_path(self.shards_directory / shard)) for shard in self.shards
+        ]
+        # Columns: shard, offset, size
+        self._index = np.concatenate(
+            [
+                np.column_stack([np.full(len(c_index), shard_id), c_index])
+                for shard_id, c_index in enumerate(shards_indices)
+            ]
+            or [np.empty((0, 3))]
+        ).astype(np.int64)
+        self._file_descriptors: dict[int, int] = {}
+        self._file_descriptors_pid = os.getpid()
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def shards_paths(self) -> list[Path]:
+        return [self.shards_directory / shard for shard in self.shards]
+
+    def _file_descriptor(self, shard_id: int) -> int:
+        if self._file_descriptors_pid != os.getpid():
+            # Descriptors inherited from the parent process (eg: by forked workers) are reopened
+            self._file_descriptors, self._file_descriptors_pid = {}, os.getpid()
+        if shard_id not in self._file_descriptors:
+            self._file_descriptors[shard_id] = os.open(
+                self.shards_directory / self.shards[shard_id], os.O_RDONLY
+            )
+        return self._file_descriptors[shard_id]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_file_descriptors"] = {}
+        return state
+
+    def __del__(self):
+        if getattr(self, "_file_descriptors_pid", None) == os.getpid():
+            for file_descriptor in self._file_descriptors.values():
+                os.close(file_descriptor)
+
+    def __getitem__(self, index: int) -> Any:
+        shard_id, offset, size = self._index[index].tolist()
+        return pickle.loads(os.pread(self._file_descriptor(shard_id), size, offset))
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[Any]:
+        index = self._index[np.asarray(indices, dtype=np.int64)]
+        order = np.lexsort((index[:, 1], index[:, 0]))
+        items = [None] * len(order)
+        run_start = 0
+        # Runs of items of the same shard separated by small gaps are read at once
+        for run_end in range(1, len(order) + 1):
+            if run_end < len(order):
+                previous, current = index[order[run_end - 1]], index[order[run_end]]
+                if current[0] == previous[0] and (
+                    current[1] - (previous[1] + previous[2]) <= self.coalesce_gap_bytes
+                ):
+                    continue
+            run = order[run_start:run_end]
+            shard_id = int(index[run[0], 0])
+            run_offset = int(index[run[0], 1])
+            run_end_offset = int((index[run, 1] + index[run, 2]).max())
+            buffer = memoryview(
+                os.pread(
+                    self._file_descriptor(shard_id), run_end_offset - run_offset, run_offset
+                )
+            )
+            for position in run.tolist():
+                _, offset, size = index[position].tolist()
+                start = offset - run_offset
+                items[position] = pickle.loads(buffer[start : start + size])
+            run_start = run_end
+        return items
+
+    def __iter__(self) -> Iterator[Any]:
+        """Sequential streaming of all items, shard after shard."""
+        for shard_path in self.shards_paths:
+            yield from read_shard_items(shard_path)
@@ -6,34 +6,89 @@ import numpy as np
 from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
-    CompositionDataset,
+    IndexCompositionDataset,
 )
+from dl_cm.utils.indices import (
+    FeistelPermutation,
+    compact_indices,
+    index_dtype,
+    take_indices,
+)
+
+
+class ShuffledDataset(IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
+    """
+    Parent items in a shuffled order.
+
+    The order is either given (`shuffled_indices`), drawn once as a stored permutation, or,
+    when a seed is given or `reshuffle_each_epoch` is set, computed on the fly by a
+    `FeistelPermutation` seeded with (seed, epoch): nothing is stored, and every rank and
+    worker computes the same order for a given epoch. In `reshuffle_each_epoch` mode, the
+    order changes with `set_epoch` (eg: called by the DatasetsEpochCallback).
+
+    Args:
+        shuffled_indices (Iterable[int] | np.ndarray): Order of the parent items.
+        seed (int): Seed of the permutation, drawn at random if None.
+        reshuffle_each_epoch (bool): Permute the items differently at every epoch.
+    """
 
+    _fingerprint_excluded_attributes = (
+        IndexCompositionDataset._fingerprint_excluded_attributes | {"epoch", "_permutation"}
+    )
 
-class ShuffledDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
     def __init__(
         self,
         shuffled_indices: collections.abc.Iterable[int] | np.ndarray = None,
+        seed: int = None,
+        reshuffle_each_epoch: bool = False,
         *args,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
+        self.seed = seed
+        self.reshuffle_each_epoch = reshuffle_each_epoch
+        self.epoch = 0
+        self._permutation: FeistelPermutation | None = None
+        if shuffled_indices is not None and (seed is not None or reshuffle_each_epoch):
+            raise ValueError("Shuffled indices can not be set along with a seed or a reshuffle")
+        if seed is not None or reshuffle_each_epoch:
+            if self.seed is None:
+                self.seed = int(np.random.randint(2**31))
+            self.shuffled_indices: np.ndarray | range | None = None
+            self._permutation = FeistelPermutation(len(self.parent_dataset), (self.seed, 0))
+            return
         if isinstance(shuffled_indices, (collections.abc.Iterable, np.ndarray)):
-            shuffled_indices = np.array(shuffled_indices)
+            shuffled_indices = compact_indices(shuffled_indices, len(self.parent_dataset))
         else:
-            shuffled_indices = np.random.permutation(len(self.parent_dataset))
+            shuffled_indices = np.random.permutation(
+                np.arange(len(self.parent_dataset), dtype=index_dtype(len(self.parent_dataset)))
+            )
         if len(shuffled_indices) != len(self.parent_dataset):
             raise RuntimeError(
                 f"Shuffled indices length {len(shuffled_indices)} \
                 is not equal to parent dataset length {len(self.parent_dataset)}"
             )
-        self.shuffled_indices: np.ndarray = shuffled_indices
+        self.shuffled_indices = shuffled_indices
+
+    @property
+    def is_epoch_dependent(self) -> bool:
+        return self.reshuffle_each_epoch or super().is_epoch_dependent
+
+    def set_epoch(self, epoch: int) -> None:
+        if self.reshuffle_each_epoch and epoch != self.epoch:
+            self.epoch = epoch
+            self._permutation = FeistelPermutation(len(self.parent_dataset), (self.seed, epoch))
+        super().set_epoch(epoch)
 
     def parent_index(self, index):
+        if self._permutation is not None:
+            return self._permutation[index]
         return self.shuffled_indices[index]
 
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        if self._permutation is not None:
+            return self._permutation(indices)
+        return take_indices(self.shuffled_indices, indices)
+
     def __len__(self):
         return len(self.parent_dataset)
-
-    def __getitem__(self, index):
-        return self.parent_dataset[self.shuffled_indices[index]]
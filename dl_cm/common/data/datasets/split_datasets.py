@@ -74,7 +74,6 @@ def split_dataset_random(
     assert sum(fractions) <= 1, "The sum of the fractions must not exceed 1."
 
     total_length = len(parent_dataset)
-    indices = np.arange(0, total_length, 1)
 
     # Calculate the number of elements for each fraction
     counts = [int(frac * total_length) for frac in fractions]
@@ -85,11 +84,9 @@ def split_dataset_random(
 
     subdatasets = []
     for start, end, ref_name in zip(starts, ends, reference_names):
-        # Extract the indices for this subdataset
-        sub_indices = indices[start:end]
         c_config = {
             "parent_dataset": parent_dataset,
-            "indices": sub_indices,
+            "indices": range(start, end),
             "reference_name": ref_name,
         }
         # Create a new subdataset instance for the current subset of indices
@@ -8,12 +8,13 @@ from dl_cm.common.data.datasets import (
     COMPOSED_DATASET_CLASS,
     TOP_DATASET_CLASS,
     BaseDataset,
-    CompositionDataset,
+    IndexCompositionDataset,
 )
 from dl_cm.common.typing import namedEntitySchema
+from dl_cm.utils.indices import CompactIndices, compact_indices, take_indices
 
 
-class SubDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
+class SubDataset(IndexCompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
     def __init__(
         self,
         parent_dataset: BaseDataset | namedEntitySchema,
@@ -29,13 +30,13 @@ class SubDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
                 start_bound = self.validate_bound(bounds[0])
                 end_bound = self.validate_bound(bounds[1])
                 assert end_bound > start_bound, "End bound should be higher than start bound!"
-                self.indices = list(range(start_bound, end_bound))
+                self.indices: CompactIndices = range(start_bound, end_bound)
             else:
                 logger.warning("No indices provided for subdataset, using all indices!")
-                self.indices = list(range(len(self.parent_dataset)))
+                self.indices = range(len(self.parent_dataset))
         else:
             assert bounds is None, "bounds and indices arguments cannot be both set!"
-            self.indices = indices
+            self.indices = compact_indices(indices, len(self.parent_dataset))
 
     def validate_bound(self, bound)->int:
         if bound < 1 and bound > -1:
@@ -53,6 +54,5 @@ class SubDataset(CompositionDataset[COMPOSED_DATASET_CLASS, TOP_DATASET_CLASS]):
     def parent_index(self, index: int):
         return self.indices[index]
 
-    def __getitem__(self, idx: int):
-        real_idx = self.indices[idx]
-        return self.parent_dataset.__getitem__(real_idx)
+    def parent_indices(self, indices: collections.abc.Sequence[int]) -> np.ndarray:
+        return take_indices(self.indices, indices)
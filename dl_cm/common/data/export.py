@@ -0,0 +1,292 @@
+"""
+Materialization of dataset pipelines to disk.
+
+`export_dataset` writes the items of a dataset (eg: a preprocessed datamodule dataset) to
+a storage format read back by a dedicated dataset:
+
+* "shards": tar or binary shards, read by `ShardsDataset`
+* "memmap": memory-mapped columns, read by `MemmapTensorDataset`
+
+Items are written by parts of consecutive items, concurrently in a process pool receiving
+the dataset once. Every completed part is recorded with the sha256 checksum of its bytes
+in a manifest, so that an interrupted export resumes from the completed parts, as long as
+the dataset fingerprint and the export options did not change. The string leaves of the
+memmap columns are written to a file per part, and gathered once all parts are written.
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from dl_cm import _logger as logger
+from dl_cm.common.data.datasets import BaseDataset
+from dl_cm.common.data.datasets.memmap_dataset import (
+    column_path,
+    create_memmap_columns,
+    fill_memmap_columns,
+    write_memmap_header,
+    write_memmap_strings,
+)
+from dl_cm.common.data.datasets.shards_dataset import (
+    shard_index_path,
+    shard_name,
+    write_shard,
+    write_shards_metadata,
+)
+from dl_cm.utils.shared_memory import shared_memory_pickling
+
+EXPORT_FORMATS = ("shards", "memmap")
+MANIFEST_FILE = "export_manifest.json"
+CHECKSUM_CHUNK_BYTES = 2**22
+
+# Dataset of the current process pool worker
+_worker_state: dict[str, Any] = {}
+
+
+def file_checksum(path: str | Path, start: int = 0, stop: int = None) -> str:
+    """sha256 hex digest of the bytes of a file within [start, stop)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = (os.path.getsize(path) if stop is None else stop) - start
+        while remaining > 0:
+            chunk = f.read(min(CHECKSUM_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def part_strings_path(output_directory: Path, part_id: int) -> Path:
+    """Path of the string leaves values of the items of a memmap part."""
+    return output_directory / f"strings-{part_id:05d}.json"
+
+
+def _column_item_bytes(column: dict) -> int:
+    return int(np.dtype(column["dtype"]).itemsize * np.prod(column["shape"], dtype=np.int64))
+
+
+def part_checksums(
+    output_directory: Path, manifest: dict, part_id: int, start: int, stop: int
+) -> dict[str, str]:
+    """Checksums of the files (shards) or of the file ranges (memmap columns) of a part."""
+    if manifest["storage_format"] == "shards":
+        shard_path = output_directory / shard_name(part_id, manifest["shard_format"])
+        return {
+            p.name: file_checksum(p)
+            for p in (shard_path, shard_index_path(shard_path))
+            if p.exists()
+        }
+    checksums = {}
+    for name, column in manifest["header"]["columns"].items():
+        item_bytes = _column_item_bytes(column)
+        checksums[name] = file_checksum(
+            column_path(output_directory, name), start * item_bytes, stop * item_bytes
+        )
+    strings_path = part_strings_path(output_directory, part_id)
+    if strings_path.exists():
+        checksums[strings_path.name] = file_checksum(strings_path)
+    return checksums
+
+
+def _export_part(
+    dataset: BaseDataset,
+    output_directory: Path,
+    manifest: dict,
+    part_id: int,
+    start: int,
+    stop: int,
+    batch_size: int,
+) -> dict:
+    record = {"start": start, "stop": stop}
+    if manifest["storage_format"] == "shards":
+        write_shard(
+            dataset,
+            output_directory / shard_name(part_id, manifest["shard_format"]),
+            manifest["shard_format"],
+            start,
+            stop,
+            batch_size,
+        )
+    else:
+        strings_values = fill_memmap_columns(
+            dataset, output_directory, manifest["header"], start, stop, batch_size
+        )
+        if strings_values:
+            with open(part_strings_path(output_directory, part_id), "w") as strings_file:
+                json.dump(strings_values, strings_file)
+    record["checksums"] = part_checksums(output_directory, manifest, part_id, start, stop)
+    return record
+
+
+def _init_worker(dataset: BaseDataset) -> None:
+    _worker_state["dataset"] = dataset
+
+
+def _export_worker_part(*args) -> dict:
+    return _export_part(_worker_state["dataset"], *args)
+
+
+def _dump_manifest(output_directory: Path, manifest: dict) -> None:
+    manifest_path = output_directory / MANIFEST_FILE
+    tmp_path = manifest_path.with_name(f"{MANIFEST_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(tmp_path, manifest_path)
+
+
+def _load_manifest(output_directory: Path, options: dict) -> dict | None:
+    try:
+        with open(output_directory / MANIFEST_FILE) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if any(manifest.get(k) != v for k, v in options.items()):
+        logger.info(f"Export options or dataset changed, restarting {output_directory} export")
+        return None
+    return manifest
+
+
+def verify_export(output_directory: str | Path) -> list[int]:
+    """
+    Check the checksums of the exported parts against the manifest.
+
+    Returns:
+        list[int]: Identifiers of the parts whose content does not match their checksums.
+    """
+    output_directory = Path(output_directory)
+    with open(output_directory / MANIFEST_FILE) as manifest_file:
+        manifest = json.load(manifest_file)
+    return [
+        int(part_id)
+        for part_id, record in manifest["parts"].items()
+        if part_checksums(
+            output_directory, manifest, int(part_id), record["start"], record["stop"]
+        )
+        != record["checksums"]
+    ]
+
+
+def export_dataset(
+    dataset: BaseDataset,
+    output_directory: str | Path,
+    storage_format: str = "shards",
+    num_workers: int = 1,
+    items_per_part: int = 1024,
+    shard_format: str = "tar",
+    batch_size: int = 64,
+    verify_existing: bool = True,
+) -> Path:
+    """
+    Write the items of a dataset to disk, resuming a previous interrupted export if any.
+
+    Args:
+        dataset (BaseDataset): Dataset to export, pickled once to every worker process.
+        output_directory (str | Path): Directory of the exported dataset.
+        storage_format (str): "shards" or "memmap".
+        num_workers (int): Number of processes writing parts concurrently.
+        items_per_part (int): Number of items of a part, ie: of a shard for "shards".
+        shard_format (str): "tar" or "binary", for "shards".
+        batch_size (int): Number of items fetched at once with `__getitems__`.
+        verify_existing (bool): Check the checksums of parts completed by a previous run,
+            parts not matching them are written again.
+
+    Returns:
+        Path: The output directory, to be read by `ShardsDataset` or `MemmapTensorDataset`.
+    """
+    if storage_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Unknown storage format {storage_format}, expected one of {EXPORT_FORMATS}"
+        )
+    output_directory = Path(output_directory)
+    output_directory.mkdir(parents=True, exist_ok=True)
+    dataset_length = len(dataset)
+    options = {
+        "fingerprint": dataset.fingerprint(),
+        "storage_format": storage_format,
+        "shard_format": shard_format,
+        "items_per_part": items_per_part,
+        "length": dataset_length,
+    }
+    manifest = _load_manifest(output_directory, options)
+    if manifest is None:
+        manifest = {**options, "header": None, "parts": {}}
+        if storage_format == "memmap":
+            if not dataset_length:
+                raise ValueError("Can not export an empty dataset to memmap columns")
+            manifest["header"] = create_memmap_columns(
+                dataset[0], output_directory, dataset_length
+            )
+        _dump_manifest(output_directory, manifest)
+    elif verify_existing:
+        for part_id in verify_export(output_directory):
+            logger.warning(f"Part {part_id} of {output_directory} is corrupted, rewriting it")
+            manifest["parts"].pop(str(part_id))
+
+    parts_ranges = {
+        part_id: (start, min(start + items_per_part, dataset_length))
+        for part_id, start in enumerate(range(0, dataset_length, items_per_part))
+    }
+    pending_parts = [
+        part_id for part_id in parts_ranges if str(part_id) not in manifest["parts"]
+    ]
+
+    def record_part(part_id: int, record: dict) -> None:
+        manifest["parts"][str(part_id)] = record
+        _dump_manifest(output_directory, manifest)
+
+    if num_workers > 1 and len(pending_parts) > 1:
+        # Workers receive the dataset once, its large attributes through shared memory
+        with shared_memory_pickling(), concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_workers, initializer=_init_worker, initargs=(dataset,)
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _export_worker_part,
+                    output_directory,
+                    manifest,
+                    part_id,
+                    *parts_ranges[part_id],
+                    batch_size,
+                ): part_id
+                for part_id in pending_parts
+            }
+            for future in concurrent.futures.as_completed(futures):
+                record_part(futures[future], future.result())
+    else:
+        for part_id in pending_parts:
+            record_part(
+                part_id,
+                _export_part(
+                    dataset,
+                    output_directory,
+                    manifest,
+                    part_id,
+                    *parts_ranges[part_id],
+                    batch_size,
+                ),
+            )
+
+    if storage_format == "shards":
+        write_shards_metadata(
+            output_directory,
+            shard_format,
+            [shard_name(part_id, shard_format) for part_id in parts_ranges],
+            dataset_length,
+        )
+    else:
+        header = manifest["header"]
+        strings_values = [[] for _ in header["strings"]]
+        for part_id in parts_ranges if header["strings"] else ():
+            with open(part_strings_path(output_directory, part_id)) as strings_file:
+                for values, part_values in zip(strings_values, json.load(strings_file)):
+                    values.extend(part_values)
+        write_memmap_strings(output_directory, header, strings_values)
+        write_memmap_header(output_directory, header)
+    return output_directory
@@ -0,0 +1,173 @@
+"""
+Image decoding backends.
+
+Decoders read an image file into a contiguous [C, H, W] tensor of the stored dtype
+(uint8 for 8 bits images). Converting to float is left to the caller, ideally once
+per batch rather than once per item.
+"""
+
+from abc import abstractmethod
+from pathlib import Path
+
+import numpy as np
+import torch
+import torchvision.io
+
+from dl_cm.common import DLCM
+from dl_cm.utils.ppattern.factory import BaseFactory
+from dl_cm.utils.registery import Registry
+
+IMAGE_DECODERS_REGISTERY = Registry("ImageDecoders")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Offset of the color type in the IHDR chunk, following the signature, and palette type
+PNG_COLOR_TYPE_OFFSET = 25
+PNG_PALETTE_COLOR_TYPE = 3
+
+
+def channels_first(array: np.ndarray) -> torch.Tensor:
+    """Contiguous [C, H, W] tensor of a [H, W] or [H, W, C] array."""
+    if array.ndim == 2:
+        # if 2D image, add band dimension
+        array = array[..., np.newaxis]
+    array = np.ascontiguousarray(np.moveaxis(array, (0, 1), (-2, -1)))
+    if not array.flags.writeable:
+        array = array.copy()
+    return torch.from_numpy(array)
+
+
+class BaseImageDecoder(DLCM):
+    @staticmethod
+    def registry() -> Registry:
+        return IMAGE_DECODERS_REGISTERY
+
+    @abstractmethod
+    def __call__(self, fp: str) -> torch.Tensor:
+        pass
+
+
+class SkimageDecoder(BaseImageDecoder):
+    """Decode any format supported by `skimage.io.imread`."""
+
+    def __call__(self, fp: str) -> torch.Tensor:
+        from skimage.io import imread
+
+        return channels_first(imread(fp))
+
+
+class TorchvisionDecoder(BaseImageDecoder):
+    """
+    Decode JPEG, PNG, WEBP and GIF files with the native `torchvision.io` decoders.
+
+    Palette PNG files are not expanded by torchvision in UNCHANGED mode, which decodes them
+    to a single channel: they are rather decoded to RGB (or RGBA if transparent) by
+    `SkimageDecoder`, as before decoders were selectable.
+
+    Args:
+        mode (str): Name of a `torchvision.io.ImageReadMode` (eg: UNCHANGED, GRAY, RGB).
+    """
+
+    def __init__(self, mode: str = "UNCHANGED"):
+        self.mode = torchvision.io.ImageReadMode[mode]
+
+    def __call__(self, fp: str) -> torch.Tensor:
+        data = torchvision.io.read_file(fp)
+        if self.mode == torchvision.io.ImageReadMode.UNCHANGED and is_palette_png(data):
+            return SkimageDecoder()(fp)
+        return torchvision.io.decode_image(data, mode=self.mode).contiguous()
+
+
+def is_palette_png(data: torch.Tensor) -> bool:
+    """Whether encoded image bytes are a palette PNG image."""
+    header = data[: PNG_COLOR_TYPE_OFFSET + 1].numpy().tobytes()
+    return (
+        header.startswith(PNG_SIGNATURE)
+        and len(header) > PNG_COLOR_TYPE_OFFSET
+        and header[PNG_COLOR_TYPE_OFFSET] == PNG_PALETTE_COLOR_TYPE
+    )
+
+
+class PILDecoder(BaseImageDecoder):
+    """
+    Decode images with PIL.
+
+    Args:
+        mode (str): PIL mode to convert images to (eg: RGB, L), None keeps the stored mode.
+        draft_size (tuple[int, int]): If given, JPEG images are decoded at the smallest scale
+            (1/2, 1/4 or 1/8) at least as large as this (width, height), which is much faster.
+    """
+
+    def __init__(self, mode: str = None, draft_size: tuple[int, int] = None):
+        self.mode = mode
+        self.draft_size = tuple(draft_size) if draft_size else None
+
+    def __call__(self, fp: str) -> torch.Tensor:
+        import PIL.Image
+
+        with PIL.Image.open(fp) as image:
+            if self.draft_size:
+                image.draft(self.mode or image.mode, self.draft_size)
+            if self.mode and image.mode != self.mode:
+                image = image.convert(self.mode)
+            return channels_first(np.asarray(image))
+
+
+class TifffileDecoder(BaseImageDecoder):
+    """Decode TIFF files with `tifffile`, keeping their dtype (eg: uint16 multispectral images)."""
+
+    def __call__(self, fp: str) -> torch.Tensor:
+        import tifffile
+
+        return channels_first(tifffile.imread(fp))
+
+
+DEFAULT_EXTENSION_DECODERS = {
+    frozenset({".jpg", ".jpeg", ".png"}): "TorchvisionDecoder",
+    frozenset({".tif", ".tiff"}): "TifffileDecoder",
+}
+
+
+class ExtensionImageDecoder(BaseImageDecoder):
+    """
+    Select the decoder of every image from its extension.
+
+    Args:
+        extension_decoder_map (dict): Decoder (or decoder configuration) of every
+            lowercase extension, keys may be frozensets of extensions.
+        default_decoder: Decoder of extensions missing from the map.
+    """
+
+    def __init__(
+        self,
+        extension_decoder_map: dict[str | frozenset, str | dict | BaseImageDecoder] = None,
+        default_decoder: str | dict | BaseImageDecoder = "SkimageDecoder",
+    ):
+        if extension_decoder_map is None:
+            extension_decoder_map = DEFAULT_EXTENSION_DECODERS
+        self.extension_decoder_map = {}
+        for extensions, decoder in extension_decoder_map.items():
+            decoder = ImageDecodersFactory.create(decoder)
+            # flatten frozen map keys
+            if isinstance(extensions, str):
+                extensions = (extensions,)
+            for c_ext in extensions:
+                self.extension_decoder_map[c_ext.lower()] = decoder
+        self.default_decoder = ImageDecodersFactory.create(default_decoder)
+
+    def decoder(self, fp: str) -> BaseImageDecoder:
+        return self.extension_decoder_map.get(Path(fp).suffix.lower(), self.default_decoder)
+
+    def __call__(self, fp: str) -> torch.Tensor:
+        return self.decoder(fp)(fp)
+
+
+class ImageDecodersFactory(BaseFactory[BaseImageDecoder]):
+    @staticmethod
+    def base_class(similar=False) -> type[BaseImageDecoder]:
+        if similar:
+            return (BaseImageDecoder,)
+        return BaseImageDecoder
+
+    @classmethod
+    def default_instance(cls) -> BaseImageDecoder:
+        return ExtensionImageDecoder()
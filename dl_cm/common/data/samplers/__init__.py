@@ -1,3 +1,5 @@
+import functools
+
 import torch
 import torch.utils.data.sampler
 from lightning.pytorch.overrides.distributed import _IndexBatchSamplerWrapper
@@ -43,6 +45,7 @@ class SamplersFactory(BaseFactory[BaseSampler]):
             return (BaseSampler, torch.utils.data.Sampler, _IndexBatchSamplerWrapper)
         return BaseSampler
 
+@functools.cache
 def base_sampler_adapter(sampler_cls: type):
     """Decorator to make any external sampler inherit from BaseSampler
     """
@@ -64,3 +67,5 @@ for name in dir(torch.utils.data.sampler):
         SAMPLER_REGISTRY.register(
             obj=attr, name=name, base_class_adapter=base_sampler_adapter
         )
+
+from .metadata_sampler import MetadataWeightedRandomSampler
@@ -1,7 +1,11 @@
+import collections.abc
+import math
+
+import numpy as np
 import torch
 
-from dl_cm.common.datasets import CompositionDataset, IdentityCompositionDataset
-from dl_cm.common.datasets.combined_dataset import CombinedDataset
+from dl_cm.common.data.datasets import CompositionDataset, IdentityCompositionDataset
+from dl_cm.common.data.datasets.combined_dataset import CombinedDataset
 
 from . import BaseSampler
 
@@ -14,7 +18,19 @@ class HeteroDatasetsBatchSampler(BaseSampler):
     It will sample batches of size batch_sizes[i] from the i-th dataset in the CombinedDataset. The order of the datasets
     is determined by the order of the datasets in the CombinedDataset.
 
-    The sampler will sample all the elements of the CombinedDataset and will not drop any element.
+    The indices of every dataset (pool) are computed once, shuffled with a vectorized permutation
+    and sliced into batches. Batches of all datasets are then interleaved at random (when
+    shuffled) or in the order of their indices. Unless `drop_last` is set, the last incomplete
+    batch of every dataset is sampled as well.
+
+    With `mixing_weights`, datasets are sampled in the given proportions of batches rather than
+    in proportion to their sizes: the epoch keeps the same number of batches, and pools are
+    cycled through new permutations when exhausted (eg: oversampling a small dataset).
+
+    In distributed training, every pool is sharded across ranks after the shared shuffling,
+    so that ranks sample disjoint indices and the same number of batches of every dataset.
+    Orders are seeded by (seed, epoch), see `set_epoch`: the seed must be the same on all
+    ranks, it defaults to 0.
 
     Note: This sampler is the default sampler for CombinedDataset and CompositionDataset with top dataset as CombinedDataset.
     """
@@ -26,6 +42,10 @@ class HeteroDatasetsBatchSampler(BaseSampler):
         *args,
         drop_last=False,
         shuffle=True,
+        mixing_weights: collections.abc.Sequence[float] = None,
+        num_replicas: int = None,
+        rank: int = None,
+        seed: int = 0,
         **kwargs,
     ):
         assert isinstance(data_source, CombinedDataset) or (
@@ -40,57 +60,140 @@ class HeteroDatasetsBatchSampler(BaseSampler):
             )
         else:
             self.data_source = data_source
+        datasets_count = len(self.data_source.top_dataset.datasets)
+        if len(batch_sizes) != datasets_count:
+            raise ValueError(f"Expected {datasets_count} batch sizes, got {len(batch_sizes)}")
+        if mixing_weights is not None:
+            if len(mixing_weights) != datasets_count or min(mixing_weights) < 0:
+                raise ValueError(f"Expected {datasets_count} non negative mixing weights")
+            mixing_weights = np.asarray(mixing_weights, dtype=np.float64)
+            mixing_weights = mixing_weights / mixing_weights.sum()
         self.batch_sizes = batch_sizes
         self.drop_last = drop_last
         self.shuffle = shuffle
+        self.mixing_weights: np.ndarray | None = mixing_weights
+        if num_replicas is None or rank is None:
+            distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+            if num_replicas is None:
+                num_replicas = torch.distributed.get_world_size() if distributed else 1
+            if rank is None:
+                rank = torch.distributed.get_rank() if distributed else 0
+        self.num_replicas = num_replicas
+        self.rank = rank
+        # Fixed by default, as DistributedSampler: ranks must shuffle the pools alike before
+        # sharding them, a seed drawn on every rank would be the same only if seeded alike
+        self.seed = seed
+        self.epoch = 0
+        self._iteration = 0
         self.combined_dataset_count = self._count_top_datasets_length()
+        if mixing_weights is not None and any(
+            weight > 0 and not self.combined_dataset_count[dataset_idx]
+            for dataset_idx, weight in enumerate(mixing_weights)
+        ):
+            raise ValueError("Empty datasets can not be sampled with a positive mixing weight")
         super().__init__(*args, **kwargs)
 
     def _count_top_datasets_length(self):
-        counter_map = {k: 0 for k in range(len(self.data_source.top_dataset.datasets))}
-        for c_idx in range(len(self.data_source)):
-            idx_within_combined_dst = self.data_source.top_parent_index(c_idx)
-            dataset_idx = self.data_source.top_dataset.respective_dataset_index(
-                idx_within_combined_dst
+        # Dataset index of every item, looked up once through the compiled index map
+        self.items_dataset_indices = (
+            self.data_source.top_dataset.respective_datasets_indices(
+                self.data_source.top_index_map
             )
-            counter_map[dataset_idx] += 1
-        return counter_map
-
-    def __iter__(self):
-        batch_buffers: dict[
-            int, list
-        ] = {}  # To hold batches of different types (keys are the index of the respective dataset in the CombinedDataset)
-        item_loop_indices = (
-            torch.randperm(len(self.data_source)).tolist()
-            if self.shuffle
-            else range(len(self.data_source))
         )
-        for idx in item_loop_indices:
-            idx_within_combined_dst = self.data_source.top_parent_index(idx)
-            dataset_idx = self.data_source.top_dataset.respective_dataset_index(
-                idx_within_combined_dst
-            )
+        order = np.argsort(self.items_dataset_indices, kind="stable")
+        counts = np.bincount(
+            self.items_dataset_indices,
+            minlength=len(self.data_source.top_dataset.datasets),
+        )
+        # Indices of the items of every dataset, in increasing order
+        self.pools: list[np.ndarray] = np.split(order, np.cumsum(counts)[:-1])
+        return {k: int(c) for k, c in enumerate(counts)}
 
-            if dataset_idx not in batch_buffers:
-                batch_buffers[dataset_idx] = []
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch seeding the shuffling, called by Lightning before every epoch."""
+        self.epoch = epoch
+        self._iteration = 0
 
-            batch_buffers[dataset_idx].append(idx)  # Store indices instead of items
-            # Use the specific batch size for the item type
-            if len(batch_buffers[dataset_idx]) == self.batch_sizes[dataset_idx]:
-                yield batch_buffers[dataset_idx]
-                batch_buffers[dataset_idx] = []
+    def _shard_length(self, pool_length: int) -> int:
+        if self.drop_last:
+            return pool_length // self.num_replicas
+        return math.ceil(pool_length / self.num_replicas)
 
-        # Handling remaining items if drop_last is False
-        if not self.drop_last:
-            for dataset_idx, buffer in batch_buffers.items():
-                if buffer:
-                    yield buffer
+    def _shard(self, pool: np.ndarray) -> np.ndarray:
+        if self.num_replicas == 1:
+            return pool
+        total_length = self._shard_length(len(pool)) * self.num_replicas
+        if total_length > len(pool):
+            # Padded by wrapping around, as DistributedSampler does
+            pool = np.resize(pool, total_length)
+        return pool[self.rank : total_length : self.num_replicas]
+
+    def _batches_counts(self) -> list[int]:
+        counts = []
+        for dataset_idx, batch_size in enumerate(self.batch_sizes):
+            shard_length = self._shard_length(self.combined_dataset_count[dataset_idx])
+            if self.drop_last:
+                counts.append(shard_length // batch_size)
+            else:
+                counts.append(math.ceil(shard_length / batch_size))
+        if self.mixing_weights is None:
+            return counts
+        # Largest remainder apportionment of the same number of batches
+        total = sum(counts)
+        shares = self.mixing_weights * total
+        counts = np.floor(shares).astype(np.int64)
+        counts[np.argsort(counts - shares)[: total - counts.sum()]] += 1
+        return counts.tolist()
+
+    def _permuted_pool(self, pool: np.ndarray, rng: np.random.Generator, length: int = None):
+        if length is None:
+            return rng.permutation(pool) if self.shuffle else pool
+        # Pools are cycled through new permutations until `length` items are drawn
+        repeats = math.ceil(length / len(pool))
+        if self.shuffle:
+            return np.concatenate([rng.permutation(pool) for _ in range(repeats)])[:length]
+        return np.tile(pool, repeats)[:length]
+
+    def __iter__(self):
+        if self.data_source.is_epoch_dependent:
+            # Items of the datasets moved with a reshuffle of the data source
+            self.data_source.compile_index_map()
+            self._count_top_datasets_length()
+        rng = np.random.default_rng([self.seed, self.epoch, self._iteration])
+        self._iteration += 1
+        batches: list[np.ndarray] = []
+        # Sort keys of the batches when not shuffled
+        batches_keys: list[float] = []
+        for dataset_idx, (pool, batch_size, batches_count) in enumerate(
+            zip(self.pools, self.batch_sizes, self._batches_counts())
+        ):
+            if not batches_count:
+                continue
+            if self.mixing_weights is None:
+                pool = self._shard(self._permuted_pool(pool, rng))
+            else:
+                length = batches_count * batch_size * self.num_replicas
+                pool = self._permuted_pool(pool, rng, length)[self.rank :: self.num_replicas]
+            full_count = len(pool) // batch_size
+            c_batches = list(pool[: full_count * batch_size].reshape(full_count, batch_size))
+            if full_count < batches_count:
+                c_batches.append(pool[full_count * batch_size :])
+            batches.extend(c_batches)
+            if self.mixing_weights is not None:
+                # Datasets interleaved in the proportions of their batches
+                batches_keys.extend((j + 1) / batches_count for j in range(batches_count))
+            else:
+                # As if items were walked in order, batches are complete at their last item
+                # and the incomplete ones are sampled last
+                batches_keys.extend(int(batch[-1]) for batch in c_batches[:full_count])
+                incomplete_count = len(c_batches) - full_count
+                batches_keys.extend([len(self.data_source) + dataset_idx] * incomplete_count)
+        if self.shuffle:
+            order = rng.permutation(len(batches))
+        else:
+            order = np.argsort(batches_keys, kind="stable")
+        for batch_idx in order.tolist():
+            yield batches[batch_idx].tolist()
 
     def __len__(self):
-        total_length = sum(
-            [
-                self.combined_dataset_count[dst_idx] // bs
-                for dst_idx, bs in enumerate(self.batch_sizes)
-            ]
-        )
-        return total_length
+        return sum(self._batches_counts())
@@ -0,0 +1,73 @@
+import collections.abc
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from dl_cm.common.data.datasets import BaseDataset
+from dl_cm.common.data.datasets.metadata_index import MetadataIndex, as_metadata_index
+
+from . import BaseSampler
+
+
+class MetadataWeightedRandomSampler(BaseSampler):
+    """
+    MetadataWeightedRandomSampler: Sample items with weights given by a metadata index.
+
+    The weight of every item of the data source is evaluated once on whole columns of a
+    metadata index, see `build_metadata_index`, without loading the items, eg:
+    "1 + 4 * (class_3 > 0)" to oversample the items holding a rare class. Items are then
+    drawn with probabilities proportional to their weights.
+
+    Orders are seeded by (seed, epoch), see `set_epoch`: the seed must be the same on all
+    ranks, it defaults to 0.
+    """
+
+    def __init__(
+        self,
+        data_source: BaseDataset,
+        metadata_index: str | Path | MetadataIndex,
+        weights: str | Callable,
+        *args,
+        num_samples: int = None,
+        replacement: bool = True,
+        key_fn: Callable = None,
+        seed: int = 0,
+        **kwargs,
+    ):
+        index = as_metadata_index(metadata_index)
+        rows = index.dataset_rows(data_source, key_fn)
+        self.weights: np.ndarray = index.query(weights, rows).astype(np.float64)
+        if len(self.weights) and (self.weights.min() < 0 or not self.weights.sum() > 0):
+            raise ValueError("Weights should be non negative, with a positive sum")
+        self.num_samples = len(self.weights) if num_samples is None else num_samples
+        if not replacement and self.num_samples > np.count_nonzero(self.weights):
+            raise ValueError(
+                f"Can not draw {self.num_samples} items without replacement from"
+                f" {np.count_nonzero(self.weights)} items of positive weight"
+            )
+        self.replacement = replacement
+        # Fixed rather than drawn, ranks seeded differently would draw different items
+        self.seed = seed
+        self.epoch = 0
+        self._iteration = 0
+        super().__init__(*args, **kwargs)
+
+    def set_epoch(self, epoch: int) -> None:
+        """Set the epoch seeding the sampling, called by Lightning before every epoch."""
+        self.epoch = epoch
+        self._iteration = 0
+
+    def __iter__(self) -> collections.abc.Iterator[int]:
+        rng = np.random.default_rng([self.seed, self.epoch, self._iteration])
+        self._iteration += 1
+        indices = rng.choice(
+            len(self.weights),
+            size=self.num_samples,
+            replace=self.replacement,
+            p=self.weights / self.weights.sum(),
+        )
+        yield from indices.tolist()
+
+    def __len__(self) -> int:
+        return self.num_samples
@@ -1,18 +1,17 @@
+import collections.abc
 import numbers
 import os
-from functools import partial
+from functools import cache, partial
 from pathlib import Path
 
 import numpy as np
 import torch
-from matplotlib import pyplot as plt
-from matplotlib.widgets import Slider
-from skimage.io import imread
-from torchvision.transforms import Resize
+from torchvision.transforms import InterpolationMode, Resize
 
 from dl_cm.common.data.datasets import BaseDataset
-from dl_cm.common.data.datasets.filtered_dataset import FilteredItemsDataset
-from dl_cm.common.data.datasets.images_dataset import ImagesWithinDirectoryDataset
+from dl_cm.common.data.datasets.images_dataset import DEFAULT_IMAGES_EXTENSIONS
+from dl_cm.common.data.image_decoders import TorchvisionDecoder
+from dl_cm.common.data.transformations.batch_transformation import BatchOneHot
 from dl_cm.common.data.datasets.folder_dataset import ListDirectoryDataset
 from dl_cm.common.data.datasets.items_dataset import CrossDataset
 from dl_cm.common.data.transformations.general_transformation import (
@@ -29,6 +28,25 @@ from dl_cm.common.data.transformations.tensor_transformation import (
 )
 from dl_cm.common.typing import StepInputStruct
 
+VOC_IGNORE_INDEX = 255  # label of colors out of the colormap, eg: VOC void borders
+LABEL_FORMATS = {"onehot": torch.float32, "int64": torch.int64, "uint8": torch.uint8}
+
+
+def pack_rgb(mask: torch.Tensor) -> torch.Tensor:
+    """24 bits keys of the colors of a [..., 3] uint8 tensor."""
+    mask = mask.to(torch.int64)
+    return (mask[..., 0] << 16) | (mask[..., 1] << 8) | mask[..., 2]
+
+
+@cache
+def color_lookup_table(colormap: tuple[tuple[int, int, int]]) -> torch.Tensor:
+    """Table of the class id of every 24 bits color, VOC_IGNORE_INDEX for colors out of the colormap."""
+    lookup_table = torch.full((2**24,), VOC_IGNORE_INDEX, dtype=torch.uint8)
+    lookup_table[pack_rgb(torch.tensor(colormap, dtype=torch.uint8))] = torch.arange(
+        len(colormap), dtype=torch.uint8
+    )
+    return lookup_table
+
 
 class VocDataset(BaseDataset):
     VOC_COLORMAP = [
@@ -55,33 +73,66 @@ class VocDataset(BaseDataset):
         [0, 64, 128],
     ]
 
-    def __init__(self, root_dir, *args, **kwargs):
+    def __init__(
+        self,
+        root_dir,
+        image_dtype: str = "float32",
+        label_format: str = "onehot",
+        *args,
+        **kwargs,
+    ):
         super().__init__(*args, **kwargs)
+        # None keeps uint8 images, eg: to cast batches on device with BatchNormalization
+        self.image_dtype = getattr(torch, image_dtype) if image_dtype else None
+        # onehot [H, W, num_classes] float labels, or int64/uint8 [H, W] label maps,
+        # eg: to feed a CrossEntropyLoss or expand them on device with BatchOneHot
+        if label_format not in LABEL_FORMATS:
+            raise ValueError(
+                f"Unknown label format {label_format}, expected one of {list(LABEL_FORMATS)}"
+            )
+        self.label_format = label_format
         target_dir = os.path.join(root_dir, "SegmentationClass")
         images_dir = os.path.join(root_dir, "JPEGImages")
         self.images_path_dataset = ListDirectoryDataset(
-            directory_path=images_dir
-        ).compose(FilteredItemsDataset, ImagesWithinDirectoryDataset.is_image_fp)
-
+            directory_path=images_dir, extensions=DEFAULT_IMAGES_EXTENSIONS
+        )
         self.target_path_dataset = ListDirectoryDataset(
-            directory_path=target_dir
-        ).compose(FilteredItemsDataset, ImagesWithinDirectoryDataset.is_image_fp)
+            directory_path=target_dir, extensions=DEFAULT_IMAGES_EXTENSIONS
+        )
+
+        self.decoder = TorchvisionDecoder(mode="RGB")
 
         self.cross_dataset = CrossDataset(
             datasets=[self.images_path_dataset, self.target_path_dataset],
             hash_fns=lambda x: Path(x).stem,
         )
 
+    def read_image(self, fp: str) -> torch.Tensor:
+        # Items are channels last
+        return self.decoder(fp).permute(1, 2, 0)
+
+    def load_item(self, cross_items: list[str]) -> dict:
+        image = self.read_image(cross_items[0])
+        if self.image_dtype is not None:
+            image = image.to(self.image_dtype)
+        input_dict = {"image": image}
+        label_map = self.convert_to_label_map(self.read_image(cross_items[1]))
+        if self.label_format == "onehot":
+            label = self.label_map_to_one_hot(label_map)
+        else:
+            label = label_map.to(LABEL_FORMATS[self.label_format])
+        target_dict = {"label": label}
+        return {"inputs": input_dict, "targets": target_dict}
+
+    def __getitems__(self, indices: collections.abc.Sequence[int]) -> list[dict]:
+        return [
+            self.load_item(cross_items)
+            for cross_items in self.cross_dataset.__getitems__(indices)
+        ]
+
     def __getitem__(self, index: numbers.Integral | slice):
         if isinstance(index, numbers.Integral):
-            cross_items = self.cross_dataset[index]
-            input_dict = {"image": torch.from_numpy(imread(cross_items[0])).float()}
-            target_dict = {
-                "label": self.convert_to_segmentation_mask(
-                    torch.from_numpy(imread(cross_items[1]))
-                )
-            }
-            return {"inputs": input_dict, "targets": target_dict}
+            return self.load_item(self.cross_dataset[index])
         else:
             sub_indices = range(
                 index.start, index.stop, index.step if index.step else 1
@@ -89,10 +140,30 @@ class VocDataset(BaseDataset):
             loaded_slice = [self.__getitem__(i) for i in sub_indices]
             return loaded_slice
 
+    def convert_to_label_map(self, mask: torch.Tensor) -> torch.Tensor:
+        """
+        Converts a color segmentation mask to a map of class ids as defined in self.VOC_COLORMAP,
+        with a single lookup of the 24 bits packed colors.
+
+        Args:
+            mask (torch.Tensor): Input uint8 mask of shape [height, width, 3].
+
+        Returns:
+            torch.Tensor: uint8 label map of shape [height, width], pixels of colors out of the
+                colormap are labeled VOC_IGNORE_INDEX.
+        """
+        lookup_table = color_lookup_table(tuple(map(tuple, self.VOC_COLORMAP)))
+        return lookup_table[pack_rgb(mask)]
+
+    def label_map_to_one_hot(self, label_map: torch.Tensor) -> torch.Tensor:
+        return BatchOneHot(
+            num_classes=len(self.VOC_COLORMAP), ignore_index=VOC_IGNORE_INDEX
+        ).one_hot(label_map)
+
     def convert_to_segmentation_mask(self, mask: torch.Tensor) -> torch.Tensor:
         """
         Converts a color segmentation mask to a multi-channel binary mask where each channel
-        corresponds to a class as defined in self.color_map, using vectorized operations.
+        corresponds to a class as defined in self.color_map.
 
         Args:
             mask (torch.Tensor): Input mask of shape [height, width, channels].
@@ -100,26 +171,12 @@ class VocDataset(BaseDataset):
         Returns:
             torch.Tensor: Segmentation mask of shape [height, width, num_classes].
         """
-        # Create a tensor from the color map with shape [num_classes, channels]
-        color_map_tensor = torch.tensor(
-            self.VOC_COLORMAP, dtype=mask.dtype, device=mask.device
-        )
-
-        # Expand dimensions so that mask has shape [height, width, 1, channels]
-        # and color_map_tensor has shape [1, 1, num_classes, channels]
-        mask_expanded = mask.unsqueeze(2)  # shape: [H, W, 1, channels]
-        color_map_expanded = color_map_tensor.unsqueeze(0).unsqueeze(
-            0
-        )  # shape: [1, 1, num_classes, channels]
-
-        # Compare pixel colors with each label using broadcasting and then check all channels match
-        segmentation_mask = (mask_expanded == color_map_expanded).all(dim=-1).float()
-        # segmentation_mask now has shape: [height, width, num_classes]
-
-        return segmentation_mask
+        return self.label_map_to_one_hot(self.convert_to_label_map(mask))
 
     @staticmethod
     def plot_item(item: StepInputStruct, axs=None):
+        from matplotlib import pyplot as plt
+
         if axs is None:
             _, axs = plt.subplots(1, 3, figsize=(20, 10))
         else:
@@ -127,8 +184,11 @@ class VocDataset(BaseDataset):
                 ax.clear()
         axs[0].imshow(item["inputs"]["image"].int())
         axs[1].imshow(item["inputs"]["image"].int())
-        axs[1].imshow(np.argmax(item["targets"]["label"], axis=-1), alpha=0.4)
-        axs[2].imshow(np.argmax(item["targets"]["label"], axis=-1))
+        label = item["targets"]["label"]
+        if label.dim() == 3:
+            label = np.argmax(label, axis=-1)
+        axs[1].imshow(label, alpha=0.4)
+        axs[2].imshow(label)
         plt.show()
 
     def __len__(self):
@@ -137,16 +197,28 @@ class VocDataset(BaseDataset):
 
 class VocPreprocessing(GeneralTransformation):
     @staticmethod
-    def item_images_resize(item: StepInputStruct, resize_operator) -> StepInputStruct:
+    def item_images_resize(
+        item: StepInputStruct, resize_operator, label_map_resize_operator
+    ) -> StepInputStruct:
         item["inputs"]["image"] = resize_operator(item["inputs"]["image"].T)
-        item["targets"]["label"] = resize_operator(item["targets"]["label"].T)
+        label = item["targets"]["label"]
+        if label.dim() == 2:
+            # Label maps are resized without interpolating class ids
+            item["targets"]["label"] = label_map_resize_operator(label.T[None])[0]
+        else:
+            item["targets"]["label"] = resize_operator(label.T)
         return item
 
     def __init__(self, image_size=(256, 256)):
         resize_operator = Resize(image_size)
+        label_map_resize_operator = Resize(
+            image_size, interpolation=InterpolationMode.NEAREST_EXACT
+        )
         super().__init__(
             partial(
-                VocPreprocessing.item_images_resize, resize_operator=resize_operator
+                VocPreprocessing.item_images_resize,
+                resize_operator=resize_operator,
+                label_map_resize_operator=label_map_resize_operator,
             )
         )
 
@@ -199,6 +271,9 @@ class VocTransFliplr(MultipleItemRevrsibleTransformation):
 
 
 if __name__ == "__main__":
+    from matplotlib import pyplot as plt
+    from matplotlib.widgets import Slider
+
     dataset = VocDataset(root_dir="E:/Documents/DATA/VOC2012_train_val/")
 
     # Create figure and subplots
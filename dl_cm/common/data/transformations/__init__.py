@@ -1,3 +1,13 @@
 from dl_cm.utils.registery import Registry
 
 TRANSFORMATION_REGISTRY = Registry("Transformation")
+
+
+from .batch_transformation import BatchAugmentation, BatchNormalization, BatchOneHot
+
+__all__ = [
+    "TRANSFORMATION_REGISTRY",
+    "BatchAugmentation",
+    "BatchNormalization",
+    "BatchOneHot",
+]
@@ -0,0 +1,191 @@
+import collections.abc
+from typing import Callable
+
+import torch
+import torch.nn.functional as F
+
+from .general_transformation import GeneralTransformation, GeneralTransformationFactory
+
+
+def apply_to_keys(
+    batch: dict, key_paths: list[list[str]], fn: Callable[[torch.Tensor], torch.Tensor]
+) -> dict:
+    """
+    Apply a function to the tensors at the given nested key paths of a batch.
+
+    Containers along the paths are copied, the given batch is left untouched.
+    """
+    batch = dict(batch)
+    for key_path in key_paths:
+        container = batch
+        for key in key_path[:-1]:
+            container[key] = dict(container[key])
+            container = container[key]
+        container[key_path[-1]] = fn(container[key_path[-1]])
+    return batch
+
+
+def gather_batch(batch, indices: torch.Tensor):
+    """Items of a collated batch at the given indices, along the first dimension."""
+    if isinstance(batch, torch.Tensor):
+        return batch.index_select(0, indices.to(batch.device))
+    if isinstance(batch, collections.abc.Mapping):
+        return {k: gather_batch(v, indices) for k, v in batch.items()}
+    if isinstance(batch, (list, tuple)):
+        return [batch[i] for i in indices.tolist()]
+    return batch
+
+
+def concatenate_batches(batches: list):
+    """Concatenate collated batches of the same structure along the first dimension."""
+    if isinstance(batches[0], torch.Tensor):
+        return torch.cat(batches)
+    if isinstance(batches[0], collections.abc.Mapping):
+        return {k: concatenate_batches([b[k] for b in batches]) for k in batches[0]}
+    if isinstance(batches[0], (list, tuple)):
+        return [item for batch in batches for item in batch]
+    return batches[0]
+
+
+class BatchAugmentation(GeneralTransformation):
+    """
+    Augment collated batches of (items, augmentation ids) emitted by a deferred AugmentedDataset.
+
+    Items are grouped by augmentation id, so that every augmentation is applied once per
+    batch on all its items, eg: a single `torch.rot90` on device. Augmentations must address
+    dimensions from the end (eg: spatial_dims=(-2, -1)) to apply to batched tensors.
+
+    Args:
+        augmentations (list): The augmentations of the deferred AugmentedDataset, in order.
+    """
+
+    def __init__(self, augmentations: list[str | GeneralTransformation]):
+        self.augmentations: list[GeneralTransformation] = (
+            GeneralTransformationFactory.create(augmentations)
+        )
+        super().__init__(self.augment_batch)
+
+    def augment_batch(self, batch_and_ids: tuple) -> dict:
+        batch, augmentations_ids = batch_and_ids
+        augmentations_ids = torch.as_tensor(augmentations_ids).cpu()
+        order = torch.argsort(augmentations_ids, stable=True)
+        groups_ids, groups_sizes = torch.unique_consecutive(
+            augmentations_ids[order], return_counts=True
+        )
+        augmented_groups = [
+            self.augmentations[augmentation_id](gather_batch(batch, group_indices))
+            for augmentation_id, group_indices in zip(
+                groups_ids.tolist(), torch.split(order, groups_sizes.tolist())
+            )
+        ]
+        # Restore the batch order
+        return gather_batch(concatenate_batches(augmented_groups), torch.argsort(order))
+
+
+class BatchNormalization(GeneralTransformation):
+    """
+    Cast and normalize tensors of a collated batch, meant to run on the task device.
+
+    Keeping samples in their decoded dtype (eg: uint8 images) through collation,
+    pinning and host to device copy, then casting whole batches on device, moves
+    4 times fewer bytes than casting every item to float32 in the dataset.
+
+    Args:
+        keys (Sequence[str]): Paths of the tensors to normalize within the batch,
+            nested keys being joined with dots (eg: "inputs.image").
+        mean (Sequence[float]): Per channel mean subtracted after scaling.
+        std (Sequence[float]): Per channel standard deviation dividing after centering.
+        scale (float): Factor applied first (eg: 1/255 to map uint8 images to [0, 1]).
+        dtype (str): Name of the torch dtype to cast to.
+        channel_dim (int): Dimension of the channels within batched tensors, eg: 1 for
+            [B, C, H, W] batches or -1 for channels last [B, H, W, C] batches (VOC items).
+            If None, it is inferred as the only one of them of the size of mean and std.
+    """
+
+    def __init__(
+        self,
+        keys: collections.abc.Sequence[str] = ("inputs.image",),
+        mean: collections.abc.Sequence[float] = None,
+        std: collections.abc.Sequence[float] = None,
+        scale: float = 1.0,
+        dtype: str = "float32",
+        channel_dim: int = None,
+    ):
+        self.keys = [key.split(".") for key in keys]
+        self.dtype = getattr(torch, dtype)
+        self.scale = scale
+        self.mean = torch.tensor(mean, dtype=self.dtype) if mean is not None else None
+        self.std = torch.tensor(std, dtype=self.dtype) if std is not None else None
+        self.channel_dim = channel_dim
+        super().__init__(self.normalize_batch)
+
+    def _item_channel_dim(self, item: torch.Tensor, channels_count: int) -> int:
+        if self.channel_dim is not None:
+            return self.channel_dim
+        candidates = {dim for dim in (1, item.dim() - 1) if item.shape[dim] == channels_count}
+        if len(candidates) != 1:
+            raise ValueError(
+                f"Can not infer the channels dimension of a {tuple(item.shape)} batch for"
+                f" {channels_count} channels statistics, set channel_dim"
+            )
+        return candidates.pop()
+
+    def _channel_stats(self, stats: torch.Tensor, item: torch.Tensor) -> torch.Tensor:
+        shape = [1] * item.dim()
+        shape[self._item_channel_dim(item, len(stats))] = -1
+        return stats.to(item.device).view(shape)
+
+    def normalize(self, item: torch.Tensor) -> torch.Tensor:
+        item = item.to(self.dtype)
+        if self.scale != 1.0:
+            item = item * self.scale
+        if self.mean is not None:
+            item = item - self._channel_stats(self.mean, item)
+        if self.std is not None:
+            item = item / self._channel_stats(self.std, item)
+        return item
+
+    def normalize_batch(self, batch: dict) -> dict:
+        return apply_to_keys(batch, self.keys, self.normalize)
+
+
+class BatchOneHot(GeneralTransformation):
+    """
+    Expand label maps of a collated batch to one-hot tensors, meant to run on the task device.
+
+    Compact label maps (eg: uint8 [B, H, W]) are much cheaper to load and transfer
+    than one-hot float tensors, for losses expecting the latter.
+
+    Args:
+        num_classes (int): Number of classes.
+        keys (Sequence[str]): Paths of the label maps within the batch, nested keys being
+            joined with dots (eg: "targets.label").
+        ignore_index (int): Label of pixels left with an all zeros one-hot vector.
+        dtype (str): Name of the torch dtype of one-hot tensors.
+        channel_dim (int): Dimension of classes within one-hot tensors.
+    """
+
+    def __init__(
+        self,
+        num_classes: int,
+        keys: collections.abc.Sequence[str] = ("targets.label",),
+        ignore_index: int = 255,
+        dtype: str = "float32",
+        channel_dim: int = -1,
+    ):
+        self.num_classes = num_classes
+        self.keys = [key.split(".") for key in keys]
+        self.ignore_index = ignore_index
+        self.dtype = getattr(torch, dtype)
+        self.channel_dim = channel_dim
+        super().__init__(self.one_hot_batch)
+
+    def one_hot(self, label_map: torch.Tensor) -> torch.Tensor:
+        label_map = label_map.long()
+        # Ignored pixels are mapped to an extra class, dropped afterwards
+        label_map = label_map.masked_fill(label_map == self.ignore_index, self.num_classes)
+        one_hot = F.one_hot(label_map, self.num_classes + 1)[..., : self.num_classes]
+        return one_hot.to(self.dtype).movedim(-1, self.channel_dim)
+
+    def one_hot_batch(self, batch: dict) -> dict:
+        return apply_to_keys(batch, self.keys, self.one_hot)
@@ -0,0 +1,184 @@
+"""
+Fused application of several geometric transformations to a batch.
+
+Test-time augmentation and equivariance losses apply T transformations to a batch of
+size B and concatenate the results into a [T*B, ...] batch, then reverse the T slices
+of the predictions. Applying every transformation and concatenating reads and writes
+every element twice. Transformations exposing a `strided_op` (rotations and flips, as a
+transposition view followed by flips) are instead written straight into their slice of
+a single preallocated buffer.
+
+Torch tensors cannot have negative strides and `torch.flip` has no `out` argument, flips
+are thus written with `torch.index_select` on reversed indices. Tensors requiring
+gradients are written with an in-place copy, which autograd supports.
+"""
+
+import collections.abc
+
+import torch
+
+from .general_transformation import GeneralTransformation
+from .multiple_items_transformation import MultipleItemRevrsibleTransformation
+
+
+def _reversed_indices(size: int, device: torch.device) -> torch.Tensor:
+    return torch.arange(size - 1, -1, -1, device=device)
+
+
+def write_strided_op(
+    out: torch.Tensor,
+    item: torch.Tensor,
+    transpose_dims: tuple[int, int] | None,
+    flip_dims: tuple[int, ...],
+) -> torch.Tensor:
+    """Write `item`, transposed along transpose_dims then flipped along flip_dims, into out."""
+    source = item.transpose(*transpose_dims) if transpose_dims else item
+    flip_dims = tuple(sorted(d % source.dim() for d in flip_dims))
+    if torch.is_grad_enabled() and (source.requires_grad or out.requires_grad):
+        # out= arguments do not support automatic differentiation
+        return out.copy_(source.flip(flip_dims) if flip_dims else source)
+    if not flip_dims:
+        return out.copy_(source)
+    if len(flip_dims) == 1:
+        dim = flip_dims[0]
+        return torch.index_select(
+            source, dim, _reversed_indices(source.shape[dim], source.device), out=out
+        )
+    last_dims = (source.dim() - 2, source.dim() - 1)
+    if flip_dims == last_dims and source.is_contiguous() and out.is_contiguous():
+        # Flipping both last dimensions reverses their flattened elements
+        flat_source = source.flatten(-2)
+        torch.index_select(
+            flat_source,
+            flat_source.dim() - 1,
+            _reversed_indices(flat_source.shape[-1], source.device),
+            out=out.view(*out.shape[:-2], -1),
+        )
+        return out
+    return out.copy_(source.flip(flip_dims))
+
+
+def _key_transformation(transformation, key):
+    """Transformation applied to the value of key by a dict transformation, None if untouched."""
+    if transformation is None:
+        return None
+    if transformation.included_keys(key):
+        return transformation.parent_transformation
+    return None
+
+
+def _transformed_shape(item: torch.Tensor, transformation, reverse: bool) -> torch.Size:
+    shape = list(item.shape)
+    if transformation is not None:
+        transpose_dims, _ = transformation.strided_op(reverse=reverse)
+        if transpose_dims:
+            first_dim, second_dim = transpose_dims
+            shape[first_dim], shape[second_dim] = shape[second_dim], shape[first_dim]
+    return torch.Size(shape)
+
+
+def _apply(item, transformation, reverse: bool):
+    if transformation is None:
+        return item
+    if reverse:
+        return transformation(item, reverse=True)
+    return transformation(item)
+
+
+def _fuse(items: list, transformations: list, reverse: bool, out):
+    first_item = items[0]
+    if isinstance(first_item, collections.abc.Mapping) and all(
+        t is None or isinstance(t, MultipleItemRevrsibleTransformation) for t in transformations
+    ):
+        return {
+            k: _fuse(
+                [item[k] for item in items],
+                [_key_transformation(t, k) for t in transformations],
+                reverse,
+                None if out is None else out[k],
+            )
+            for k in first_item
+        }
+    if not isinstance(first_item, torch.Tensor):
+        # Untouched values are repeated, transformed ones concatenated as merged batches are
+        transformed = [_apply(item, t, reverse) for item, t in zip(items, transformations)]
+        if isinstance(transformed[0], (torch.Tensor, collections.abc.Mapping)):
+            return _fuse(transformed, [None] * len(items), reverse, out)
+        if isinstance(transformed[0], (list, tuple)):
+            return [v for c_transformed in transformed for v in c_transformed]
+        return transformed[0]
+
+    if all(t is None or hasattr(t, "strided_op") for t in transformations):
+        shapes = {_transformed_shape(item, t, reverse) for item, t in zip(items, transformations)}
+        if len(shapes) > 1:
+            raise ValueError(f"Transformed items of different shapes {shapes} can not be fused")
+        writes = [
+            (item, t.strided_op(reverse=reverse) if t is not None else (None, ()))
+            for item, t in zip(items, transformations)
+        ]
+    else:
+        transformed = [_apply(item, t, reverse) for item, t in zip(items, transformations)]
+        shapes = {item.shape for item in transformed}
+        if len(shapes) > 1:
+            raise ValueError(f"Transformed items of different shapes {shapes} can not be fused")
+        writes = [(item, (None, ())) for item in transformed]
+
+    shape = shapes.pop()
+    if out is None:
+        out = first_item.new_empty((len(items) * shape[0], *shape[1:]))
+    for position, (item, (transpose_dims, flip_dims)) in enumerate(writes):
+        write_strided_op(
+            out[position * shape[0] : (position + 1) * shape[0]],
+            item,
+            transpose_dims,
+            flip_dims,
+        )
+    return out
+
+
+def fused_transform(
+    batch,
+    transformations: list[GeneralTransformation],
+    reverse: bool = False,
+    out=None,
+):
+    """
+    Apply every transformation to a batch, concatenating the results along the first dimension.
+
+    Equivalent to `concatenate_batches([t(batch) for t in transformations])` (or
+    `t(batch, reverse=True)`), without intermediate transformed batches for transformations
+    exposing a `strided_op`. Dict batches are walked through `MultipleItemRevrsibleTransformation`s
+    so that only their included keys are transformed.
+
+    Args:
+        batch: Tensor or (nested) dict of tensors of the same batch size.
+        transformations (list): Transformations to apply, None standing for the identity.
+        reverse (bool): Apply the reverse transformations.
+        out: Buffer of the same structure as the result to write the tensors into.
+    """
+    return _fuse([batch] * len(transformations), list(transformations), reverse, out)
+
+
+def _split(batch, parts: int) -> list:
+    if isinstance(batch, torch.Tensor):
+        return list(batch.chunk(parts))
+    if isinstance(batch, collections.abc.Mapping):
+        split_values = {k: _split(v, parts) for k, v in batch.items()}
+        return [{k: v[part] for k, v in split_values.items()} for part in range(parts)]
+    if isinstance(batch, (list, tuple)):
+        part_size = len(batch) // parts
+        return [batch[part * part_size : (part + 1) * part_size] for part in range(parts)]
+    return [batch] * parts
+
+
+def fused_split_transform(
+    batch,
+    transformations: list[GeneralTransformation],
+    reverse: bool = False,
+    out=None,
+):
+    """
+    Transform every slice of a [T*B, ...] batch with its respective transformation, eg: reverse
+    the transformations of a `fused_transform` on predictions. See `fused_transform`.
+    """
+    return _fuse(_split(batch, len(transformations)), list(transformations), reverse, out)
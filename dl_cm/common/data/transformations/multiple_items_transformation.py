@@ -1,5 +1,6 @@
 from .general_transformation import GeneralRevrsibleTransformation
 import copy
+import numpy as np
 from dl_cm.utils.exceptions import OutOfTypesException
 from typing import Union, Optional
 from collections.abc import Iterable, Callable
@@ -11,12 +12,43 @@ def is_iterable(v):
     except TypeError:
         return False
 
+def share_untouched(v):
+    """
+    Copy-on-write share of an untouched value, without copying data: numpy arrays become
+    read-only views of the input ones, so that writing them in place raises instead of
+    reaching the input (copy them first, eg: `np.array(v)`), and containers are shallow
+    copies of shared values, so that setting their keys leaves the input untouched.
+    Immutable values are shared, other values (eg: torch tensors, which can not be made
+    read-only) are deep copied. Batches of read-only arrays are collated without copies
+    nor warnings by `views_collate`.
+    """
+    if isinstance(v, np.ndarray):
+        view = v.view()
+        view.flags.writeable = False
+        return view
+    if type(v) is dict:
+        return {k: share_untouched(value) for k, value in v.items()}
+    if type(v) in (list, tuple):
+        return type(v)(share_untouched(value) for value in v)
+    if v is None or isinstance(v, (str, bytes, int, float, complex)):
+        return v
+    return copy.deepcopy(v)
+
 class MultipleItemRevrsibleTransformation(GeneralRevrsibleTransformation):
+    """
+    Applies a transformation to the included keys of an items dict.
+
+    Untouched values are shared copy-on-write with the input dict, see `share_untouched`:
+    in place edits of the output dict never reach the input one (eg: parent or cached
+    items). Set deepcopy_untouched to True to deep copy them instead.
+    """
     
     def __init__(self, parent_transformation: GeneralRevrsibleTransformation,
                  included_keys: Optional[Union[Iterable, Callable]] = None,
-                 ignored_keys: Optional[Union[Iterable, Callable]] = None):
+                 ignored_keys: Optional[Union[Iterable, Callable]] = None,
+                 deepcopy_untouched: bool = False):
         self.parent_transformation = parent_transformation
+        self.deepcopy_untouched = deepcopy_untouched
         
         if included_keys is not None and ignored_keys is not None:
             raise Exception("Include and exclude arguments are provided at the same time")
@@ -58,13 +90,16 @@ class MultipleItemRevrsibleTransformation(GeneralRevrsibleTransformation):
             return x not in self._ignored_set
         return True
         
+    def untouched_value(self, v):
+        return copy.deepcopy(v) if self.deepcopy_untouched else share_untouched(v)
+
     def __fwd__(self, items_dict:dict):
         out_items_dict = {}
         for k,v in items_dict.items():
             if self.included_keys(k):
                 out_items_dict[k] = self.parent_transformation.__fwd__(v)
             else:
-                out_items_dict[k] = copy.deepcopy(v)
+                out_items_dict[k] = self.untouched_value(v)
         return out_items_dict
     def __rwd__(self, items_dict):
         out_items_dict = {}
@@ -72,5 +107,5 @@ class MultipleItemRevrsibleTransformation(GeneralRevrsibleTransformation):
             if self.included_keys(k):
                 out_items_dict[k] = self.parent_transformation.__rwd__(v)
             else:
-                out_items_dict[k] = copy.deepcopy(v)
+                out_items_dict[k] = self.untouched_value(v)
         return out_items_dict
\ No newline at end of file
@@ -7,6 +7,20 @@ from dl_cm.utils.exceptions import OutOfTypesException
 
 from .general_transformation import GeneralRevrsibleTransformation
 
+# Geometric transformations of numpy arrays return strided views of their input,
+# without copying data. Torch tensors do not support negative strides, so that
+# flips and rotations of tensors are materialized with torch.flip and torch.rot90.
+
+
+def materialize(item):
+    """Contiguous copy of a strided view, item itself if already contiguous."""
+    if isinstance(item, np.ndarray):
+        return np.ascontiguousarray(item)
+    elif isinstance(item, torch.Tensor):
+        return item.contiguous()
+    else:
+        raise OutOfTypesException(item, (np.ndarray, torch.Tensor))
+
 
 class AlongPlaneTransformation:
     def __init__(self, spatial_dims):
@@ -19,9 +33,26 @@ class AlongDimensionTransformation:
 
 
 class Rotation2DTransformation(AlongPlaneTransformation):
+    times = 0  # number of 90 degrees rotations
+
     def __init__(self, spatial_dims=(-2, -1)):
         AlongPlaneTransformation.__init__(self, spatial_dims)
 
+    def strided_op(self, reverse=False) -> tuple[tuple[int, int] | None, tuple[int, ...]]:
+        """
+        Rotation as an optional transposition of spatial_dims followed by flips of dimensions
+        (as torch.rot90 does), eg: to write rotated tensors directly into a buffer.
+        """
+        first_dim, second_dim = self.spatial_dims
+        times = (-self.times if reverse else self.times) % 4
+        if times == 1:
+            return (first_dim, second_dim), (first_dim,)
+        if times == 2:
+            return None, (first_dim, second_dim)
+        if times == 3:
+            return (first_dim, second_dim), (second_dim,)
+        return None, ()
+
     @staticmethod
     def rot90_fn(item, times, axes=(-2, -1)):
         if isinstance(item, np.ndarray):
@@ -33,32 +64,50 @@ class Rotation2DTransformation(AlongPlaneTransformation):
 
 
 class TransRot90(Rotation2DTransformation, GeneralRevrsibleTransformation):
+    times = 1
+
     def __init__(self, spatial_dims=(-2, -1)):
         Rotation2DTransformation.__init__(self, spatial_dims)
         GeneralRevrsibleTransformation.__init__(
             self,
-            fwdfn=partial(Rotation2DTransformation.rot90_fn, times=1),
-            rwdfn=partial(Rotation2DTransformation.rot90_fn, times=3),
+            fwdfn=partial(
+                Rotation2DTransformation.rot90_fn, times=1, axes=self.spatial_dims
+            ),
+            rwdfn=partial(
+                Rotation2DTransformation.rot90_fn, times=3, axes=self.spatial_dims
+            ),
         )
 
 
 class TransRot180(Rotation2DTransformation, GeneralRevrsibleTransformation):
+    times = 2
+
     def __init__(self, spatial_dims=(-2, -1)):
         Rotation2DTransformation.__init__(self, spatial_dims)
         GeneralRevrsibleTransformation.__init__(
             self,
-            fwdfn=partial(Rotation2DTransformation.rot90_fn, times=2),
-            rwdfn=partial(Rotation2DTransformation.rot90_fn, times=2),
+            fwdfn=partial(
+                Rotation2DTransformation.rot90_fn, times=2, axes=self.spatial_dims
+            ),
+            rwdfn=partial(
+                Rotation2DTransformation.rot90_fn, times=2, axes=self.spatial_dims
+            ),
         )
 
 
 class TransRot270(Rotation2DTransformation, GeneralRevrsibleTransformation):
+    times = 3
+
     def __init__(self, spatial_dims=(-2, -1)):
         Rotation2DTransformation.__init__(self, spatial_dims)
         GeneralRevrsibleTransformation.__init__(
             self,
-            fwdfn=partial(Rotation2DTransformation.rot90_fn, times=3),
-            rwdfn=partial(Rotation2DTransformation.rot90_fn, times=1),
+            fwdfn=partial(
+                Rotation2DTransformation.rot90_fn, times=3, axes=self.spatial_dims
+            ),
+            rwdfn=partial(
+                Rotation2DTransformation.rot90_fn, times=1, axes=self.spatial_dims
+            ),
         )
 
 
@@ -66,20 +115,16 @@ class Transflip(AlongDimensionTransformation, GeneralRevrsibleTransformation):
     @staticmethod
     def flip_fn(item, dimension_index):
         if isinstance(item, np.ndarray):
-            return np.take(
-                item,
-                indices=np.arange(item.shape[dimension_index])[::-1],
-                axis=dimension_index,
-            )
+            return np.flip(item, axis=dimension_index)
         elif isinstance(item, torch.Tensor):
-            return torch.index_select(
-                item,
-                dimension_index,
-                torch.arange(item.size(dimension_index) - 1, -1, -1).to(item.device),
-            )
+            return torch.flip(item, dims=(dimension_index,))
         else:
             raise OutOfTypesException(item, (np.ndarray, torch.Tensor))
 
+    def strided_op(self, reverse=False) -> tuple[None, tuple[int]]:
+        """Flip as (no transposition, flipped dimension), see Rotation2DTransformation"""
+        return None, (self.dimension_index,)
+
     def __init__(self, dimension_index):
         AlongDimensionTransformation.__init__(self, dimension_index)
         GeneralRevrsibleTransformation.__init__(
@@ -1,3 +1,9 @@
+import torch
+
+from dl_cm.common.data.transformations.fused_transformation import (
+    fused_split_transform,
+    fused_transform,
+)
 from dl_cm.common.data.transformations.general_transformation import (
     GeneralRevrsibleTransformation,
     GeneralTransformation,
@@ -11,11 +17,46 @@ from dl_cm.common.typing import (
     lossOutputStruct,
     namedEntitySchema,
 )
-from dl_cm.utils.ppattern.batch_operations import (
-    get_batch_size_from_items_dict,
-    merge_multiple_batches,
-    split_into_batches,
-)
+
+
+def _slice_batch(batch, start: int, stop: int):
+    if isinstance(batch, torch.Tensor):
+        return batch[start:stop]
+    if isinstance(batch, dict):
+        return {k: _slice_batch(v, start, stop) for k, v in batch.items()}
+    return batch
+
+
+def _empty_repeated(batch, count: int):
+    """Uninitialized buffer of the structure of batch, `count` times larger along dimension 0"""
+    if isinstance(batch, torch.Tensor):
+        return batch.new_empty((count * batch.shape[0], *batch.shape[1:]))
+    if isinstance(batch, dict):
+        return {k: _empty_repeated(v, count) for k, v in batch.items()}
+    return batch
+
+
+def _copy_batch(out, batch):
+    if isinstance(batch, torch.Tensor):
+        out.copy_(batch)
+    elif isinstance(batch, dict):
+        for k, v in batch.items():
+            _copy_batch(out[k], v)
+
+
+def _batch_size(batch) -> int:
+    if isinstance(batch, torch.Tensor):
+        return batch.shape[0]
+    return next(_batch_size(v) for v in batch.values() if isinstance(v, (torch.Tensor, dict)))
+
+
+def _unflatten_batch(batch, count: int):
+    """View the [T*B, ...] tensors of a batch as [T, B, ...]"""
+    if isinstance(batch, torch.Tensor):
+        return batch.unflatten(0, (count, -1))
+    if isinstance(batch, dict):
+        return {k: _unflatten_batch(v, count) for k, v in batch.items()}
+    return batch
 
 
 class equivarianceEnforcedLearner(learnerWrapper, UnsupervisedLearner):
@@ -25,62 +66,144 @@ class equivarianceEnforcedLearner(learnerWrapper, UnsupervisedLearner):
             GeneralTransformation | GeneralRevrsibleTransformation | namedEntitySchema
         ],
         output_transformations: list[GeneralTransformation] = None,
+        chunk_size: int = None,
         *args,
         **kwargs,
     ):
+        """
+        Args:
+            input_transformations (list): Transformations applied to the input batch.
+            output_transformations (list): Transformations applied to the respective predictions,
+                by default the reverse of input transformations.
+            chunk_size (int): Number of input transformations per forward pass of the wrapped
+                learner, bounding activations memory. By default all of them at once.
+        """
         super().__init__(*args, **kwargs)
         # UnsupervisedLearner.__init__(self, config)
         self.input_transformations_callable: list[GeneralTransformation] = [
             GeneralTransformationFactory.create(t) for t in input_transformations
         ]
+        # Input transformations are kept for the reverse pass, as their strided ops
+        # allow writing reversed predictions in place (see fused_transformation)
+        self.reverse_output = not output_transformations
         if output_transformations:
             self.output_transformations_callable: list[GeneralTransformation] = [
                 GeneralTransformationFactory.create(t) for t in output_transformations
             ]
         else:
-            self.output_transformations_callable = [
-                ~t for t in self.input_transformations_callable
-            ]
+            self.output_transformations_callable = self.input_transformations_callable
+        self.chunk_size = chunk_size or len(self.input_transformations_callable)
 
-    def pre_step(self, batch: StepInputStruct, *args, **kwargs) -> StepInputStruct:
+    def pre_step(
+        self, batch: StepInputStruct, transformations_slice: slice = slice(None), *args, **kwargs
+    ) -> StepInputStruct:
         """
         Apply transformations to the input batch and merge the results into a single batch.
         The order of transformations is the same as the order of input_transformations in the config.
         The output of this function is a StepInputStruct which is the input for the underlying learner.
-        The output is used as the input for the underlying learner.
+        Transformed items are written directly into the merged batch.
         """
-        transformed_batches = [t(batch) for t in self.input_transformations_callable]
-        merged_batches = merge_multiple_batches(transformed_batches)
-        return merged_batches
+        return fused_transform(batch, self.input_transformations_callable[transformations_slice])
 
-    def post_step(self, batch: StepOutputStruct, *args, **kwargs) -> StepOutputStruct:
+    def reverse_predictions(
+        self, predictions, transformations_slice: slice = slice(None), out=None
+    ):
+        """
+        Apply output transformations to the respective slices of merged predictions,
+        writing them into `out` if given.
         """
-        Perform post-processing on the output batch by reversing transformations and computing losses and predictions.
+        return fused_split_transform(
+            predictions,
+            self.output_transformations_callable[transformations_slice],
+            reverse=self.reverse_output,
+            out=out,
+        )
+
+    def forward(self, batch: StepInputStruct, compute_loss=True) -> StepOutputStruct:
+        transformations_count = len(self.input_transformations_callable)
+        predictions = None
+        chunks_outputs = []
+        for start in range(0, transformations_count, self.chunk_size):
+            chunk = slice(start, min(start + self.chunk_size, transformations_count))
+            chunk_length = chunk.stop - chunk.start
+            output = self.wraped_learner.forward(
+                self.pre_step(batch, chunk), compute_loss=compute_loss
+            )
+            if predictions is None:
+                predictions = self.reverse_predictions(output["predictions"], chunk)
+                if chunk_length < transformations_count:
+                    # Reversed predictions of all chunks are written into a single buffer
+                    batch_size = _batch_size(predictions) // chunk_length
+                    first_predictions = predictions
+                    predictions = _empty_repeated(
+                        _slice_batch(first_predictions, 0, batch_size), transformations_count
+                    )
+                    _copy_batch(
+                        _slice_batch(predictions, 0, chunk.stop * batch_size), first_predictions
+                    )
+            else:
+                self.reverse_predictions(
+                    output["predictions"],
+                    chunk,
+                    out=_slice_batch(
+                        predictions, chunk.start * batch_size, chunk.stop * batch_size
+                    ),
+                )
+            chunks_outputs.append((chunk_length, output))
+        output = self.aggregate_chunks_outputs(chunks_outputs)
+        output["predictions"] = predictions
+        return self.post_step(output, compute_loss=compute_loss)
 
-        This function splits the prediction output into batches, applies the reverse of the transformations used during
-        pre-processing, and computes the relevant losses and aggregated predictions.
+    @staticmethod
+    def aggregate_chunks_outputs(chunks_outputs: list[tuple[int, dict]]) -> dict:
+        """Average losses of the wrapped learner over chunks, weighted by their length"""
+        if len(chunks_outputs) == 1:
+            return dict(chunks_outputs[0][1])
+        output = dict(chunks_outputs[-1][1])
+        if output["loss"] is None:
+            return output
+        total_length = sum(length for length, _ in chunks_outputs)
+        output["loss"] = sum(length * o["loss"] for length, o in chunks_outputs) / total_length
+        output["losses"] = lossOutputStruct(
+            name=output["losses"].name,
+            losses={
+                k: sum(length * o["losses"].losses[k] for length, o in chunks_outputs)
+                / total_length
+                for k in output["losses"].losses
+            },
+        )
+        return output
+
+    def post_step(
+        self, batch: StepOutputStruct, compute_loss=True, *args, **kwargs
+    ) -> StepOutputStruct:
         """
+        Compute the equivariance loss on reversed predictions and add it to the batch loss.
 
-        split_prediction: list[dict] = split_into_batches(
-            batch["predictions"], get_batch_size_from_items_dict(batch)
+        Predictions of every transformation are stacked along a new first dimension, ie: the
+        criterion receives [T, B, ...] tensors.
+        """
+        if not compute_loss:
+            return batch
+        predictions = _unflatten_batch(
+            batch["predictions"], len(self.input_transformations_callable)
         )
-        reverse_transformed_prediction = []
-        for c_prediction, c_respective_transform in zip(
-            split_prediction, self.output_transformations_callable
-        ):
-            reverse_transformed_prediction.append(c_respective_transform(c_prediction))
-
-        var_loss: lossOutputStruct = self.criteron_step(reverse_transformed_prediction)
-        if var_loss.losses.keys() & batch.loss.losses.keys():
+        var_loss: lossOutputStruct = self.criteron_step(predictions)
+        if not isinstance(batch["losses"], lossOutputStruct):
+            batch["loss"] = var_loss.value()
+            batch["losses"] = var_loss
+            return batch
+
+        if var_loss.losses.keys() & batch["losses"].losses.keys():
             raise RuntimeError(
-                f"Conflicting loss keys {list(var_loss.losses.keys() & batch.loss.losses.keys())}!"
+                "Conflicting loss keys "
+                f"{list(var_loss.losses.keys() & batch['losses'].losses.keys())}!"
             )
-
         # adding variance reduction loss to the batch loss and updating the losses dict
-        aggregated_var_losses = var_loss.losses[var_loss.name()]
-        batch.loss.losses[batch.loss.name()] += (
-            aggregated_var_losses  # TODO change aggregation of losses
+        batch["loss"] = batch["loss"] + var_loss.value()  # TODO change aggregation of losses
+        batch["losses"] = lossOutputStruct(
+            name=batch["losses"].name,
+            losses=batch["losses"].losses | var_loss.losses,
         )
-        batch.loss.losses |= var_loss.losses
-
+        batch["losses"].losses[batch["losses"].name] = batch["loss"]
         return batch
@@ -1,5 +1,4 @@
 import pydantic as pd
-import segmentation_models_pytorch as smp
 import torch
 
 from dl_cm.common.models import BaseModel
@@ -7,6 +6,8 @@ from dl_cm.common.models import BaseModel
 
 class SemanticSegmentationModel(BaseModel):
     def __init__(self, input_key, seg_output_key="seg_map", label_output_key="label_map", *args, **kwargs):
+        import segmentation_models_pytorch as smp
+
         super().__init__(*args, **kwargs)
         self.model = smp.create_model(*args, **kwargs)
         self.input_key = input_key
@@ -47,6 +47,26 @@ class BaseTask(pl.LightningModule, DLCM):
         loaded_task = task_class.load_from_checkpoint(ckpt_path, **kwargs)
         return loaded_task
 
+    def prepare_batch(self, batch: StepInputStruct) -> StepInputStruct:
+        """
+        Hook applied to every batch once moved to the task device, see `on_after_batch_transfer`.
+        Applies the device augmentation and preprocessing of the datamodule if any,
+        eg: rotating or casting and normalizing whole batches instead of every item.
+        """
+        datamodule = self._trainer.datamodule if self._trainer is not None else None
+        device_augmentation = getattr(datamodule, "device_augmentation", None)
+        if device_augmentation is not None:
+            batch = device_augmentation(batch)
+        device_preprocessing = getattr(datamodule, "device_preprocessing", None)
+        if device_preprocessing is not None:
+            batch = device_preprocessing(batch)
+        return batch
+
+    def on_after_batch_transfer(self, batch, dataloader_idx: int) -> StepInputStruct:
+        # Prepared before the steps, so that callbacks (eg: prediction writers) receive the
+        # augmented batch dicts rather than the (batch, augmentation ids) of deferred datasets
+        return self.prepare_batch(super().on_after_batch_transfer(batch, dataloader_idx))
+
     def step(self, batch: StepInputStruct, compute_loss=True) -> StepOutputStruct:
         step_output = self.learner.forward(batch, compute_loss=compute_loss)
         return step_output
@@ -1,3 +1,5 @@
+import functools
+
 import torch
 import torch.nn as nn
 from torchmetrics import MeanMetric, MetricCollection
@@ -13,6 +15,7 @@ from dl_cm.utils.registery import Registry
 CRITIREON_REGISTRY = Registry("Critireon")
 
 
+@functools.cache
 def base_loss_adapter(loss_cls: type[nn.modules.loss._Loss]):
     """Decorator to make any external loss inherit from BaseLoss
     and adapt output to lossOutputStruct
@@ -156,17 +159,21 @@ class CritireonFactory(BaseFactory[BaseLoss]):
         return BaseLoss
 
 
-for name in dir(nn.modules.loss):
-    attr = getattr(nn.modules.loss, name)
-    if isinstance(attr, type) and issubclass(attr, nn.modules.loss._Loss):
-        CRITIREON_REGISTRY.register(
-            obj=attr, name=name, base_class_adapter=base_loss_adapter
-        )
-
-import segmentation_models_pytorch as smp
-for name in dir(smp.losses):
-    attr = getattr(smp.losses, name)
-    if isinstance(attr, type) and issubclass(attr, nn.modules.loss._Loss):
-        CRITIREON_REGISTRY.register(
-            obj=attr, name=name, base_class_adapter=base_loss_adapter
-        )
+def _register_losses(losses_module) -> None:
+    for name in dir(losses_module):
+        attr = getattr(losses_module, name)
+        if isinstance(attr, type) and issubclass(attr, nn.modules.loss._Loss):
+            CRITIREON_REGISTRY.register(
+                obj=attr, name=name, base_class_adapter=base_loss_adapter
+            )
+
+
+def _register_smp_losses() -> None:
+    import segmentation_models_pytorch.losses
+
+    _register_losses(segmentation_models_pytorch.losses)
+
+
+_register_losses(nn.modules.loss)
+# segmentation_models_pytorch takes seconds to import, its losses are registered on demand
+CRITIREON_REGISTRY.register_lazy_loader(_register_smp_losses)
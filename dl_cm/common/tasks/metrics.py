@@ -1,3 +1,5 @@
+import functools
+
 import torchmetrics
 from torchmetrics.metric import Metric
 from typing import Callable
@@ -11,6 +13,37 @@ from dl_cm.common.functions import FunctionsFactory
 METRICS_REGISTRY = Registry("Metrics")
 
 
+@functools.cache
+def _wrapped_metric_class(metric_cls: type[Metric]) -> type:
+    """Dict inputs subclass of a metric class, created once per metric class."""
+
+    class WrappedMetric(metric_cls, BaseMetric):
+        preds_preprocessor: Callable = None
+        target_preprocessor: Callable = None
+
+        def instance_name(self):
+            if self._instance_count[metric_cls] == 0:
+                return metric_cls.__name__
+            else:
+                self._instance_count[metric_cls] += 1
+                return f"{metric_cls.__name__}_{self._instance_count[metric_cls] - 1}"
+
+        def update(self, preds: dict, target: dict = None):
+            pred_tensor = preds[self.preds_key] if self.preds_key else preds
+            if self.preds_preprocessor:
+                pred_tensor = self.preds_preprocessor(pred_tensor)
+            if target is None:
+                super().update(pred_tensor)
+                return
+            target_tensor = target[self.target_key] if self.target_key else target
+            if self.target_preprocessor:
+                target_tensor = self.target_preprocessor(target_tensor)
+            super().update(pred_tensor, target_tensor)
+
+    return WrappedMetric
+
+
+@functools.cache
 def base_metric_adapter(metric_cls: type[Metric]):
     """Wrap a torchmetrics.Metric (even factory ones like F1Score) to work with dict inputs."""
 
@@ -29,32 +62,15 @@ def base_metric_adapter(metric_cls: type[Metric]):
         
         metric_instance = metric_cls(*args, **kwargs)
 
-        # Step 2: Create a dynamic subclass of the *instance’s class*
-        class WrappedMetric(metric_instance.__class__, BaseMetric):
-
-            def instance_name(self):
-                if self._instance_count[metric_instance.__class__] == 0:
-                    return metric_instance.__class__.__name__
-                else:
-                    self._instance_count[metric_instance.__class__] += 1
-                    return (
-                        f"{metric_instance.__class__.__name__}_{self._instance_count[metric_instance.__class__] - 1}"
-                    )
-
-            def update(self, preds: dict, target: dict = None):
-                pred_tensor = preds[self.preds_key] if self.preds_key else preds
-                pred_tensor = preds_preprocessor(pred_tensor) if preds_preprocessor else pred_tensor
-                if target is None:
-                    super().update(pred_tensor)
-                    return
-                target_tensor = target[self.target_key] if self.target_key else target
-                target_tensor = target_preprocessor(target_tensor) if target_preprocessor else target_tensor
-                super().update(pred_tensor, target_tensor)
-
-        # Step 3: Create a new instance WITHOUT re-calling __init__
-        wrapped = WrappedMetric.__new__(WrappedMetric)
-        wrapped.__dict__ = metric_instance.__dict__.copy()  # copy state
+        # Step 2: Switch the instance to the cached subclass of the *instance’s class*,
+        # its state is kept as is, without re-calling __init__
+        wrapped = metric_instance
+        wrapped.__class__ = _wrapped_metric_class(metric_instance.__class__)
         BaseMetric.__init__(wrapped, preds_key, target_key)  # initialize BaseMetric separately
+        wrapped.preds_preprocessor = preds_preprocessor
+        wrapped.target_preprocessor = target_preprocessor
+        # Metric.__init__ wrapped the update of the metric class, wrap the dict inputs one
+        wrapped.update = wrapped._wrap_update(type(wrapped).update.__get__(wrapped))
 
         return wrapped
 
@@ -79,18 +95,17 @@ class MetricsFactory(BaseFactory[BaseMetric]):
             return (BaseMetric,)
         return BaseMetric
 
-import torchmetrics.segmentation
-# Register all torchmetrics metrics
-for name in dir(torchmetrics):
-    attr = getattr(torchmetrics, name)
-    if isinstance(attr, type) and issubclass(attr, Metric):
-        METRICS_REGISTRY.register(
-            obj=attr, name=attr.__name__, base_class_adapter=base_metric_adapter
-        )
-
-for name in dir(torchmetrics.segmentation):
-    attr = getattr(torchmetrics.segmentation, name)
-    if isinstance(attr, type) and issubclass(attr, Metric):
-        METRICS_REGISTRY.register(
-            obj=attr, name=attr.__name__, base_class_adapter=base_metric_adapter
-        )
+def _register_metrics() -> None:
+    import torchmetrics.segmentation
+
+    # Register all torchmetrics metrics
+    for metrics_module in (torchmetrics, torchmetrics.segmentation):
+        for name in dir(metrics_module):
+            attr = getattr(metrics_module, name)
+            if isinstance(attr, type) and issubclass(attr, Metric):
+                METRICS_REGISTRY.register(
+                    obj=attr, name=attr.__name__, base_class_adapter=base_metric_adapter
+                )
+
+
+METRICS_REGISTRY.register_lazy_loader(_register_metrics)
@@ -34,6 +34,8 @@ _ = DLCM.base_class_adapter(LearningRateFinder, base_cls=baseCallback)
 _ = DLCM.base_class_adapter(LearningRateMonitor, base_cls=baseCallback)
 _ = DLCM.base_class_adapter(BasePredictionWriter, base_cls=baseCallback)
 
+from .cache_stats_callback import CacheStatsLoggingCallback
+from .dataset_epoch_callback import DatasetsEpochCallback
 from .metric_logging_callback import MetricsLoggingCallback
 from .metric_track_callback import metricTrackCallback
 from .prediction_writer import ImagesPredictionWriter, PostPredictionCallback
@@ -41,6 +43,8 @@ from .prediction_writer import ImagesPredictionWriter, PostPredictionCallback
 __all__ = [
     "baseCallback",
     "CallbacksFactory",
+    "CacheStatsLoggingCallback",
+    "DatasetsEpochCallback",
     "MetricsLoggingCallback",
     "metricTrackCallback",
     "ImagesPredictionWriter",
@@ -0,0 +1,51 @@
+import lightning as pl
+
+from dl_cm.common.data.datasets import CompositionDataset
+from dl_cm.common.data.datasets.memory_cached_dataset import MemoryCachedDataset
+from dl_cm.common.trainer.callbacks import baseCallback
+
+
+class CacheStatsLoggingCallback(baseCallback):
+    """
+    Log the counters of the in-memory caches (MemoryCachedDataset) found along the
+    datamodule datasets at the end of every training and validation epoch.
+    """
+
+    def __init__(
+        self,
+        stats: list[str] = ("hit_rate", "cached_bytes"),
+        reset_on_epoch_end: bool = True,
+        *args,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.stats = stats
+        self.reset_on_epoch_end = reset_on_epoch_end
+
+    @staticmethod
+    def memory_caches(trainer: pl.Trainer) -> dict[str, MemoryCachedDataset]:
+        caches = {}
+        datasets = getattr(trainer.datamodule, "datasets", {})
+        for c_dataset_ref_name, c_dataset in datasets.items():
+            while isinstance(c_dataset, CompositionDataset):
+                if isinstance(c_dataset, MemoryCachedDataset):
+                    caches[c_dataset_ref_name] = c_dataset
+                    break
+                c_dataset = c_dataset.parent_dataset
+        return caches
+
+    def log_stats(self, trainer: pl.Trainer, pl_module: pl.LightningModule) -> None:
+        for c_dataset_ref_name, c_cache in self.memory_caches(trainer).items():
+            cache_stats = c_cache.cache_stats()
+            for c_stat in self.stats:
+                pl_module.log(
+                    f"{c_dataset_ref_name}_cache_{c_stat}", float(cache_stats[c_stat])
+                )
+            if self.reset_on_epoch_end:
+                c_cache.reset_stats()
+
+    def on_train_epoch_end(self, trainer: pl.Trainer, pl_module: pl.LightningModule) -> None:
+        self.log_stats(trainer, pl_module)
+
+    def on_validation_epoch_end(self, trainer: pl.Trainer, pl_module: pl.LightningModule) -> None:
+        self.log_stats(trainer, pl_module)
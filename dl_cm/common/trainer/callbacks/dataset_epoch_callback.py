@@ -0,0 +1,18 @@
+import lightning as pl
+
+from dl_cm.common.trainer.callbacks import baseCallback
+
+
+class DatasetsEpochCallback(baseCallback):
+    """
+    Set the current epoch of the datamodule datasets at the start of every training epoch, so
+    that streaming datasets reshuffle their shards and shuffle buffers, and per-epoch
+    ShuffledDatasets their items.
+
+    DataLoader workers are started after this hook, unless they are persistent.
+    """
+
+    def on_train_epoch_start(self, trainer: pl.Trainer, pl_module: pl.LightningModule) -> None:
+        datasets = getattr(trainer.datamodule, "datasets", {})
+        for c_dataset in datasets.values():
+            c_dataset.set_epoch(trainer.current_epoch)
@@ -1,5 +1,4 @@
 from pathlib import Path
-from skimage.io import imsave
 from lightning.pytorch.callbacks import BasePredictionWriter, Callback
 from dl_cm.common.trainer.callbacks import baseCallback
 import os
@@ -29,6 +28,8 @@ class ImagesPredictionWriter(BasePredictionWriter, baseCallback):
         batch_idx,
         dataloader_idx,
     ):
+        from skimage.io import imsave
+
         # TODO: Treat more edge cases (this is very weak impl)
         preds, filenames = prediction["predictions"][self.predicted_map_key], batch["inputs"]["id"]
         preds = preds.cpu().numpy().astype('uint8') * 255
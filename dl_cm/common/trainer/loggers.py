@@ -24,14 +24,18 @@ class LoggersFactory(BaseFactory[BaseLogger]):
 
 import lightning.pytorch.loggers as pl_loggers
 
-for name in dir(pl_loggers):
-    attr = getattr(pl_loggers, name)
-    if isinstance(attr, type) and issubclass(attr, pl_loggers.Logger):
-        _ = DLCM.base_class_adapter(attr, base_cls=BaseLogger)
+
+def _register_loggers() -> None:
+    for name in dir(pl_loggers):
+        attr = getattr(pl_loggers, name)
+        if isinstance(attr, type) and issubclass(attr, pl_loggers.Logger):
+            _ = DLCM.base_class_adapter(attr, base_cls=BaseLogger)
+
+
+LOGGERS_REGISTERY.register_lazy_loader(_register_loggers)
 
 
 from lightning.pytorch.loggers import WandbLogger, TensorBoardLogger
-import wandb
 import torch, numpy
 from typing import Union, List
 
@@ -60,6 +64,8 @@ def log_image_all_loggers(
                 logger.experiment.add_image(tag, image_np, step, dataformats=dataformats)
             
             elif isinstance(logger, WandbLogger):
+                import wandb
+
                 logger.experiment.log({
                     tag: wandb.Image(image_np),
                     "epoch": trainer.current_epoch,
@@ -22,9 +22,13 @@ class PluginsFactory(BaseFactory[BasePlugin]):
         return BasePlugin
 
 
-import lightning.pytorch.plugins as pl_plugins
+def _register_plugins() -> None:
+    import lightning.pytorch.plugins as pl_plugins
 
-for name in dir(pl_plugins):
-    attr = getattr(pl_plugins, name)
-    if isinstance(attr, type) and attr.__module__ == pl_plugins.__name__:
-        _ = DLCM.base_class_adapter(attr, base_cls=BasePlugin)
+    for name in dir(pl_plugins):
+        attr = getattr(pl_plugins, name)
+        if isinstance(attr, type) and attr.__module__ == pl_plugins.__name__:
+            _ = DLCM.base_class_adapter(attr, base_cls=BasePlugin)
+
+
+PLUGINS_REGISTERY.register_lazy_loader(_register_plugins)
@@ -1,12 +1,18 @@
+import copy
 import os
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import torch
 import yaml
 
-from dl_cm.common.typing import namedEntitySchema
 from dl_cm.utils.registery import Registry
 
+if TYPE_CHECKING:
+    # Imported by dl_cm.common itself, through the factories
+    from dl_cm.common.typing import namedEntitySchema
+
 
 # Define a custom constructor for the `!tensor` tag
 def tensor_constructor(loader, node):
@@ -34,6 +40,43 @@ def tensor_constructor(loader, node):
 yaml.SafeLoader.add_constructor("!tensor", tensor_constructor)
 
 
+# Files included by the config being opened, see open_config_file
+_included_files = threading.local()
+
+
+# Parsed included files by (path, loader), along with the stamps of the files they include
+_parsed_files: dict[tuple, tuple] = {}
+
+
+def _files_stamps(files: tuple) -> tuple:
+    return tuple(os.stat(file_path).st_mtime_ns for file_path in files)
+
+
+def _parse_included_file(file_path: str, loader_cls: type) -> tuple:
+    # Parsed once per version of the file and of the files it includes, recursively
+    cached = _parsed_files.get((file_path, loader_cls))
+    if cached is not None:
+        content, files, stamps = cached
+        try:
+            if _files_stamps(files) == stamps:
+                return content, files
+        except OSError:
+            pass
+    nested_files = []
+    previous = getattr(_included_files, "files", None)
+    _included_files.files = nested_files
+    try:
+        stamp = os.stat(file_path).st_mtime_ns
+        with open(file_path, "r") as f:
+            content = yaml.load(f, Loader=loader_cls)
+    finally:
+        _included_files.files = previous
+    files = (file_path, *dict.fromkeys(nested_files))
+    stamps = (stamp, *_files_stamps(files[1:]))
+    _parsed_files[(file_path, loader_cls)] = (content, files, stamps)
+    return content, files
+
+
 def include_constructor(loader, node):
     # Get the path of the current YAML file
     current_file = loader.name
@@ -44,22 +87,37 @@ def include_constructor(loader, node):
 
     # Resolve the absolute path
     file_path = Path(current_dir, relative_path).resolve().as_posix()
-    # Load and return the content of the included YAML file
-    with open(file_path, "r") as f:
-        return yaml.load(f, Loader=type(loader))
+    # Load and return the content of the included YAML file, a file included several times
+    # is read once
+    content, files = _parse_included_file(file_path, type(loader))
+    if getattr(_included_files, "files", None) is not None:
+        _included_files.files.extend(files)
+    # Copied as configs are modified when loading entities
+    return copy.deepcopy(content)
 
 
 # Add the constructor to the PyYAML loader
 yaml.add_constructor("!include", include_constructor, Loader=yaml.SafeLoader)
 
 
-def open_config_file(conf_file_path: str) -> dict:
-    with open(conf_file_path, "r") as f:
-        config = yaml.safe_load(f)
-        return config
+def open_config_file(conf_file_path: str, included_files: list[str] = None) -> dict:
+    """
+    Parse a yaml config file, resolving its `!include` tags.
+
+    :param conf_file_path: path to a yaml configuration file
+    :param included_files: list filled with the paths of the files included by the config
+    """
+    previous = getattr(_included_files, "files", None)
+    _included_files.files = [] if included_files is None else included_files
+    try:
+        with open(conf_file_path, "r") as f:
+            config = yaml.safe_load(f)
+            return config
+    finally:
+        _included_files.files = previous
 
 
-def load_named_entity(registry: Registry, entity_config: namedEntitySchema):
+def load_named_entity(registry: Registry, entity_config: "namedEntitySchema"):
     entity_cls = registry.get(entity_config.name)
     entity_params = entity_config.params
     return entity_cls(**entity_params)
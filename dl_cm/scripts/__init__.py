@@ -1,2 +1,4 @@
 from .common_scripts.base_training_command import BaseTrainingCommand
-from .common_scripts.base_prediction_command import BasePredictionCommand 
\ No newline at end of file
+from .common_scripts.base_prediction_command import BasePredictionCommand
+from .common_scripts.base_export_command import BaseExportCommand
+from .common_scripts.base_compile_command import BaseCompileCommand
@@ -0,0 +1,73 @@
+"""
+DL-CM command line interface
+
+This module groups the DL-CM scripts under a single [dl_cm] click command.
+
+Subcommands are imported on invocation only: training, prediction and export import
+torch, lightning and the registered third party libraries, which take seconds, while
+listing the commands (eg: `dl_cm --help`) only imports click.
+
+Example
+-------
+
+>>> dl_cm train --config path/to/config.yaml --ckpt path/to/checkpoint
+>>> dl_cm compile --config_path path/to/config.yaml
+>>> python -m dl_cm --help
+
+"""
+
+import importlib
+
+import click
+
+# Command name -> ("module:command", short help shown without importing the module)
+LAZY_COMMANDS: dict[str, tuple[str, str]] = {
+    "compile": (
+        "dl_cm.scripts.compile:compile",
+        "Compile a configuration into a resolved and validated config artifact.",
+    ),
+    "train": ("dl_cm.scripts.train:train", "Train a model using the specified configuration."),
+    "predict": (
+        "dl_cm.scripts.predict:predict",
+        "Run prediction on a dataset using model saved within the checkpoint.",
+    ),
+    "export": ("dl_cm.scripts.export:export", "Export the datasets of a configuration to disk."),
+}
+
+
+class LazyGroup(click.Group):
+    """Click group importing the module of a subcommand when it is invoked."""
+
+    def __init__(self, *args, lazy_commands: dict[str, tuple[str, str]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, _, command_name = self.lazy_commands[cmd_name][0].partition(":")
+            command = getattr(importlib.import_module(module_name), command_name)
+            self.add_command(command, cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        rows = [
+            (name, self.lazy_commands[name][1])
+            if name in self.lazy_commands and name not in self.commands
+            else (name, self.commands[name].get_short_help_str())
+            for name in self.list_commands(ctx)
+        ]
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
+def cli():
+    """DL-CM: Deep Learning Configuration Manager."""
+
+
+if __name__ == "__main__":
+    cli()
@@ -2,8 +2,9 @@ import click
 from enum import Enum
 
 
-def output_folder_option(short_name="-o", long_name="--output_folder")->click.Option:
-    return click.option(short_name, long_name, type=click.Path(file_okay=False), help="Output folder for prediction!")
+def output_folder_option(short_name="-o", long_name="--output_folder", **kwargs)->click.Option:
+    kwargs.setdefault("help", "Output folder for prediction!")
+    return click.option(short_name, long_name, type=click.Path(file_okay=False), **kwargs)
 
 def input_folder_option(short_name="-i", long_name="--input_folder")->click.Option:
     return click.option(short_name, long_name, type=click.Path(exists=True, file_okay=False) ,help="Input folder to run inference!")
@@ -0,0 +1,33 @@
+import click
+
+from . import (
+    chain_decorators,
+    config_file_option,
+)
+
+BaseCompileCommand = chain_decorators(
+    click.command(),
+    config_file_option(),
+    click.option(
+        "-o",
+        "--output_path",
+        type=click.Path(dir_okay=False),
+        default=None,
+        help="Compiled config path, the config path with a .dlcm suffix by default!",
+    ),
+    click.option(
+        "--prediction",
+        is_flag=True,
+        default=False,
+        help="Validate against the prediction schema!",
+    ),
+)
+
+# pylint: disable=no-value-for-parameter
+if __name__ == "__main__":
+
+    @BaseCompileCommand
+    def main(config_path, output_path, prediction):
+        print(f"{config_path=} {output_path=} {prediction=}")
+
+    main()
@@ -0,0 +1,53 @@
+import click
+
+from . import (
+    chain_decorators,
+    config_file_option,
+    output_folder_option,
+)
+
+BaseExportCommand = chain_decorators(
+    click.command(),
+    config_file_option(),
+    output_folder_option(required=True, help="Output folder of exported datasets!"),
+    click.option(
+        "-f",
+        "--storage_format",
+        type=click.Choice(["shards", "memmap"]),
+        default="shards",
+        help="Storage format of exported datasets!",
+    ),
+    click.option(
+        "-w", "--num_workers", type=int, default=1, help="Number of writing processes!"
+    ),
+    click.option(
+        "-p",
+        "--items_per_part",
+        type=int,
+        default=1024,
+        help="Number of items written per part (shard)!",
+    ),
+    click.option(
+        "-r",
+        "--dataset_reference_name",
+        "dataset_reference_names",
+        multiple=True,
+        help="Reference name of a dataset to export, all datasets by default!",
+    ),
+)
+
+# pylint: disable=no-value-for-parameter
+if __name__ == "__main__":
+
+    @BaseExportCommand
+    def main(
+        config_path,
+        output_folder,
+        storage_format,
+        num_workers,
+        items_per_part,
+        dataset_reference_names,
+    ):
+        print(f"{config_path=} {output_folder=} {storage_format=} {dataset_reference_names=}")
+
+    main()
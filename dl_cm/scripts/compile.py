@@ -0,0 +1,57 @@
+"""
+Compile Script
+
+This module provides a script compiling a configuration file of the Deep Learning
+Configuration Manager (DL-CM) framework into a resolved and validated config artifact.
+
+It includes a [compile] click command that takes a configuration file, and writes its
+artifact, which the train, predict and export commands accept in place of the yaml file.
+
+The compilation process involves:
+
+* Parsing the configuration file and resolving its included files
+* Validating it against dlcm schema, or the prediction schema
+* Pickling the resolved configuration
+
+Usage
+-----
+
+To use this script, run it from the command line and pass in the path to a
+configuration file.
+
+Example
+-------
+
+>>> python compile.py --config_path path/to/config.yaml --output_path path/to/config.dlcm
+
+"""
+
+# pylint: disable=no-value-for-parameter
+from dl_cm import DEFAULT_SCHEMA_PATH, PREDICTION_SCHEMA_PATH
+from dl_cm import _logger as logger
+from dl_cm.scripts import BaseCompileCommand
+from dl_cm.utils.config_compiler import compile_config
+
+
+@BaseCompileCommand
+def compile(config_path: str, output_path: str, prediction: bool):
+    """
+    Compile a configuration into a resolved and validated config artifact.
+
+    Parameters
+    ----------
+    config_path : str
+        Path to the configuration file.
+    output_path : str
+        Path of the compiled config, the config path with a .dlcm suffix if None.
+    prediction : bool
+        Validate against the prediction schema rather than the training one.
+
+    """
+    schema_path = PREDICTION_SCHEMA_PATH if prediction else DEFAULT_SCHEMA_PATH
+    output_path = compile_config(config_path, output_path, schema_path)
+    logger.info(f"Compiled config written to {output_path}")
+
+
+if __name__ == "__main__":
+    compile()
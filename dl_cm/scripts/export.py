@@ -0,0 +1,89 @@
+"""
+Export Script
+
+This module provides a script materializing the datasets of a configuration to disk
+using the Deep Learning Configuration Manager (DL-CM) framework.
+
+It includes an [export] click command that takes a configuration file and an output
+folder, and writes every dataset of the datamodule, preprocessed but neither cached nor
+augmented, to a storage format read back by `ShardsDataset` or `MemmapTensorDataset`.
+
+The export process involves:
+
+* Loading the configuration file and validating it against dlcm schema
+* Creating the datamodule datasets, with their preprocessing
+* Writing every dataset with a process pool, resuming a previous interrupted export
+
+Usage
+-----
+
+To use this script, run it from the command line and pass in the path to a
+configuration file and an output folder.
+
+Example
+-------
+
+>>> python export.py --config_path path/to/config.yaml --output_folder path/to/exported -w 8
+
+"""
+
+# pylint: disable=no-value-for-parameter
+import os
+
+from dl_cm.common.data.datamodule import DataModulesFactory
+from dl_cm.common.data.datasets import BaseDataset
+from dl_cm.common.data.export import export_dataset
+from dl_cm.scripts import BaseExportCommand
+from dl_cm.utils.config_compiler import load_config
+
+
+def load_export_datasets(datamodule_config: dict) -> dict[str, BaseDataset]:
+    """Datasets of a datamodule configuration, preprocessed but neither cached nor augmented."""
+    params = dict(datamodule_config.get("params", {}))
+    params |= {"dataloaders": {}, "cache": None, "augmentation": None}
+    datamodule = DataModulesFactory.create({**datamodule_config, "params": params})
+    return datamodule.datasets
+
+
+@BaseExportCommand
+def export(
+    config_path: str,
+    output_folder: str,
+    storage_format: str,
+    num_workers: int,
+    items_per_part: int,
+    dataset_reference_names: tuple[str],
+):
+    """
+    Export the datasets of a configuration to disk.
+
+    Parameters
+    ----------
+    config_path : str
+        Path to the configuration file.
+    output_folder : str
+        Folder of exported datasets, one subfolder per dataset reference name.
+    storage_format : str
+        "shards" or "memmap".
+    num_workers : int
+        Number of processes writing a dataset concurrently.
+    items_per_part : int
+        Number of items per written part (shard).
+    dataset_reference_names : tuple[str]
+        Reference names of the datasets to export, all datasets if empty.
+
+    """
+    config: dict = load_config(config_path)
+    datasets = load_export_datasets(config.get("datamodule"))
+    for dataset_reference_name in dataset_reference_names or datasets.keys():
+        export_dataset(
+            datasets[dataset_reference_name],
+            os.path.join(output_folder, dataset_reference_name),
+            storage_format=storage_format,
+            num_workers=num_workers,
+            items_per_part=items_per_part,
+        )
+
+
+if __name__ == "__main__":
+    export()
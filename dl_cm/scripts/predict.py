@@ -32,9 +32,8 @@ from lightning import seed_everything
 from dl_cm.common.data.datamodule import DataModulesFactory
 from dl_cm.common.tasks import BaseTask
 from dl_cm.common.trainer import load_trainer
-from dl_cm.config_loaders import open_config_file
 from dl_cm.scripts import BasePredictionCommand
-from dl_cm.utils.config_validation import validate_config
+from dl_cm.utils.config_compiler import load_config
 from dl_cm import PREDICTION_SCHEMA_PATH
 
 @BasePredictionCommand
@@ -53,8 +52,7 @@ def predict(config_path: str, ckpt_path: str):
         Path to the checkpoint to be loaded.
 
     """
-    validate_config(config_path, PREDICTION_SCHEMA_PATH)
-    config: dict = open_config_file(config_path)
+    config: dict = load_config(config_path, PREDICTION_SCHEMA_PATH)
     loaded_datamodule = DataModulesFactory.create(config.get("datamodule"))
     loaded_trainer = load_trainer(**config.get("trainer"))
     loaded_task = BaseTask.load_from_checkpoint(ckpt_path)
@@ -32,9 +32,8 @@ from lightning import seed_everything
 from dl_cm.common.data.datamodule import DataModulesFactory
 from dl_cm.common.tasks import TasksFactory
 from dl_cm.common.trainer import load_trainer
-from dl_cm.config_loaders import open_config_file
 from dl_cm.scripts import BaseTrainingCommand
-from dl_cm.utils.config_validation import validate_config
+from dl_cm.utils.config_compiler import load_config
 
 
 @BaseTrainingCommand
@@ -57,8 +56,7 @@ def train(config_path: str, ckpt_path: str, seed: int = -1):
     """
     if seed != -1:
         seed_everything(seed, workers=True)
-    validate_config(config_path)
-    config: dict = open_config_file(config_path)
+    config: dict = load_config(config_path)
     loaded_datamodule = DataModulesFactory.create(config.get("datamodule"))
     loaded_trainer = load_trainer(**config.get("trainer"))
     loaded_task = TasksFactory.create(config.get("task"))
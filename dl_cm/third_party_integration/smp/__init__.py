@@ -1,11 +1,14 @@
-
-from segmentation_models_pytorch.losses import DiceLoss, SoftCrossEntropyLoss, JaccardLoss, SoftBCEWithLogitsLoss
 from dl_cm.common.tasks.criterion import CRITIREON_REGISTRY, base_loss_adapter
 
-CRITIREON_REGISTRY.register(
-    obj=SoftCrossEntropyLoss, name="SoftCrossEntropyLoss", base_class_adapter=base_loss_adapter
+# Imported on first use, segmentation_models_pytorch takes seconds to import
+CRITIREON_REGISTRY.register_lazy(
+    "SoftCrossEntropyLoss",
+    "segmentation_models_pytorch.losses:SoftCrossEntropyLoss",
+    base_class_adapter=base_loss_adapter,
 )
 
-CRITIREON_REGISTRY.register(
-    obj=SoftBCEWithLogitsLoss, name="SoftBCEWithLogitsLoss", base_class_adapter=base_loss_adapter
+CRITIREON_REGISTRY.register_lazy(
+    "SoftBCEWithLogitsLoss",
+    "segmentation_models_pytorch.losses:SoftBCEWithLogitsLoss",
+    base_class_adapter=base_loss_adapter,
 )
@@ -0,0 +1,150 @@
+"""
+Configuration Compiler Module
+
+This module compiles yaml configuration files of the Deep Learning Configuration
+Manager (DL-CM) framework into resolved and validated config artifacts.
+
+Compiling a configuration:
+
+* Parses the yaml file once, resolving its `!include` tags
+* Validates the parsed configuration against the precompiled schema
+* Pickles the resolved configuration along with the hashes of its source files and
+  of the schema
+
+Scripts load their configuration with [load_config]: yaml files are compiled once into
+the cache directory, and later runs (as well as every DDP rank, which runs the script
+again) load the artifact as long as the configuration, its included files and the schema
+did not change. Artifacts written by [compile_config] can also be passed in place of the
+yaml file: they are frozen, their source files are no longer read.
+
+Example
+-------
+
+>>> from dl_cm.utils.config_compiler import compile_config, load_config
+>>> artifact_path = compile_config('path/to/config.yaml')
+>>> config = load_config(artifact_path)
+
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from dl_cm import DEFAULT_CACHE_DIR, DEFAULT_SCHEMA_PATH
+from dl_cm import _logger as logger
+from dl_cm.config_loaders import open_config_file
+from dl_cm.utils.config_validation import file_hash, load_schema, validate_config_data
+
+COMPILED_CONFIG_SUFFIX = ".dlcm"
+COMPILED_CONFIG_VERSION = 1
+
+
+def _write_artifact(artifact: dict, output_path: Path) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    # Written atomically, DDP ranks may compile the same configuration concurrently
+    tmp_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, output_path)
+
+
+def _read_artifact(artifact_path: str | Path) -> dict | None:
+    try:
+        with open(artifact_path, "rb") as f:
+            artifact = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if not isinstance(artifact, dict) or artifact.get("version") != COMPILED_CONFIG_VERSION:
+        return None
+    return artifact
+
+
+def _sources_changed(artifact: dict) -> bool:
+    try:
+        return any(file_hash(path) != digest for path, digest in artifact["sources"].items())
+    except OSError:
+        return True
+
+
+def _compile(config_path: str | Path, schema_path: str | Path, cache_dir: str | Path) -> dict:
+    included_files = []
+    config = open_config_file(config_path, included_files)
+    validate_config_data(config, config_path, load_schema(schema_path, cache_dir=cache_dir))
+    sources = [Path(config_path).resolve().as_posix(), *included_files]
+    return {
+        "version": COMPILED_CONFIG_VERSION,
+        "config": config,
+        "schema_hash": file_hash(schema_path),
+        "sources": {path: file_hash(path) for path in sources},
+    }
+
+
+def compile_config(
+    config_path: str | Path,
+    output_path: str | Path = None,
+    schema_path: str | Path = DEFAULT_SCHEMA_PATH,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> Path:
+    """
+    Compile a yaml configuration into a resolved and validated config artifact.
+
+    :param config_path: path to a yaml configuration file
+    :param output_path: path of the artifact, defaults to the config path with the
+        COMPILED_CONFIG_SUFFIX suffix
+    :param schema_path: path to a yaml schema file (default to DEFAULT_SCHEMA_PATH)
+    :param cache_dir: directory of the compiled schemas
+    :return: path of the artifact
+    """
+    if output_path is None:
+        output_path = Path(config_path).with_suffix(COMPILED_CONFIG_SUFFIX)
+    output_path = Path(output_path)
+    _write_artifact(_compile(config_path, schema_path, cache_dir), output_path)
+    return output_path
+
+
+def load_config(
+    config_path: str | Path,
+    schema_path: str | Path = DEFAULT_SCHEMA_PATH,
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> dict:
+    """
+    Validated configuration of a yaml file or of a compiled config artifact.
+
+    yaml files are compiled once into the cache directory, and compiled again when the
+    file, one of its included files or the schema changed. Artifacts are validated again
+    only if the schema changed since their compilation.
+
+    :param config_path: path to a yaml configuration file or to a compiled artifact
+    :param schema_path: path to a yaml schema file (default to DEFAULT_SCHEMA_PATH)
+    :param cache_dir: directory of the compiled configs and schemas
+    :return: the resolved configuration
+    """
+    if Path(config_path).suffix == COMPILED_CONFIG_SUFFIX:
+        artifact = _read_artifact(config_path)
+        if artifact is None:
+            raise ValueError(f"{config_path} is not a compiled config of this DL-CM version")
+        if artifact["schema_hash"] != file_hash(schema_path):
+            config_schema = load_schema(schema_path, cache_dir=cache_dir)
+            validate_config_data(artifact["config"], config_path, config_schema)
+        return artifact["config"]
+
+    # Keyed by the config location and the schema, the content is checked with the hashes
+    key = hashlib.sha256(
+        f"{Path(config_path).resolve().as_posix()}\n{Path(schema_path).resolve().as_posix()}"
+        .encode()
+    ).hexdigest()
+    artifact_path = Path(cache_dir, "configs", f"{key}{COMPILED_CONFIG_SUFFIX}")
+    artifact = _read_artifact(artifact_path)
+    if (
+        artifact is not None
+        and artifact["schema_hash"] == file_hash(schema_path)
+        and not _sources_changed(artifact)
+    ):
+        return artifact["config"]
+    artifact = _compile(config_path, schema_path, cache_dir)
+    try:
+        _write_artifact(artifact, artifact_path)
+    except OSError as e:
+        logger.warning(f"Could not cache the compiled config {config_path}: {e}")
+    return artifact["config"]
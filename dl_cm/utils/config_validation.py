@@ -10,6 +10,7 @@ schemas, as well as registering and loading configuration validators.
 The main classes and functions in this module are:
 
 * [RegistryValidator]: A custom validator for checking named entities against a registry.
+* [load_schema]: A function compiling a schema once, cached by the hash of its file.
 * [validate_config]: A function for validating a configuration file against a schema.
 
 Usage
@@ -26,6 +27,10 @@ Example
 
 """
 
+import functools
+import hashlib
+import os
+import pickle
 from functools import partial
 
 import yamale
@@ -33,7 +38,7 @@ from pydantic import ConfigDict, validate_call
 from yamale.validators import DefaultValidators, Validator
 from pathlib import Path
 
-from dl_cm import DEFAULT_SCHEMA_PATH
+from dl_cm import DEFAULT_CACHE_DIR, DEFAULT_SCHEMA_PATH
 from dl_cm import _logger as logger
 from dl_cm.common.data.datamodule import DATAMODULES_REGISTERY
 from dl_cm.common.data.datasets import DATASETS_REGISTERY
@@ -50,22 +55,36 @@ from dl_cm.common.tasks.metrics import METRICS_REGISTRY
 from dl_cm.common.trainer.callbacks import CALLBACKS_REGISTERY
 from dl_cm.common.trainer.loggers import LOGGERS_REGISTERY
 from dl_cm.config_loaders import open_config_file
+from dl_cm.utils.registery import Registry
 
 
 class RegistryValidator(Validator):
-    """Custom validator for checking named entities against a registry."""
+    """
+    Custom validator for checking named entities against a registry.
+
+    The registry is looked up by the validator name, so that compiled schemas are pickled
+    without the registered classes.
+    """
 
-    def __init__(self, name, registry, **kwargs):
+    def __init__(self, name, **kwargs):
         super().__init__(**kwargs)
         self.name = name
-        self.registry = registry
 
     @property
     def tag(self):
         return self.name
 
+    @property
+    def registry(self) -> Registry:
+        return _registries_validators[self.name]
+
     def _is_valid(self, value):
-        return value in self.registry
+        # Looked up with get, names registered by lazy loaders are not yet in the registry
+        try:
+            self.registry.get(value)
+        except KeyError:
+            return False
+        return True
 
 
 _registries_validators = {
@@ -85,34 +104,68 @@ _registries_validators = {
 }
 
 _extended_validators = DefaultValidators.copy()
-for key, val_reg in _registries_validators.items():
-    _extended_validators[key] = partial(RegistryValidator, key, val_reg)
+for key in _registries_validators:
+    _extended_validators[key] = partial(RegistryValidator, key)
 
 
-@validate_call(config=ConfigDict(arbitrary_types_allowed=True))
-def validate_config(
-    config_path: str | Path,
+def file_hash(path: str | Path) -> str:
+    """sha256 hex digest of the content of a file."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+@functools.lru_cache(maxsize=8)
+def _compiled_schema(schema_hash: str, schema_path: str, cache_dir: str) -> yamale.schema.Schema:
+    schema_file = Path(cache_dir, "schemas", f"{schema_hash}.pkl")
+    try:
+        with open(schema_file, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+    config_schema = yamale.make_schema(schema_path, validators=_extended_validators)
+    try:
+        schema_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = schema_file.with_name(f"{schema_file.name}.{os.getpid()}.tmp")
+        with open(tmp_file, "wb") as f:
+            pickle.dump(config_schema, f)
+        os.replace(tmp_file, schema_file)
+    except OSError as e:
+        logger.warning(f"Could not cache the compiled schema {schema_path}: {e}")
+    return config_schema
+
+
+def load_schema(
     schema_path: str | Path = DEFAULT_SCHEMA_PATH,
     extra_validators: dict[str, Validator] = None,
-):
+    cache_dir: str | Path = DEFAULT_CACHE_DIR,
+) -> yamale.schema.Schema:
     """
-    Validate a configuration file against a given schema.
+    Compiled yamale schema of a schema file.
+
+    Schemas using the default validators are compiled once and pickled to the cache
+    directory, keyed by the hash of the schema file.
 
-    :param config_path: path to a yaml configuration file
     :param schema_path: path to a yaml schema file (default to DEFAULT_SCHEMA_PATH)
     :param extra_validators: a dictionary of custom validators to add to the default ones
+    :param cache_dir: directory of the compiled schemas
     """
-    if extra_validators is None:
-        extra_validators = _extended_validators
-    config_schema = yamale.make_schema(
-        schema_path,
-        validators=extra_validators,
-    )
+    if extra_validators is not None:
+        return yamale.make_schema(schema_path, validators=extra_validators)
+    return _compiled_schema(file_hash(schema_path), str(schema_path), str(cache_dir))
 
-    data = [(open_config_file(config_path), config_path)]
 
+def validate_config_data(
+    config: dict, config_path: str | Path, config_schema: yamale.schema.Schema
+) -> None:
+    """
+    Validate a parsed configuration against a compiled schema, exits on failure.
+
+    :param config: parsed configuration
+    :param config_path: path of the configuration, for error messages
+    :param config_schema: schema returned by load_schema
+    """
     try:
-        yamale.validate(config_schema, data)
+        yamale.validate(config_schema, [(config, str(config_path))])
         logger.info("Validation success! 👍")
     except yamale.YamaleError as e:
         logger.info("Validation failed!\n")
@@ -121,3 +174,20 @@ def validate_config(
             for error in result.errors:
                 logger.error(f"{error}")
         exit(1)
+
+
+@validate_call(config=ConfigDict(arbitrary_types_allowed=True))
+def validate_config(
+    config_path: str | Path,
+    schema_path: str | Path = DEFAULT_SCHEMA_PATH,
+    extra_validators: dict[str, Validator] = None,
+):
+    """
+    Validate a configuration file against a given schema.
+
+    :param config_path: path to a yaml configuration file
+    :param schema_path: path to a yaml schema file (default to DEFAULT_SCHEMA_PATH)
+    :param extra_validators: a dictionary of custom validators to add to the default ones
+    """
+    config_schema = load_schema(schema_path, extra_validators)
+    validate_config_data(open_config_file(config_path), config_path, config_schema)
@@ -0,0 +1,143 @@
+"""
+Fast listing of large directory trees.
+
+Directories are listed with `os.scandir`, optionally recursively with one thread
+per subdirectory, and files are filtered by extension while scanning. The listing
+can be persisted to a JSON manifest holding the content of every scanned directory
+along with its modification time: on later scans, only directories whose mtime
+changed are listed again.
+"""
+
+import collections.abc
+import concurrent.futures
+import json
+import os
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def _scan_single_directory(
+    directory_path: str,
+    extensions: tuple[str, ...] | None,
+    recursive: bool,
+    mtime_ns: int,
+) -> dict:
+    files, subdirectories = [], []
+    with os.scandir(directory_path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                if recursive:
+                    subdirectories.append(entry.name)
+                    continue
+                if extensions is None:
+                    # Non recursive listing keeps directories as items, as glob does
+                    files.append(entry.name)
+                continue
+            if extensions is None or entry.name.lower().endswith(extensions):
+                files.append(entry.name)
+    return {
+        "mtime_ns": mtime_ns,
+        "files": files,
+        "subdirectories": subdirectories,
+    }
+
+
+def _scan_options(directory_path: str, extensions, recursive: bool) -> list:
+    return [MANIFEST_VERSION, directory_path, extensions and list(extensions), recursive]
+
+
+def _load_manifest(
+    manifest_path: Path, directory_path: str, extensions, recursive: bool
+) -> dict:
+    try:
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("scan_options") != _scan_options(directory_path, extensions, recursive):
+        return {}
+    return manifest.get("directories", {})
+
+
+def _dump_manifest(
+    manifest_path: Path, directory_path: str, extensions, recursive: bool, directories: dict
+) -> None:
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_name(f"{manifest_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(
+            {
+                "scan_options": _scan_options(directory_path, extensions, recursive),
+                "directories": directories,
+            },
+            manifest_file,
+        )
+    os.replace(tmp_path, manifest_path)
+
+
+def scan_directory(
+    directory_path: str | Path,
+    extensions: collections.abc.Iterable[str] = None,
+    recursive: bool = False,
+    num_workers: int = 1,
+    manifest_path: str | Path = None,
+) -> list[str]:
+    """
+    List the entries of a directory, skipping hidden ones.
+
+    Args:
+        directory_path (str | Path): Directory to list.
+        extensions (Iterable[str]): Case insensitive file name suffixes to keep (eg: ".png").
+            If None, all files are kept, as well as subdirectories when not recursive.
+        recursive (bool): List files of the subdirectories as well.
+        num_workers (int): Number of threads listing subdirectories concurrently.
+        manifest_path (str | Path): JSON file persisting the listing. Directories whose
+            mtime did not change since the manifest was written are not listed again.
+
+    Returns:
+        list[str]: Sorted paths of the listed entries, joined to `directory_path`.
+    """
+    directory_path = os.fspath(directory_path)
+    if extensions is not None:
+        extensions = tuple(sorted(e.lower() for e in extensions))
+    cached_directories = (
+        _load_manifest(Path(manifest_path), directory_path, extensions, recursive)
+        if manifest_path
+        else {}
+    )
+
+    directories: dict[str, dict] = {}
+
+    def scan(relative_path: str) -> dict:
+        absolute_path = os.path.join(directory_path, relative_path)
+        # mtime is read before listing, an entry added meanwhile triggers a rescan next time
+        mtime_ns = os.stat(absolute_path).st_mtime_ns
+        cached = cached_directories.get(relative_path)
+        if cached and cached["mtime_ns"] == mtime_ns:
+            return cached
+        return _scan_single_directory(absolute_path, extensions, recursive, mtime_ns)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        pending = {executor.submit(scan, ""): ""}
+        while pending:
+            done, _ = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                relative_path = pending.pop(future)
+                directory = directories[relative_path] = future.result()
+                for subdirectory in directory["subdirectories"]:
+                    sub_relative_path = os.path.join(relative_path, subdirectory)
+                    pending[executor.submit(scan, sub_relative_path)] = sub_relative_path
+
+    if manifest_path and directories != cached_directories:
+        _dump_manifest(Path(manifest_path), directory_path, extensions, recursive, directories)
+
+    return sorted(
+        os.path.join(directory_path, relative_path, file_name)
+        for relative_path, directory in directories.items()
+        for file_name in directory["files"]
+    )
@@ -0,0 +1,115 @@
+"""
+Stable fingerprints of python objects.
+
+Fingerprints are used to key on-disk caches: two objects built from the same
+configuration get the same fingerprint across processes and runs, whereas the
+builtin `hash` or `repr` depend on memory addresses or on hash randomization.
+"""
+
+import enum
+import functools
+import hashlib
+import types
+
+import numpy as np
+import torch
+
+from dl_cm.utils.shared_memory import StringsArray
+
+_MAX_DEPTH = 8
+_PRIMITIVE_TYPES = frozenset((type(None), bool, int, float, complex, str, bytes))
+
+
+def _code_token(code: types.CodeType, depth: int, seen: set) -> str:
+    # Global names and nested code objects (eg: comprehensions, inner functions) are part
+    # of the function: np.flip and np.rot90 calls only differ by their co_names
+    consts = [
+        _code_token(c, depth, seen)
+        if isinstance(c, types.CodeType)
+        else _token(c, depth + 1, seen)
+        for c in code.co_consts
+    ]
+    return (
+        f"code({hashlib.sha1(code.co_code).hexdigest()},"
+        f"[{','.join(consts)}],[{','.join(code.co_names)}])"
+    )
+
+
+def _token(obj, depth: int, seen: set) -> str:
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        return repr(obj)
+    if isinstance(obj, enum.Enum):
+        return f"{type(obj).__qualname__}.{obj.name}"
+    if isinstance(obj, type):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if isinstance(obj, torch.Tensor):
+        obj = obj.detach().cpu().contiguous().numpy()
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        digest = hashlib.sha1(obj.tobytes()).hexdigest()
+        return f"ndarray({obj.dtype},{obj.shape},{digest})"
+    if isinstance(obj, np.ndarray):
+        return _token(obj.tolist(), depth, seen)
+    if isinstance(obj, np.generic):
+        return repr(obj.item())
+    if isinstance(obj, range):
+        return repr(obj)
+    if isinstance(obj, StringsArray):
+        # Lists of strings packed for shared memory keep the fingerprint of the list
+        obj = obj.tolist()
+    if depth > _MAX_DEPTH or id(obj) in seen:
+        return type(obj).__qualname__
+    seen = seen | {id(obj)}
+    if hasattr(obj, "fingerprint") and not isinstance(obj, type):
+        return obj.fingerprint()
+    if isinstance(obj, (list, tuple)) and _PRIMITIVE_TYPES.issuperset(map(type, obj)):
+        # Same token as the generic path, without a call per item (eg: lists of file names)
+        return f"{type(obj).__name__}[{','.join(map(repr, obj))}]"
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        tokens = [_token(v, depth + 1, seen) for v in obj]
+        if isinstance(obj, (set, frozenset)):
+            tokens = sorted(tokens)
+        return f"{type(obj).__name__}[{','.join(tokens)}]"
+    if isinstance(obj, dict):
+        tokens = sorted(
+            f"{_token(k, depth + 1, seen)}:{_token(v, depth + 1, seen)}"
+            for k, v in obj.items()
+        )
+        return f"{type(obj).__name__}{{{','.join(tokens)}}}"
+    if isinstance(obj, functools.partial):
+        return (
+            f"partial({_token(obj.func, depth + 1, seen)},"
+            f"{_token(obj.args, depth + 1, seen)},{_token(obj.keywords, depth + 1, seen)})"
+        )
+    if isinstance(obj, (types.FunctionType, types.MethodType)):
+        if isinstance(obj, types.MethodType):
+            return f"method({_token(obj.__func__, depth + 1, seen)},{_token(obj.__self__, depth + 1, seen)})"
+        closure = [c.cell_contents for c in obj.__closure__ or ()]
+        return (
+            f"{obj.__module__}.{obj.__qualname__}("
+            f"{_code_token(obj.__code__, depth + 1, seen)},"
+            f"{_token(obj.__defaults__, depth + 1, seen)},{_token(closure, depth + 1, seen)})"
+        )
+    if isinstance(obj, types.BuiltinFunctionType):
+        return f"{obj.__module__}.{obj.__qualname__}"
+    state = getattr(obj, "__dict__", None)
+    if state is None:
+        return type(obj).__qualname__
+    return f"{_token(type(obj), depth + 1, seen)}({_token(state, depth + 1, seen)})"
+
+
+def fingerprint(*objs) -> str:
+    """
+    Compute a stable hexadecimal fingerprint of the given objects.
+
+    Primitives, containers, arrays and tensors are hashed by value, functions by
+    their code (global names and nested code included), constants, defaults and
+    closure, and other objects by their class and attributes. Objects defining a `fingerprint()` method (eg: datasets) are
+    hashed through it.
+
+    Args:
+        *objs: Objects to fingerprint together.
+
+    Returns:
+        str: Hexadecimal sha1 digest.
+    """
+    return hashlib.sha1(_token(list(objs), 0, set()).encode()).hexdigest()
@@ -0,0 +1,183 @@
+"""
+Compact storage of dataset indices.
+
+Index compositions (sub datasets, filters, orders, shuffles) map every item to a parent
+index. These maps are kept for the lifetime of the dataset and pickled to every DataLoader
+worker, so they are stored compactly:
+
+* arithmetic progressions (eg: contiguous spans of a split) as lazy `range` objects,
+* other maps as int32 arrays, or int64 ones for parents beyond the int32 range.
+
+Lookups through `take_indices` always return int64 arrays, whatever the storage.
+Permutations of large datasets are not stored at all, but computed on the fly by a seeded
+`FeistelPermutation`.
+"""
+
+import collections.abc
+import math
+
+import numpy as np
+
+CompactIndices = np.ndarray | range
+
+_INT32_MAX = np.iinfo(np.int32).max
+_PROGRESSION_CHECK_CHUNK = 2**20
+
+
+def index_dtype(size: int) -> np.dtype:
+    """Smallest integer dtype holding the indices of a dataset of the given size."""
+    return np.dtype(np.int32) if size <= _INT32_MAX else np.dtype(np.int64)
+
+
+def _is_progression(indices: np.ndarray, step: int) -> bool:
+    if step == 0 or indices[-1] - indices[0] != step * (len(indices) - 1):
+        return False
+    # Checked by chunks to bound the memory of the differences of large maps
+    for start in range(0, len(indices) - 1, _PROGRESSION_CHECK_CHUNK):
+        chunk = indices[start : start + _PROGRESSION_CHECK_CHUNK + 1]
+        if not (np.diff(chunk) == step).all():
+            return False
+    return True
+
+
+def compact_indices(
+    indices: collections.abc.Iterable[int] | np.ndarray, size: int = 0
+) -> CompactIndices:
+    """
+    Compact representation of a map of indices.
+
+    Args:
+        indices (Iterable[int] | np.ndarray): Indices to store.
+        size (int): Length of the indexed dataset, used to pick the array dtype.
+
+    Returns:
+        range | np.ndarray: A range for arithmetic progressions, an int32 or int64 array otherwise.
+    """
+    if isinstance(indices, range):
+        return indices
+    if isinstance(indices, np.ndarray):
+        indices = indices.astype(np.int64, copy=False).reshape(-1)
+    else:
+        indices = np.fromiter(indices, dtype=np.int64)
+    if len(indices) == 0:
+        return range(0)
+    first, last = int(indices[0]), int(indices[-1])
+    step = int(indices[1] - indices[0]) if len(indices) > 1 else 1
+    if first >= 0 and last >= 0 and (len(indices) == 1 or _is_progression(indices, step)):
+        return range(first, last + step, step)
+    bound = max(size, int(indices.max()) + 1, -int(indices.min()))
+    return indices.astype(index_dtype(bound))
+
+
+def take_indices(
+    indices: CompactIndices, positions: collections.abc.Sequence[int] | np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized lookup of compact indices at the given positions.
+
+    Returns:
+        np.ndarray: int64 indices.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    if isinstance(indices, np.ndarray):
+        return indices[positions].astype(np.int64, copy=False)
+    length = len(indices)
+    positions = np.where(positions < 0, positions + length, positions)
+    if positions.size and (positions.min() < 0 or positions.max() >= length):
+        raise IndexError(f"Index out of range for {length} indices")
+    return indices.start + positions * indices.step
+
+
+_MIX_MULTIPLIERS = (
+    np.uint64(0x9E3779B97F4A7C15),
+    np.uint64(0xBF58476D1CE4E5B9),
+    np.uint64(0x94D049BB133111EB),
+)
+_UINT64_MASK = (1 << 64) - 1
+
+
+class FeistelPermutation:
+    """
+    Seeded pseudo-random permutation of range(length), computed in O(1) time and memory
+    per index, without storing the permuted indices.
+
+    A balanced Feistel network is a bijection of the integers of an even bit width,
+    whatever its round function. Indices are permuted by the network over the smallest
+    width covering `length`, and values falling outside of range(length) are walked
+    through it again (cycle walking) until they land back in it, less than 4 times on
+    average. The same length and seed give the same permutation on every process.
+
+    Args:
+        length (int): Number of permuted indices.
+        seed (int | Sequence[int]): Seed of the round keys, eg: (seed, epoch).
+        rounds (int): Number of Feistel rounds.
+    """
+
+    def __init__(self, length: int, seed: int | collections.abc.Sequence[int], rounds: int = 4):
+        self.length = length
+        self.seed = seed
+        self.half_bits = max(1, math.ceil(max(length - 1, 1).bit_length() / 2))
+        self._mask = np.uint64((1 << self.half_bits) - 1)
+        self._keys = np.random.SeedSequence(seed).generate_state(rounds, dtype=np.uint64)
+        self._int_keys: list[int] = self._keys.tolist()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _round(self, values: np.ndarray, key: np.uint64) -> np.ndarray:
+        # splitmix64 finalizer of the keyed value, uint64 array operations wrap around
+        mixed = values * _MIX_MULTIPLIERS[0] + key
+        mixed ^= mixed >> np.uint64(30)
+        mixed *= _MIX_MULTIPLIERS[1]
+        mixed ^= mixed >> np.uint64(27)
+        mixed *= _MIX_MULTIPLIERS[2]
+        mixed ^= mixed >> np.uint64(31)
+        return mixed & self._mask
+
+    def _encrypt(self, values: np.ndarray) -> np.ndarray:
+        half_bits = np.uint64(self.half_bits)
+        left, right = values >> half_bits, values & self._mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(right, key)
+        return (left << half_bits) | right
+
+    def __call__(self, indices: collections.abc.Sequence[int] | np.ndarray) -> np.ndarray:
+        """
+        Permuted counterparts of the given indices.
+
+        Returns:
+            np.ndarray: int64 permuted indices.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = np.where(indices < 0, indices + self.length, indices)
+        if indices.size and (indices.min() < 0 or indices.max() >= self.length):
+            raise IndexError(f"Index out of range for a permutation of {self.length} indices")
+        values = self._encrypt(indices.astype(np.uint64))
+        outside = np.flatnonzero(values >= self.length)
+        while len(outside):
+            values[outside] = self._encrypt(values[outside])
+            outside = outside[values[outside] >= self.length]
+        return values.astype(np.int64)
+
+    def __getitem__(self, index: int) -> int:
+        # Single indices are permuted with python integers, much faster than 1-sized arrays
+        index = int(index)
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(f"Index out of range for a permutation of {self.length} indices")
+        mask, multipliers = int(self._mask), [int(m) for m in _MIX_MULTIPLIERS]
+        value = index
+        while True:
+            left, right = value >> self.half_bits, value & mask
+            for key in self._int_keys:
+                mixed = (right * multipliers[0] + key) & _UINT64_MASK
+                mixed ^= mixed >> 30
+                mixed = (mixed * multipliers[1]) & _UINT64_MASK
+                mixed ^= mixed >> 27
+                mixed = (mixed * multipliers[2]) & _UINT64_MASK
+                mixed ^= mixed >> 31
+                left, right = right, left ^ (mixed & mask)
+            value = (left << self.half_bits) | right
+            if value < self.length:
+                return value
@@ -9,7 +9,7 @@ and instances of the class itself.
 import collections
 import collections.abc
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Callable, Generic, TypeVar
 from dl_cm.common.typing import OneOrMany
 
 from dl_cm.common.typing import namedEntitySchema
@@ -79,23 +79,79 @@ class BaseFactory(Generic[T], ABC):
             If the param is not of the expected types.
         """
 
-        if param is None:
-            return cls.default_instance()
-        if isinstance(param, str):
-            param_class = cls.registry().get(param)
-            if type(param_class) is type:
-                return param_class()
-            return param_class # callable object does not require instantiated
-        elif isinstance(param, namedEntitySchema):
-            return load_named_entity(cls.registry(), param)
-        elif isinstance(param, dict):
-            return load_named_entity(cls.registry(), namedEntitySchema(**param))
-        elif isinstance(param, cls.base_class(similar=True)) or callable(param):
-            return param
-        elif isinstance(param, collections.abc.Sequence):
-            return type(param)(cls.create(p) for p in param)
-        else:
-            raise OutOfTypesException(
-                param,
-                (str, namedEntitySchema, cls.base_class(), collections.abc.Sequence),
+        return cls._create_handler(type(param))(cls, param)
+
+    @classmethod
+    def _create_handler(cls, param_type: type) -> Callable:
+        """Creation function of the params of a type, resolved once per factory and type."""
+        handler = _CREATE_HANDLERS.get((cls, param_type))
+        if handler is None:
+            handler = _CREATE_HANDLERS[(cls, param_type)] = cls._resolve_create_handler(
+                param_type
             )
+        return handler
+
+    @classmethod
+    def _resolve_create_handler(cls, param_type: type) -> Callable:
+        if param_type is type(None):
+            return _create_default
+        if issubclass(param_type, str):
+            return _create_from_name
+        elif issubclass(param_type, namedEntitySchema):
+            return _create_from_schema
+        elif issubclass(param_type, dict):
+            return _create_from_dict
+        elif issubclass(param_type, cls.base_class(similar=True)) or _instances_callable(
+            param_type
+        ):
+            return _return_param
+        elif issubclass(param_type, collections.abc.Sequence):
+            return _create_sequence
+        return _raise_out_of_types
+
+
+def _instances_callable(param_type: type) -> bool:
+    # callable(param) is looked up on the type, classes are instances of callable metaclasses
+    return any("__call__" in vars(klass) for klass in param_type.__mro__)
+
+
+# (factory, param type) -> creation function
+_CREATE_HANDLERS: dict[tuple[type, type], Callable] = {}
+
+
+def _create_default(factory: type[BaseFactory], param: None):
+    return factory.default_instance()
+
+
+def _create_from_name(factory: type[BaseFactory], param: str):
+    param_class = factory.registry().get(param)
+    if isinstance(param_class, type):
+        return param_class()
+    return param_class  # callable object does not require instantiated
+
+
+def _create_from_schema(factory: type[BaseFactory], param: namedEntitySchema):
+    return load_named_entity(factory.registry(), param)
+
+
+def _create_from_dict(factory: type[BaseFactory], param: dict):
+    name, params = param.get("name"), param.get("params", {})
+    if isinstance(name, str) and isinstance(params, dict):
+        # Well formed configs are valid schemas, the validation only reports the others
+        return factory.registry().get(name)(**params)
+    return load_named_entity(factory.registry(), namedEntitySchema(**param))
+
+
+def _return_param(factory: type[BaseFactory], param):
+    return param
+
+
+def _create_sequence(factory: type[BaseFactory], param: collections.abc.Sequence):
+    return type(param)(factory.create(p) for p in param)
+
+
+def _raise_out_of_types(factory: type[BaseFactory], param):
+    raise OutOfTypesException(
+        param,
+        (str, namedEntitySchema, factory.base_class(), collections.abc.Sequence),
+    )
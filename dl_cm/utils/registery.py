@@ -1,11 +1,32 @@
+import importlib
 from abc import ABC, abstractmethod
 from typing import Callable, Hashable
 
 
+class _LazyEntry:
+    """Object of a registry imported from `module:attribute` and adapted on first access."""
+
+    def __init__(self, target: str, base_class_adapter: Callable[[type], type]):
+        self.target = target
+        self.base_class_adapter = base_class_adapter
+
+    def load(self):
+        module_name, _, attribute = self.target.partition(":")
+        return self.base_class_adapter(getattr(importlib.import_module(module_name), attribute))
+
+
 class Registry:
     """
     Class to register objects and then retrieve them by name.
 
+    Objects of heavy modules can be registered lazily, so that importing the registry
+    does not import them:
+
+    * `register_lazy` registers a name resolved to a `module:attribute` path, imported
+      and adapted on first `get`,
+    * `register_lazy_loader` defers a registration function (eg: registering all the
+      classes of a module), called once a name is not found or all objects are listed.
+
     Parameters
     ----------
     name : str
@@ -15,6 +36,7 @@ class Registry:
     def __init__(self, name):
         self._name = name
         self._obj_map = {}
+        self._lazy_loaders: list[Callable[[], None]] = []
 
     def _do_register(self, name, obj):
         assert name not in self._obj_map, (
@@ -72,14 +94,49 @@ class Registry:
             Object registered under the given name
         """
 
+        if name not in self._obj_map:
+            self._run_lazy_loaders()
         ret = self._obj_map.get(name)
         if ret is None:
             raise KeyError(
                 f"No object named '{name}' found in '{self._name}' registry!"
             )
+        if isinstance(ret, _LazyEntry):
+            ret = self._obj_map[name] = ret.load()
 
         return ret
 
+    def register_lazy(
+        self,
+        name: str,
+        target: str,
+        base_class_adapter: Callable[[type], type] = lambda x: x,
+    ):
+        """
+        Register an object imported on first retrieval
+
+        Parameters
+        ----------
+        name : str
+            Name of the object to register
+        target : str
+            Path of the object, as "module.path:attribute"
+        base_class_adapter : callable, optional
+            Callable to make the imported class inherit from BaseClass
+        """
+        self._do_register(name, _LazyEntry(target, base_class_adapter))
+
+    def register_lazy_loader(self, loader: Callable[[], None]):
+        """
+        Defer a function registering objects (eg: all the classes of a heavy module) until
+        a name is not found in the registry or all its objects are listed
+        """
+        self._lazy_loaders.append(loader)
+
+    def _run_lazy_loaders(self):
+        while self._lazy_loaders:
+            self._lazy_loaders.pop(0)()
+
     def get_list(self):
         """
         Method to retrieve all objects from the registry
@@ -90,15 +147,18 @@ class Registry:
             List of all objects registered in the registry
         """
 
+        self._run_lazy_loaders()
         return list(self._obj_map.keys())
 
     def __contains__(self, name: Hashable):
+        """Whether the name is registered, names of pending lazy loaders are not looked up"""
         if not isinstance(name, Hashable):
             raise TypeError(f"Required item must be hashable, but got {type(name)}")
         return name in self._obj_map
 
     def __iter__(self):
-        return iter(self._obj_map.items())
+        self._run_lazy_loaders()
+        return iter([(name, self.get(name)) for name in self._obj_map])
 
 
 class registeredClassMixin(ABC):
@@ -0,0 +1,160 @@
+"""
+Copy-free pickling of large dataset attributes through shared memory.
+
+DataLoader workers started with "spawn" or "forkserver" receive a pickled copy of their
+dataset, including its large attributes (index maps, lists of file paths). Within a
+`shared_memory_pickling` context, these attributes are instead pickled as handles to
+shared memory segments, which every worker maps without copying:
+
+* numpy arrays are copied once into a segment and attached as read-only arrays,
+* lists of strings are packed into a `StringsArray`, an Arrow-style pair of offsets and
+  utf-8 bytes buffers, whose buffers are shared as arrays.
+
+Segments are created once per attribute by the pickling process, and unlinked when the
+object owning them is garbage collected or at exit. Packed lists of strings also avoid
+the copy-on-read of forked workers, whose reference counting writes to every string.
+"""
+
+import collections.abc
+import contextlib
+import threading
+import weakref
+from multiprocessing import shared_memory
+from typing import Any, Iterator
+
+import numpy as np
+
+SHARED_MEMORY_MIN_BYTES = 2**16
+
+_sharing = threading.local()
+# Segments attached by the current process, kept open as long as the process lives
+_attached_segments: dict[str, shared_memory.SharedMemory] = {}
+
+
+@contextlib.contextmanager
+def shared_memory_pickling(min_bytes: int = SHARED_MEMORY_MIN_BYTES) -> Iterator[None]:
+    """
+    Pickle the large attributes of datasets as shared memory handles within the context.
+
+    Args:
+        min_bytes (int): Size from which an attribute is shared rather than copied.
+    """
+    previous = getattr(_sharing, "min_bytes", None)
+    _sharing.min_bytes = min_bytes
+    try:
+        yield
+    finally:
+        _sharing.min_bytes = previous
+
+
+def sharing_min_bytes() -> int | None:
+    """Minimum size of shared attributes of the current context, None outside of it."""
+    return getattr(_sharing, "min_bytes", None)
+
+
+def _release_segment(segment: shared_memory.SharedMemory) -> None:
+    segment.close()
+    try:
+        segment.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def attach_shared_array(name: str, dtype: str, shape: tuple[int, ...]) -> np.ndarray:
+    """Read-only array backed by the shared memory segment of a `SharedArray`."""
+    if name not in _attached_segments:
+        _attached_segments[name] = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_attached_segments[name].buf)
+    array.flags.writeable = False
+    return array
+
+
+class SharedArray:
+    """
+    Copy of a numpy array in a shared memory segment, unpickled as an attached array.
+
+    The segment is unlinked once the `SharedArray` is garbage collected.
+    """
+
+    def __init__(self, array: np.ndarray):
+        self.dtype: str = array.dtype.str
+        self.shape: tuple[int, ...] = array.shape
+        segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+        self.name: str = segment.name
+        self._finalizer = weakref.finalize(self, _release_segment, segment)
+
+    def __reduce__(self):
+        return attach_shared_array, (self.name, self.dtype, self.shape)
+
+
+class StringsArray(collections.abc.Sequence):
+    """
+    Immutable sequence of strings packed into an offsets and a utf-8 bytes buffers.
+
+    Args:
+        offsets (np.ndarray): int64 [len + 1] boundaries of the strings in data.
+        data (np.ndarray): uint8 utf-8 encoded strings, concatenated.
+    """
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+        self._shared: tuple[SharedArray, SharedArray] | None = None
+
+    @classmethod
+    def from_strings(cls, strings: collections.abc.Iterable[str]) -> "StringsArray":
+        encoded = [s.encode("utf-8", "surrogatepass") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int | slice) -> str | list[str]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} out of range for {len(self)} strings")
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:stop].tobytes().decode("utf-8", "surrogatepass")
+
+    def tolist(self) -> list[str]:
+        return list(self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, StringsArray):
+            return np.array_equal(self.offsets, other.offsets) and np.array_equal(
+                self.data, other.data
+            )
+        return isinstance(other, collections.abc.Sequence) and list(self) == list(other)
+
+    def __getstate__(self) -> dict:
+        return {"offsets": self.offsets, "data": self.data}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["offsets"], state["data"])
+
+    def __reduce_ex__(self, protocol):
+        if sharing_min_bytes() is None:
+            return super().__reduce_ex__(protocol)
+        if self._shared is None:
+            self._shared = (SharedArray(self.offsets), SharedArray(self.data))
+        return StringsArray, self._shared
+
+
+def shared_value(value: Any, min_bytes: int) -> Any:
+    """
+    Counterpart of a value pickled through shared memory, or the value itself if it is
+    too small or can not be shared.
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype != object and value.nbytes >= max(min_bytes, 1):
+            return SharedArray(value)
+    elif isinstance(value, list) and len(value) * 8 >= max(min_bytes, 1):
+        if all(isinstance(v, str) for v in value):
+            return StringsArray.from_strings(value)
+    return value
@@ -1,5 +1,18 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from pathlib import Path
 from dl_cm.scripts.common_scripts import chain_decorators
+from dl_cm.scripts.export import load_export_datasets
+from dl_cm.utils.registery import Registry
+import torch
+from dl_cm.common.data.image_decoders import ImageDecodersFactory, PILDecoder
+from dl_cm.common.tasks.criterion import BaseLoss, CritireonFactory
+from dl_cm.common.tasks.metrics import MetricsFactory
+from dl_cm.config_loaders import open_config_file
+from dl_cm.utils.config_compiler import compile_config, load_config
 
 class TestCommonScripts(unittest.TestCase):
     def test_chain_decorators(self):
@@ -30,6 +43,150 @@ class TestCommonScripts(unittest.TestCase):
         # and that the final result is as expected
         expected_result = ((2 *  3) + 1) * 2  # Expected result after applying both decorators
         self.assertEqual(result, expected_result)
+    def test_export_datasets_are_not_augmented(self):
+        datasets = load_export_datasets(
+            {
+                "name": "BaseDataModule",
+                "params": {
+                    "datasets": [
+                        {"name": "ItemsDataset", "params": {"items": [1, 2], "reference_name": "train"}}
+                    ],
+                    "dataloaders": {"train": {"name": "DataLoader", "params": {}}},
+                    "augmentation": {"augmentations": [{"name": "Transflip", "params": {"dimension_index": 0}}]},
+                },
+            }
+        )
+        self.assertEqual(list(datasets), ["train"])
+        self.assertEqual(len(datasets["train"]), 2)
+
+    def test_cli_help_does_not_import_heavy_modules(self):
+        code = (
+            "import sys\n"
+            "from click.testing import CliRunner\n"
+            "from dl_cm.scripts.cli import cli\n"
+            "result = CliRunner().invoke(cli, ['--help'])\n"
+            "assert result.exit_code == 0 and 'train' in result.output, result.output\n"
+            "print(sorted({'torch', 'lightning', 'segmentation_models_pytorch'} & set(sys.modules)))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "[]")
+
+
+class TestLazyRegistry(unittest.TestCase):
+    def test_lazy_entries_and_loaders(self):
+        registry = Registry("Test")
+        loaded = []
+        registry.register_lazy("OrderedDict", "collections:OrderedDict", lambda c: (c,))
+
+        def loader():
+            loaded.append(True)
+            registry.register(obj=dict, name="dict")
+
+        registry.register_lazy_loader(loader)
+        self.assertEqual(registry.get("OrderedDict")[0].__name__, "OrderedDict")
+        # Names registered lazily are found without running the loaders
+        self.assertEqual(loaded, [])
+        self.assertNotIn("dict", registry)
+        self.assertIs(registry.get("dict"), dict)
+        self.assertIn("dict", registry)
+        self.assertEqual(sorted(registry.get_list()), ["OrderedDict", "dict"])
+        self.assertEqual(loaded, [True])
+        with self.assertRaises(KeyError):
+            registry.get("missing")
+
+class TestFactories(unittest.TestCase):
+    def test_named_classes_are_instantiated(self):
+        self.assertIsInstance(CritireonFactory.create("L1Loss"), BaseLoss)
+        self.assertIsInstance(ImageDecodersFactory.create("PILDecoder"), PILDecoder)
+        losses = CritireonFactory.create(["L1Loss", {"name": "MSELoss", "params": {}}])
+        self.assertEqual([type(l).__mro__[1].__name__ for l in losses], ["L1Loss", "MSELoss"])
+
+    def test_metrics_wrapper_class_is_shared(self):
+        params = {"task": "binary", "preds_key": "p", "target_key": "t"}
+        first = MetricsFactory.create({"name": "F1Score", "params": params})
+        second = MetricsFactory.create({"name": "F1Score", "params": params})
+        self.assertIs(type(first), type(second))
+        first.update({"p": torch.tensor([1, 0, 1])}, {"t": torch.tensor([1, 0, 0])})
+        self.assertAlmostEqual(first.compute().item(), 2 / 3, places=5)
+        self.assertEqual(second.compute().item(), 0.0)
+
+
+CONFIG = """
+datamodule: !include datamodule.yaml
+trainer:
+  callbacks: []
+  loggers:
+    - name: TensorBoardLogger
+task:
+  name: BaseTask
+  params:
+    learner:
+      name: BaseLearner
+"""
+
+DATAMODULE_CONFIG = """
+name: BaseDataModule
+params:
+  preprocessing: {{}}
+  augmentation:
+    augmentations: []
+  datasets:
+    - name: ItemsDataset
+      params:
+        items: {items}
+  dataloaders:
+    train:
+      name: DataLoader
+"""
+
+
+class TestConfigCompiler(unittest.TestCase):
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.cache_dir = self.directory / "cache"
+        self.config_path = self.directory / "config.yaml"
+        self.config_path.write_text(CONFIG)
+        self.write_datamodule([1, 2], mtime=1)
+
+    def write_datamodule(self, items, mtime):
+        datamodule_path = self.directory / "datamodule.yaml"
+        datamodule_path.write_text(DATAMODULE_CONFIG.format(items=items))
+        os.utime(datamodule_path, ns=(mtime, mtime))
+
+    def items(self, config):
+        return config["datamodule"]["params"]["datasets"][0]["params"]["items"]
+
+    def test_cached_config_follows_included_files(self):
+        config = load_config(self.config_path, cache_dir=self.cache_dir)
+        self.assertEqual(self.items(config), [1, 2])
+        self.assertEqual(len(list((self.cache_dir / "configs").iterdir())), 1)
+        self.assertEqual(load_config(self.config_path, cache_dir=self.cache_dir), config)
+        self.write_datamodule([3], mtime=2)
+        self.assertEqual(self.items(load_config(self.config_path, cache_dir=self.cache_dir)), [3])
+
+    def test_nested_included_files_are_followed(self):
+        (self.directory / "a.yaml").write_text("a: !include b.yaml\n")
+        (self.directory / "b.yaml").write_text("b: !include c.yaml\n")
+        for value, mtime in ((1, 1), (2, 2)):
+            c_path = self.directory / "c.yaml"
+            c_path.write_text(f"c: {value}\n")
+            os.utime(c_path, ns=(mtime, mtime))
+            included_files = []
+            config = open_config_file(self.directory / "a.yaml", included_files)
+            self.assertEqual(config, {"a": {"b": {"c": value}}})
+            self.assertEqual(
+                [Path(f).name for f in included_files], ["b.yaml", "c.yaml"]
+            )
+
+    def test_compiled_config_is_frozen(self):
+        artifact_path = compile_config(self.config_path, cache_dir=self.cache_dir)
+        self.assertEqual(artifact_path, self.config_path.with_suffix(".dlcm"))
+        self.write_datamodule([3], mtime=2)
+        config = load_config(artifact_path, cache_dir=self.cache_dir)
+        self.assertEqual(self.items(config), [1, 2])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
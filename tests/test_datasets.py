@@ -0,0 +1,1102 @@
+import json
+import os
+import pickle
+import tarfile
+import tempfile
+import unittest
+
+import numpy as np
+import PIL.Image
+import torch
+
+from dl_cm.common.data.datasets import (
+    AugmentedDataset,
+    CachedDataset,
+    FilteredItemsDataset,
+    ItemsDataset,
+    ListDirectoryDataset,
+    MemoryCachedDataset,
+    MetadataFilteredDataset,
+    MetadataOrderedDataset,
+    OrderedItemsDataset,
+    PreprocessedDataset,
+    ShuffledDataset,
+    SubDataset,
+)
+from dl_cm.common.data.datasets.combined_dataset import CombinedDataset
+from dl_cm.common.data.datasets.items_dataset import CrossDataset
+from dl_cm.common.data.datasets.split_datasets import split_dataset_random
+from dl_cm.common.data.datasets.iterable_dataset import (
+    IterableSplitDataset,
+    ShardedDataset,
+)
+from dl_cm.common.data.export import MANIFEST_FILE, export_dataset, verify_export
+from dl_cm.common.data.datasets.memmap_dataset import (
+    MemmapTensorDataset,
+    write_memmap_dataset,
+)
+from dl_cm.common.data.datasets.shards_dataset import (
+    ShardsDataset,
+    read_shard_items,
+    write_shards,
+)
+from dl_cm.common.data.datasets.images_dataset import ImagesWithinDirectoryDataset
+from dl_cm.common.data.datasets.metadata_index import MetadataIndex, build_metadata_index
+from dl_cm.common.data.base_dataloader import views_collate
+from dl_cm.common.data.datasets.augmented_dataset import TransIdentity
+from dl_cm.common.data.transformations.multiple_items_transformation import (
+    MultipleItemRevrsibleTransformation,
+)
+from dl_cm.common.data.samples.vision.voc_dataset import VocDataset
+from dl_cm.common.data.transformations.tensor_transformation import (
+    Transflip,
+    TransRot90,
+    TransRot180,
+    TransRot270,
+)
+from dl_cm.common.data.transformations.fused_transformation import (
+    fused_split_transform,
+    fused_transform,
+)
+from dl_cm.common.data.transformations.batch_transformation import (
+    BatchAugmentation,
+    BatchNormalization,
+    BatchOneHot,
+)
+from dl_cm.utils.fingerprint import fingerprint
+from dl_cm.utils.indices import FeistelPermutation, compact_indices, take_indices
+from dl_cm.utils.shared_memory import StringsArray, shared_memory_pickling
+from dl_cm.common.data.base_dataloader import DATALOADERS_REGISTRY
+from dl_cm.common.data.image_decoders import (
+    BaseImageDecoder,
+    ExtensionImageDecoder,
+    PILDecoder,
+    SkimageDecoder,
+    TorchvisionDecoder,
+)
+from dl_cm.common.data.samplers import MetadataWeightedRandomSampler, SamplersFactory
+from dl_cm.common.data.samplers.hetero_dataset_batch_sampler import (
+    HeteroDatasetsBatchSampler,
+)
+
+
+def build_chain(items_count=100):
+    items_dataset = ItemsDataset(items=range(items_count))
+    chain = items_dataset.compose(SubDataset, bounds=(10, items_count))
+    chain = chain.compose(ShuffledDataset)
+    chain = chain.compose(FilteredItemsDataset, filter_fn=lambda x: x % 3 != 0)
+    chain = chain.compose(OrderedItemsDataset, order_fn=lambda x: -x)
+    chain = chain.compose(PreprocessedDataset, preprocessing_fn=lambda x: x * 10)
+    chain = chain.compose(AugmentedDataset, augmentations=[lambda x: x, lambda x: -x])
+    return chain
+
+
+class TestBatchedItemsRetrieval(unittest.TestCase):
+    def test_getitems_matches_getitem(self):
+        chain = build_chain()
+        indices = np.random.permutation(len(chain))[:32]
+        self.assertEqual(chain.__getitems__(indices), [chain[i] for i in indices])
+
+    def test_parent_indices_matches_parent_index(self):
+        chain = build_chain().parent_dataset.parent_dataset.parent_dataset
+        indices = list(range(len(chain)))
+        self.assertEqual(
+            chain.parent_indices(indices).tolist(),
+            [int(chain.parent_index(i)) for i in indices],
+        )
+
+    def test_combined_dataset_getitems(self):
+        combined = CombinedDataset(
+            datasets=[ItemsDataset(items=range(5)), ItemsDataset(items="abcdefg")]
+        )
+        indices = [11, 0, 5, 4, 6]
+        self.assertEqual(combined.__getitems__(indices), [combined[i] for i in indices])
+
+    def test_dataloader_uses_batched_path(self):
+        chain = build_chain()
+        loader = torch.utils.data.DataLoader(chain, batch_size=8, shuffle=False)
+        loaded = torch.cat(list(loader)).tolist()
+        self.assertEqual(loaded, [chain[i] for i in range(len(chain))])
+
+
+class TestCompiledIndexMap(unittest.TestCase):
+    def test_compiled_map_matches_recursive_lookup(self):
+        chain = build_chain()
+        expected = [int(chain.top_parent_index(i)) for i in range(len(chain))]
+        self.assertEqual(chain.compile_index_map().tolist(), expected)
+        self.assertEqual([int(chain.top_parent_index(i)) for i in range(len(chain))], expected)
+
+    def test_index_only_chain_fetches_from_top_dataset(self):
+        index_chain = build_chain().parent_dataset.parent_dataset
+        expected = [index_chain[i] for i in range(len(index_chain))]
+        index_chain.compile_index_map()
+        self.assertTrue(index_chain.is_index_only_chain)
+        self.assertEqual(index_chain.__getitems__(range(len(index_chain))), expected)
+        self.assertEqual([index_chain[i] for i in range(len(index_chain))], expected)
+
+    def test_composition_reuses_compiled_parent_map(self):
+        parent = build_chain().parent_dataset.parent_dataset
+        parent_map = parent.compile_index_map()
+        child = parent.compose(SubDataset, indices=[3, 1, 2])
+        self.assertEqual(child.top_index_map.tolist(), parent_map[[3, 1, 2]].tolist())
+
+    def test_hetero_sampler_counts(self):
+        combined = CombinedDataset(
+            datasets=[ItemsDataset(items=range(7)), ItemsDataset(items=range(5))]
+        )
+        sampler = HeteroDatasetsBatchSampler(combined, batch_sizes=(2, 3), shuffle=True)
+        self.assertEqual(sampler.combined_dataset_count, {0: 7, 1: 5})
+        batches = list(sampler)
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(12)))
+        self.assertEqual(len(sampler), len(batches))
+        for batch in batches:
+            dataset_id = int(batch[0] >= 7)
+            self.assertTrue(all(int(i >= 7) == dataset_id for i in batch))
+            self.assertLessEqual(len(batch), (2, 3)[dataset_id])
+
+    def test_hetero_sampler_order_and_drop_last(self):
+        combined = CombinedDataset(
+            datasets=[ItemsDataset(items=range(7)), ItemsDataset(items=range(5))]
+        )
+        sampler = HeteroDatasetsBatchSampler(combined, batch_sizes=(2, 3), shuffle=False)
+        self.assertEqual(list(sampler), [[0, 1], [2, 3], [4, 5], [7, 8, 9], [6], [10, 11]])
+        sampler = HeteroDatasetsBatchSampler(combined, batch_sizes=(2, 3), drop_last=True)
+        self.assertEqual(len(list(sampler)), len(sampler))
+        self.assertEqual(len(sampler), 4)
+
+    def test_hetero_sampler_ranks_and_weights(self):
+        combined = CombinedDataset(
+            datasets=[ItemsDataset(items=range(40)), ItemsDataset(items=range(8))]
+        )
+        ranks_batches = [
+            list(
+                HeteroDatasetsBatchSampler(
+                    combined, batch_sizes=(4, 2), num_replicas=2, rank=rank, seed=3
+                )
+            )
+            for rank in range(2)
+        ]
+        ranks_indices = [{i for b in batches for i in b} for batches in ranks_batches]
+        self.assertEqual(len(ranks_batches[0]), len(ranks_batches[1]))
+        self.assertFalse(ranks_indices[0] & ranks_indices[1])
+        self.assertEqual(ranks_indices[0] | ranks_indices[1], set(range(48)))
+        # Ranks seeded differently (no seed_everything) still shard the same orders
+        ranks_indices = []
+        for rank in range(2):
+            torch.manual_seed(rank)
+            sampler = HeteroDatasetsBatchSampler(
+                combined, batch_sizes=(4, 2), num_replicas=2, rank=rank
+            )
+            ranks_indices.append({i for b in sampler for i in b})
+        self.assertEqual(ranks_indices[0] | ranks_indices[1], set(range(48)))
+        sampler = HeteroDatasetsBatchSampler(
+            combined, batch_sizes=(4, 2), mixing_weights=(1, 1), seed=3
+        )
+        batches = list(sampler)
+        self.assertEqual(len(batches), 14)
+        self.assertEqual(sum(b[0] >= 40 for b in batches), 7)
+        sampler.set_epoch(1)
+        self.assertNotEqual(list(sampler), batches)
+
+
+
+class TestCompactIndices(unittest.TestCase):
+    def test_compact_representations(self):
+        self.assertEqual(compact_indices([4, 6, 8]), range(4, 10, 2))
+        self.assertEqual(compact_indices(np.arange(5, 0, -1)), range(5, 0, -1))
+        shuffled = compact_indices([3, 0, 2], size=10)
+        self.assertEqual((shuffled.dtype, shuffled.tolist()), (np.int32, [3, 0, 2]))
+        self.assertEqual(compact_indices([1, 0, 2**31]).dtype, np.int64)
+        for indices in (range(2, 9, 3), np.array([7, 1, 5], dtype=np.int32)):
+            taken = take_indices(indices, [-1, 0])
+            self.assertEqual((taken.dtype, taken.tolist()), (np.int64, [indices[-1], indices[0]]))
+
+    def test_index_datasets_storage(self):
+        items = ItemsDataset(items=range(100))
+        self.assertIsInstance(SubDataset(items, bounds=(10, 20)).indices, range)
+        splits = split_dataset_random(items, [0.7, 0.3], ["train", "valid"])
+        self.assertEqual([s.indices for s in splits], [range(0, 70), range(70, 100)])
+        self.assertEqual(splits[1].__getitems__([0, -1]), [70, 99])
+        filtered = FilteredItemsDataset(parent_dataset=items, filter_fn=lambda x: x % 3 == 0)
+        self.assertEqual(filtered.filtered_items_indices, range(0, 100, 3))
+        ordered = OrderedItemsDataset(parent_dataset=items, order_fn=lambda x: x % 2)
+        self.assertEqual(ordered.reordered_items_indices.dtype, np.int32)
+        self.assertEqual(ordered[50], 1)
+        self.assertEqual(
+            SubDataset(items, indices=[10, 11, 12]).fingerprint(),
+            SubDataset(items, bounds=(10, 13)).fingerprint(),
+        )
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_functions_differing_by_global_names_or_nested_code(self):
+        self.assertNotEqual(
+            fingerprint(lambda x: np.flip(x)), fingerprint(lambda x: np.rot90(x))
+        )
+        self.assertNotEqual(
+            fingerprint(lambda it: [x.endswith(".png") for x in it]),
+            fingerprint(lambda it: [x.endswith(".jpg") for x in it]),
+        )
+        self.assertEqual(
+            fingerprint(lambda it: [x.endswith(".png") for x in it]),
+            fingerprint(lambda it: [x.endswith(".png") for x in it]),
+        )
+
+
+_counted_calls = []
+
+
+def _counted_parity(x):
+    _counted_calls.append(x)
+    return x % 2 == 0
+
+
+class TestItemsKeys(unittest.TestCase):
+    def test_parallel_and_vectorized_evaluation(self):
+        items = ItemsDataset(items=range(1000))
+        expected = [x for x in range(1000) if x % 7 < 3]
+        for kwargs in (
+            dict(num_workers=2, chunk_size=128),
+            dict(num_workers=2, chunk_size=100, parallel_backend="thread"),
+        ):
+            filtered = FilteredItemsDataset(
+                parent_dataset=items, filter_fn=lambda x: x % 7 < 3, **kwargs
+            )
+            self.assertEqual(filtered.__getitems__(range(len(filtered))), expected)
+        vectorized = FilteredItemsDataset(
+            parent_dataset=items, filter_fn=lambda x: x % 7 < 3, vectorized=True, chunk_size=99
+        )
+        self.assertEqual(vectorized.__getitems__(range(len(vectorized))), expected)
+        records = ItemsDataset(items=[{"id": i, "size": (i * 37) % 101} for i in range(200)])
+        ordered = OrderedItemsDataset(
+            parent_dataset=records, order_fn=lambda c: c["size"] - c["id"], vectorized=True
+        )
+        keys = [r["size"] - r["id"] for r in ordered.__getitems__(range(200))]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_tuple_keys_keep_ties_order(self):
+        items = ItemsDataset(items=[("b", 1), ("a", 2), ("b", 0), ("a", 2)])
+        ordered = OrderedItemsDataset(parent_dataset=items, order_fn=lambda x: (x[0], x[1]))
+        self.assertEqual(ordered.reordered_items_indices.tolist(), [1, 3, 2, 0])
+
+    def test_keys_cache(self):
+        items = ItemsDataset(items=range(50))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for _ in range(2):
+                filtered = FilteredItemsDataset(
+                    parent_dataset=items, filter_fn=_counted_parity, cache_dir=cache_dir
+                )
+                self.assertEqual(len(filtered), 25)
+            self.assertEqual(len(_counted_calls), 50)
+            FilteredItemsDataset(
+                parent_dataset=ItemsDataset(items=range(60)),
+                filter_fn=_counted_parity,
+                cache_dir=cache_dir,
+            )
+            self.assertEqual(len(_counted_calls), 110)
+
+    def test_keys_cache_invalidated_by_filter_changes(self):
+        items = ItemsDataset(items=["abc", "bcd", "cde", "def"])
+        with tempfile.TemporaryDirectory() as cache_dir:
+            filtered = [
+                FilteredItemsDataset(parent_dataset=items, filter_fn=fn, cache_dir=cache_dir)
+                for fn in (
+                    lambda x: all(c != "a" for c in x),
+                    lambda x: all(c != "d" for c in x),
+                    lambda x: np.char.startswith(x, "c"),
+                    lambda x: np.char.endswith(x, "c"),
+                )
+            ]
+        self.assertEqual(
+            [list(f) for f in filtered], [["bcd", "cde", "def"], ["abc"], ["cde"], ["abc"]]
+        )
+
+
+_stats_calls = []
+
+
+def _image_stats(item):
+    _stats_calls.append(item)
+    image = item["image"]
+    return {"height": image.shape[1], "width": image.shape[2], "mean": image.mean((1, 2))}
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        _stats_calls.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.images_dir = os.path.join(self.directory.name, "images")
+        self.index_dir = os.path.join(self.directory.name, "index")
+        os.mkdir(self.images_dir)
+        self.add_images(range(6))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def add_images(self, ids):
+        for i in ids:
+            image = np.full((4 + i, 10 - i, 3), i * 10, dtype=np.uint8)
+            PIL.Image.fromarray(image).save(os.path.join(self.images_dir, f"{i}.png"))
+
+    def test_build_query_and_update(self):
+        dataset = ImagesWithinDirectoryDataset(directory_path=self.images_dir)
+        index = build_metadata_index(dataset, _image_stats, self.index_dir)
+        self.assertEqual(len(_stats_calls), 6)
+        self.assertEqual(index.columns["mean"].shape, (6, 3))
+        rows = index.dataset_rows(dataset)
+        self.assertEqual(index.query("height", rows).tolist(), [4, 5, 6, 7, 8, 9])
+        self.assertEqual(index.query(lambda c: c["width"] > 7, rows).sum(), 3)
+
+        # Only the new files are loaded, the index is shared with the older datasets
+        self.add_images(range(6, 9))
+        build_metadata_index(dataset, _image_stats, self.index_dir)
+        self.assertEqual(len(_stats_calls), 6)
+        updated = ImagesWithinDirectoryDataset(directory_path=self.images_dir)
+        index = build_metadata_index(updated, _image_stats, self.index_dir)
+        self.assertEqual(len(_stats_calls), 9)
+        self.assertEqual(len(MetadataIndex.load(self.index_dir)), 9)
+        self.assertEqual(index.query("width", index.dataset_rows(dataset)).tolist()[-1], 5)
+        with self.assertRaises(KeyError):
+            MetadataIndex.load(self.index_dir).dataset_rows(
+                ItemsDataset(items=["missing.png"])
+            )
+
+    def test_filter_order_and_sample(self):
+        dataset = ImagesWithinDirectoryDataset(directory_path=self.images_dir)
+        build_metadata_index(dataset, _image_stats, self.index_dir)
+        _stats_calls.clear()
+        filtered = MetadataFilteredDataset(
+            parent_dataset=dataset,
+            metadata_index=self.index_dir,
+            expression="(height >= 6) & (mean[:, 0] < 50)",
+        )
+        self.assertEqual(list(filtered.filtered_items_indices), [2, 3, 4])
+        ordered = MetadataOrderedDataset(
+            parent_dataset=filtered,
+            metadata_index=self.index_dir,
+            expression="minimum(height, 6)",
+            descending=True,
+        )
+        # Ties keep the parent order
+        self.assertEqual(ordered.parent_indices(range(3)).tolist(), [0, 1, 2])
+        ordered = MetadataOrderedDataset(
+            parent_dataset=filtered,
+            metadata_index=MetadataIndex.load(self.index_dir),
+            expression="height",
+            descending=True,
+        )
+        self.assertEqual([item["image"].shape[1] for item in ordered], [8, 7, 6])
+        sampler = MetadataWeightedRandomSampler(
+            dataset, self.index_dir, "1.0 * (width == 10)", num_samples=20
+        )
+        self.assertEqual(set(sampler), {0})
+        # Registered with the package, built by name from configs
+        sampler = SamplersFactory.create(
+            {
+                "name": "MetadataWeightedRandomSampler",
+                "params": {
+                    "data_source": dataset,
+                    "metadata_index": self.index_dir,
+                    "weights": "1.0 * (width == 9)",
+                    "num_samples": 5,
+                },
+            }
+        )
+        self.assertIsInstance(sampler, MetadataWeightedRandomSampler)
+        self.assertEqual(list(sampler), [1] * 5)
+        self.assertEqual(_stats_calls, [])
+
+    def test_modified_files_are_recomputed(self):
+        dataset = ImagesWithinDirectoryDataset(directory_path=self.images_dir)
+        build_metadata_index(dataset, _image_stats, self.index_dir)
+        previous = MetadataIndex.load(self.index_dir)
+        path = os.path.join(self.images_dir, "2.png")
+        mtime_ns = os.stat(path).st_mtime_ns
+        PIL.Image.fromarray(np.zeros((12, 3, 3), dtype=np.uint8)).save(path)
+        os.utime(path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+        _stats_calls.clear()
+        index = build_metadata_index(dataset, _image_stats, self.index_dir)
+        self.assertEqual(len(_stats_calls), 1)
+        self.assertEqual(len(index), 6)
+        self.assertEqual(index.query("height", index.dataset_rows(dataset)).tolist()[2], 12)
+        # Files are replaced, the columns mapped by the previous index are unchanged
+        self.assertEqual(previous.query("height").tolist(), [4, 5, 6, 7, 8, 9])
+
+    def test_query_expressions(self):
+        index = MetadataIndex(
+            ["a", "b", "c"], {"height": np.array([4, 8, 16]), "mean": np.eye(3)}
+        )
+        self.assertEqual(index.query("4 < height <= 8").tolist(), [False, True, False])
+        self.assertEqual(
+            index.query("not (height > 4 and mean[:, 0] == 0)").tolist(), [True, False, False]
+        )
+        self.assertEqual(index.query("where(height > 4, -height, 1)").tolist(), [1, -8, -16])
+        for expression in (
+            "__import__('os')",
+            "height.__class__",
+            "np.minimum(height, 6)",
+            "[h for h in height]",
+            "width",
+        ):
+            with self.subTest(expression=expression), self.assertRaises((ValueError, NameError)):
+                index.query(expression)
+
+
+
+
+class TestEpochShuffle(unittest.TestCase):
+    def test_feistel_permutation_is_a_bijection(self):
+        for length in (1, 2, 7, 1000):
+            permutation = FeistelPermutation(length, (0, 1))
+            permuted = permutation(np.arange(length))
+            self.assertEqual(sorted(permuted.tolist()), list(range(length)))
+            self.assertEqual([permutation[i] for i in range(length)], permuted.tolist())
+        self.assertEqual(FeistelPermutation(10**12, 3)(np.arange(5)).dtype, np.int64)
+
+    def test_reshuffle_each_epoch(self):
+        items = ItemsDataset(items=range(100))
+        shuffled = ShuffledDataset(parent_dataset=items, seed=0, reshuffle_each_epoch=True)
+        chain = shuffled.compose(SubDataset, bounds=(0, 50))
+        first_epoch = chain.compile_index_map().tolist()
+        self.assertEqual(first_epoch, chain.__getitems__(range(50)))
+        self.assertIsNone(shuffled.shuffled_indices)
+        chain.set_epoch(1)
+        self.assertIsNone(chain._top_index_map)
+        second_epoch = chain.top_index_map.tolist()
+        self.assertNotEqual(second_epoch, first_epoch)
+        self.assertEqual(sorted(shuffled.__getitems__(range(100))), list(range(100)))
+        same_seed = ShuffledDataset(parent_dataset=items, seed=0, reshuffle_each_epoch=True)
+        same_seed.set_epoch(1)
+        self.assertEqual(same_seed.__getitems__(range(50)), second_epoch)
+        self.assertEqual(same_seed.fingerprint(), shuffled.fingerprint())
+
+    def test_memory_cache_is_dropped_on_reshuffle(self):
+        shuffled = ShuffledDataset(
+            parent_dataset=ItemsDataset(items=range(10)), seed=1, reshuffle_each_epoch=True
+        )
+        cached = shuffled.compose(MemoryCachedDataset, max_bytes=2**16, slot_bytes=64)
+        cached.__getitems__(range(10))
+        cached.set_epoch(1)
+        self.assertEqual(cached.__getitems__(range(10)), shuffled.__getitems__(range(10)))
+
+
+class TestSharedMemoryPickling(unittest.TestCase):
+    def setUp(self):
+        self.items = ItemsDataset(items=[f"images/{i}_é.jpg" for i in range(1000)])
+        self.sub = SubDataset(self.items, indices=np.random.permutation(1000)[:500])
+
+    def test_pickled_as_shared_memory(self):
+        copied = pickle.dumps(self.sub)
+        with shared_memory_pickling(min_bytes=0):
+            shared = pickle.dumps(self.sub)
+            self.assertEqual(pickle.dumps(self.sub), shared)
+        self.assertLess(len(shared), len(copied) / 10)
+        loaded = pickle.loads(shared)
+        self.assertIsInstance(loaded.parent_dataset._items_list, StringsArray)
+        self.assertFalse(loaded.indices.flags.writeable)
+        self.assertEqual(loaded.__getitems__(range(500)), self.sub.__getitems__(range(500)))
+        self.assertEqual(loaded.fingerprint(), self.sub.fingerprint())
+        self.assertNotIn("_shared_memory_exports", vars(pickle.loads(pickle.dumps(self.sub))))
+
+    def test_spawned_workers(self):
+        loader = DATALOADERS_REGISTRY.get("DataLoader")(
+            dataset=self.sub,
+            batch_size=100,
+            num_workers=1,
+            multiprocessing_context="spawn",
+            collate_fn="views_collate",
+        )
+        self.assertEqual(
+            [item for batch in loader for item in batch], self.sub.__getitems__(range(500))
+        )
+
+
+class TestCachedDataset(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.items_dataset = ItemsDataset(items=[torch.full((2, 2), i) for i in range(20)])
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def test_items_are_cached_by_top_index(self):
+        calls = []
+
+        def preprocessing(x):
+            calls.append(1)
+            return x * 2
+
+        shuffled = self.items_dataset.compose(
+            PreprocessedDataset, preprocessing_fn=preprocessing
+        ).compose(ShuffledDataset)
+        cached = shuffled.compose(CachedDataset, cache_dir=self.cache_dir.name)
+        expected = [shuffled[i] for i in range(len(shuffled))]
+        calls.clear()
+        cached.warm_up()
+        self.assertEqual(len(calls), len(shuffled))
+        self.assertEqual(len(cached.cached_keys()), len(shuffled))
+
+        calls.clear()
+        loaded = cached.__getitems__(range(len(cached))) + [cached[3]]
+        self.assertEqual(calls, [])
+        for c_loaded, c_expected in zip(loaded, expected + [expected[3]]):
+            self.assertTrue(torch.equal(c_loaded, c_expected))
+
+    def test_transformation_change_invalidates_cache(self):
+        first = self.items_dataset.compose(
+            PreprocessedDataset, preprocessing_fn=lambda x: x * 2
+        ).compose(CachedDataset, cache_dir=self.cache_dir.name)
+        same = self.items_dataset.compose(
+            PreprocessedDataset, preprocessing_fn=lambda x: x * 2
+        ).compose(ShuffledDataset).compose(CachedDataset, cache_dir=self.cache_dir.name)
+        other = self.items_dataset.compose(
+            PreprocessedDataset, preprocessing_fn=lambda x: x * 3
+        ).compose(CachedDataset, cache_dir=self.cache_dir.name)
+        self.assertEqual(first.cache_dir, same.cache_dir)
+        self.assertNotEqual(first.cache_dir, other.cache_dir)
+
+    def test_cache_over_augmentation_is_rejected(self):
+        augmented = self.items_dataset.compose(
+            AugmentedDataset, augmentations=[lambda x: x, lambda x: -x]
+        )
+        with self.assertRaises(TypeError):
+            augmented.compose(CachedDataset, cache_dir=self.cache_dir.name)
+
+
+class TestMemoryCachedDataset(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+        def preprocessing(x):
+            self.calls.append(x)
+            return torch.full((4,), x)
+
+        self.preprocessed = ItemsDataset(items=range(64)).compose(
+            PreprocessedDataset, preprocessing_fn=preprocessing
+        )
+
+    def test_cache_is_shared_with_workers(self):
+        cached = self.preprocessed.compose(MemoryCachedDataset, max_bytes=2**16, slot_bytes=2**10)
+        loader = torch.utils.data.DataLoader(cached, batch_size=8, num_workers=2)
+        expected = [self.preprocessed[i] for i in range(len(cached))]
+        for _ in range(2):
+            self.assertTrue(torch.equal(torch.cat(list(loader)), torch.stack(expected)))
+        stats = cached.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (64, 64))
+        self.assertEqual(stats["cached_items"], 64)
+
+    def test_eviction_keeps_cache_bounded(self):
+        for eviction_policy in ("lru", "lfu"):
+            cached = self.preprocessed.compose(
+                MemoryCachedDataset,
+                max_bytes=2**13,
+                slot_bytes=2**10,
+                ways=4,
+                eviction_policy=eviction_policy,
+            )
+            for index in list(range(64)) * 2:
+                self.assertTrue(torch.equal(cached[index], self.preprocessed[index]))
+            self.assertEqual(cached.cache_stats()["cached_items"], 8)
+            self.assertLessEqual(cached.cache_stats()["cached_bytes"], 2**13)
+            self.calls.clear()
+            cached[63]
+            self.assertEqual(self.calls, [])
+
+    def test_slots_sized_after_the_first_item(self):
+        items = ItemsDataset(items=[torch.zeros(256)] * 7 + [torch.zeros(2**16)])
+        cached = items.compose(MemoryCachedDataset, max_bytes=2**20)
+        self.assertLess(cached.slot_bytes, 2 * len(pickle.dumps(items[0])))
+        self.assertEqual(cached.cache_stats()["cached_items"], 1)
+        with self.assertLogs("dl_cm_logger", level="WARNING"):
+            cached.__getitems__(range(8))
+        stats = cached.cache_stats()
+        self.assertEqual((stats["cached_items"], stats["rejected"]), (7, 1))
+
+
+class TestListDirectoryDataset(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        for relative_path in ["a.png", "b.TXT", ".hidden.png", "sub/c.png", "sub/deep/d.PNG"]:
+            path = os.path.join(self.root, "data", relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+        self.data_dir = os.path.join(self.root, "data")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_listing_matches_glob_when_flat(self):
+        dataset = ListDirectoryDataset(directory_path=self.data_dir)
+        self.assertEqual(
+            list(dataset),
+            [os.path.join(self.data_dir, n) for n in ["a.png", "b.TXT", "sub"]],
+        )
+
+    def test_recursive_extension_filtered_listing(self):
+        dataset = ListDirectoryDataset(
+            directory_path=self.data_dir, extensions=[".png"], recursive=True, num_workers=4
+        )
+        expected = ["a.png", "sub/c.png", "sub/deep/d.PNG"]
+        self.assertEqual(list(dataset), [os.path.join(self.data_dir, n) for n in expected])
+
+    def test_manifest_reuses_unmodified_directories(self):
+        manifest_path = os.path.join(self.root, "manifest.json")
+        params = dict(directory_path=self.data_dir, extensions=[".png"], recursive=True)
+        first = ListDirectoryDataset(manifest_path=manifest_path, **params)
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+        # Tamper an unmodified directory listing, which must be served from the manifest
+        manifest["directories"]["sub"]["files"] = ["from_manifest.png"]
+        with open(manifest_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        open(os.path.join(self.data_dir, "e.png"), "w").close()
+        second = ListDirectoryDataset(manifest_path=manifest_path, **params)
+        self.assertEqual(len(second), len(first) + 1)
+        self.assertIn(os.path.join(self.data_dir, "e.png"), list(second))
+        self.assertIn(os.path.join(self.data_dir, "sub", "from_manifest.png"), list(second))
+
+
+class TestImageDecoders(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.image = np.random.default_rng(0).integers(0, 256, (16, 24, 3), dtype=np.uint8)
+        for extension in (".png", ".tif"):
+            PIL.Image.fromarray(self.image).save(os.path.join(self.directory.name, f"i{extension}"))
+        PIL.Image.fromarray(self.image[..., 0]).save(os.path.join(self.directory.name, "g.png"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_decoders_return_contiguous_chw_uint8(self):
+        expected = torch.from_numpy(self.image).permute(2, 0, 1)
+        for decoder in (ExtensionImageDecoder(), PILDecoder(), SkimageDecoder()):
+            for extension in (".png", ".tif"):
+                decoded = decoder(os.path.join(self.directory.name, f"i{extension}"))
+                self.assertEqual(decoded.dtype, torch.uint8)
+                self.assertTrue(decoded.is_contiguous())
+                self.assertTrue(torch.equal(decoded, expected))
+            gray = decoder(os.path.join(self.directory.name, "g.png"))
+            self.assertEqual(gray.shape, (1, 16, 24))
+        with self.assertRaises(TypeError):
+            BaseImageDecoder()
+        read = ImagesWithinDirectoryDataset.read_image(os.path.join(self.directory.name, "i.png"))
+        self.assertTrue(torch.equal(read, expected))
+
+    def test_palette_png_decoded_to_colors(self):
+        path = os.path.join(self.directory.name, "p.png")
+        palette_image = PIL.Image.fromarray(self.image).quantize(colors=8)
+        palette_image.save(path)
+        expected = SkimageDecoder()(path)
+        self.assertEqual(expected.shape, (3, 16, 24))
+        self.assertTrue(torch.equal(ExtensionImageDecoder()(path), expected))
+        self.assertTrue(torch.equal(ImagesWithinDirectoryDataset.read_image(path), expected))
+        self.assertEqual(TorchvisionDecoder(mode="GRAY")(path).shape, (1, 16, 24))
+
+    def test_images_dataset_dtype(self):
+        dataset = ImagesWithinDirectoryDataset(directory_path=self.directory.name)
+        self.assertEqual(dataset[0]["image"].dtype, torch.float32)
+        dataset = ImagesWithinDirectoryDataset(
+            directory_path=self.directory.name, image_dtype=None, decoder="PILDecoder"
+        )
+        self.assertEqual(dataset[0]["image"].dtype, torch.uint8)
+
+
+class TestBatchNormalization(unittest.TestCase):
+    def test_uint8_batches_match_float_items(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(4):
+                image = np.random.default_rng(i).integers(0, 256, (8, 8, 3), dtype=np.uint8)
+                PIL.Image.fromarray(image).save(os.path.join(directory, f"{i}.png"))
+            float_dataset = ImagesWithinDirectoryDataset(directory_path=directory)
+            uint8_dataset = ImagesWithinDirectoryDataset(directory_path=directory, image_dtype=None)
+            float_batch = next(iter(torch.utils.data.DataLoader(float_dataset, batch_size=4)))
+            uint8_batch = next(iter(torch.utils.data.DataLoader(uint8_dataset, batch_size=4)))
+        self.assertEqual(uint8_batch["image"].dtype, torch.uint8)
+        mean, std = [0.5, 0.4, 0.3], [0.2, 0.25, 0.3]
+        normalization = BatchNormalization(keys=["image"], mean=mean, std=std, scale=1 / 255)
+        normalized = normalization(uint8_batch)
+        expected = (float_batch["image"] / 255 - torch.tensor(mean).view(1, 3, 1, 1)) / torch.tensor(
+            std
+        ).view(1, 3, 1, 1)
+        self.assertTrue(torch.allclose(normalized["image"], expected, atol=1e-6))
+        self.assertEqual(uint8_batch["image"].dtype, torch.uint8)
+
+    def test_nested_keys(self):
+        batch = {"inputs": {"image": torch.ones(2, 4, 4, 3, dtype=torch.uint8)}, "targets": {}}
+        normalized = BatchNormalization(mean=[1, 0, 1], channel_dim=-1)(batch)
+        self.assertEqual(normalized["inputs"]["image"][..., 0].abs().sum(), 0)
+        self.assertEqual(normalized["inputs"]["image"].dtype, torch.float32)
+        self.assertIs(normalized["targets"], batch["targets"])
+        with self.assertRaises(ValueError):
+            BatchNormalization(keys=["image"], mean=[1, 0, 1])({"image": torch.ones(2, 3, 4, 3)})
+
+
+class TestVocLabels(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        colormap = np.array(VocDataset.VOC_COLORMAP + [[224, 224, 192]], dtype=np.uint8)
+        rng = np.random.default_rng(0)
+        for sub_directory in ("JPEGImages", "SegmentationClass"):
+            os.makedirs(os.path.join(self.directory.name, sub_directory))
+        for name in ("a", "b"):
+            image = rng.integers(0, 256, (12, 10, 3), dtype=np.uint8)
+            mask = colormap[rng.integers(0, len(colormap), (12, 10))]
+            PIL.Image.fromarray(image).save(os.path.join(self.directory.name, "JPEGImages", f"{name}.jpg"))
+            PIL.Image.fromarray(mask).save(
+                os.path.join(self.directory.name, "SegmentationClass", f"{name}.png")
+            )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_label_maps_match_one_hot_labels(self):
+        one_hot_dataset = VocDataset(root_dir=self.directory.name)
+        label_map_dataset = VocDataset(
+            root_dir=self.directory.name, image_dtype=None, label_format="uint8"
+        )
+        one_hot_batch = next(iter(torch.utils.data.DataLoader(one_hot_dataset, batch_size=2)))
+        label_map_batch = next(iter(torch.utils.data.DataLoader(label_map_dataset, batch_size=2)))
+        self.assertEqual(label_map_batch["targets"]["label"].shape, (2, 12, 10))
+        self.assertEqual(label_map_batch["targets"]["label"].dtype, torch.uint8)
+        expanded = BatchOneHot(num_classes=len(VocDataset.VOC_COLORMAP))(label_map_batch)
+        self.assertTrue(torch.equal(expanded["targets"]["label"], one_hot_batch["targets"]["label"]))
+        self.assertTrue(
+            torch.equal(label_map_batch["inputs"]["image"].float(), one_hot_batch["inputs"]["image"])
+        )
+        # Channels last images, the channels dimension is inferred from the statistics
+        mean, std = [120.0, 110.0, 100.0], [60.0, 50.0, 40.0]
+        normalized = BatchNormalization(mean=mean, std=std)(label_map_batch)
+        expected = (one_hot_batch["inputs"]["image"] - torch.tensor(mean)) / torch.tensor(std)
+        self.assertTrue(torch.allclose(normalized["inputs"]["image"], expected))
+
+
+class TestBatchAugmentation(unittest.TestCase):
+    def test_deferred_augmentation_matches_per_item_augmentation(self):
+        items = ItemsDataset(items=[torch.arange(2 * 5 * 5).view(2, 5, 5) + i for i in range(10)])
+        augmentations = [TransIdentity(), TransRot90(), Transflip(-1)]
+        augmented = items.compose(AugmentedDataset, augmentations=augmentations)
+        deferred = items.compose(AugmentedDataset, augmentations=augmentations, deferred=True)
+        sampler = np.random.default_rng(0).permutation(len(augmented)).tolist()
+        batch_augmentation = BatchAugmentation(augmentations)
+        for expected, pairs in zip(
+            torch.utils.data.DataLoader(augmented, batch_size=7, sampler=sampler),
+            torch.utils.data.DataLoader(deferred, batch_size=7, sampler=sampler),
+        ):
+            self.assertTrue(torch.equal(batch_augmentation(pairs), expected))
+
+
+class TestGeometricViews(unittest.TestCase):
+    def test_numpy_transformations_are_views(self):
+        array = np.arange(2 * 3 * 4).reshape(2, 3, 4)
+        for transformation in (Transflip(-1), Transflip(-2), TransRot90()):
+            transformed = transformation(array)
+            self.assertTrue(np.shares_memory(transformed, array))
+            self.assertTrue(np.array_equal(transformation(transformed, reverse=True), array))
+            self.assertTrue(
+                np.array_equal(transformed, transformation(torch.from_numpy(array)).numpy())
+            )
+
+    def test_untouched_keys_sharing(self):
+        items = {"image": np.ones((2, 2)), "mask": np.zeros((2, 2)), "meta": {"id": "a"}}
+        transformed = MultipleItemRevrsibleTransformation(Transflip(-1), included_keys=["image"])(items)
+        transformed["meta"]["id"] = "b"
+        self.assertEqual(items["meta"]["id"], "a")
+        # Untouched arrays are read-only views of the input ones
+        self.assertTrue(np.shares_memory(transformed["mask"], items["mask"]))
+        with self.assertRaises(ValueError):
+            transformed["mask"][0, 0] = 1
+        self.assertEqual(items["mask"].sum(), 0)
+        self.assertTrue(items["mask"].flags.writeable)
+        copied = MultipleItemRevrsibleTransformation(
+            Transflip(-1), included_keys=["image"], deepcopy_untouched=True
+        )(items)
+        copied["mask"][0, 0] = 1
+        self.assertEqual(items["mask"].sum(), 0)
+
+    def test_views_collate(self):
+        augmented = ItemsDataset(items=[np.arange(16).reshape(4, 4) + i for i in range(8)]).compose(
+            AugmentedDataset, augmentations=[Transflip(-1), TransRot90()]
+        )
+        loader = torch.utils.data.DataLoader(augmented, batch_size=4, collate_fn=views_collate)
+        batches = list(loader)
+        self.assertEqual(batches[0][0].tolist(), np.flip(np.arange(16).reshape(4, 4), -1).tolist())
+        self.assertEqual(batches[0][1].tolist(), np.rot90(np.arange(16).reshape(4, 4)).tolist())
+
+
+class TestFusedTransformation(unittest.TestCase):
+    def setUp(self):
+        self.transformations = [
+            TransIdentity(),
+            TransRot90(),
+            TransRot180(),
+            TransRot270(),
+            Transflip(-1),
+            Transflip(-2),
+        ]
+
+    def test_strided_ops_match_transformations(self):
+        batch = torch.arange(2 * 3 * 5 * 7).view(2, 3, 5, 7)
+        for transformation in self.transformations[1:]:
+            for reverse in (False, True):
+                expected = transformation(batch, reverse=True) if reverse else transformation(batch)
+                self.assertTrue(
+                    torch.equal(fused_transform(batch, [transformation], reverse=reverse), expected)
+                )
+
+    def test_fused_transform_matches_concatenation(self):
+        batch = {"image": torch.rand(4, 3, 8, 8), "mask": torch.rand(4, 8, 8), "id": ["a"] * 4}
+        transformations = [
+            MultipleItemRevrsibleTransformation(t, included_keys=["image"])
+            for t in self.transformations
+        ]
+        fused = fused_transform(batch, transformations)
+        self.assertTrue(
+            torch.equal(fused["image"], torch.cat([t(batch)["image"] for t in transformations]))
+        )
+        self.assertTrue(torch.equal(fused["mask"], batch["mask"].repeat(len(transformations), 1, 1)))
+        self.assertEqual(fused["id"], batch["id"] * len(transformations))
+
+        reversed_batch = fused_split_transform(fused, transformations, reverse=True)
+        for chunk in reversed_batch["image"].chunk(len(transformations)):
+            self.assertTrue(torch.equal(chunk, batch["image"]))
+
+    def test_reverse_is_differentiable(self):
+        predictions = torch.rand(len(self.transformations) * 2, 4, 4, requires_grad=True)
+        out = torch.zeros(len(self.transformations) * 2, 4, 4)
+        reversed_predictions = fused_split_transform(
+            predictions, self.transformations, reverse=True, out=out
+        )
+        self.assertIs(reversed_predictions, out)
+        reversed_predictions.sum().backward()
+        self.assertTrue(torch.equal(predictions.grad, torch.ones_like(predictions)))
+
+
+def read_range_shard(shard: int) -> range:
+    return range(shard * 10, shard * 10 + 10)
+
+
+class TestStreamingDatasets(unittest.TestCase):
+    def test_shards_are_read_once_across_workers(self):
+        for shards in ([0, 1, 2, 3, 4], [0]):
+            dataset = ShardedDataset(shards=shards, read_shard_fn=read_range_shard)
+            loader = torch.utils.data.DataLoader(dataset, batch_size=None, num_workers=2)
+            streamed = sorted(int(item) for item in loader)
+            self.assertEqual(streamed, [i for shard in shards for i in read_range_shard(shard)])
+
+    def test_compositions_select_streaming_counterparts(self):
+        dataset = ShardedDataset(shards=[0, 1, 2], read_shard_fn=read_range_shard)
+        dataset = dataset.compose(FilteredItemsDataset, filter_fn=lambda x: x % 2 == 0)
+        dataset = dataset.compose(PreprocessedDataset, preprocessing_fn=lambda x: torch.tensor([x]))
+        dataset = dataset.compose(AugmentedDataset, augmentations=[TransIdentity(), lambda x: -x])
+        dataset = dataset.compose(ShuffledDataset, buffer_size=4)
+        streamed = [int(item) for item in dataset]
+        expected = [s * i for i in range(0, 30, 2) for s in (1, -1)]
+        self.assertEqual(sorted(streamed), sorted(expected))
+        self.assertNotEqual(streamed, expected)
+        dataset.set_epoch(1)
+        self.assertNotEqual([int(item) for item in dataset], streamed)
+        with self.assertRaises(TypeError):
+            dataset.compose(MemoryCachedDataset, max_bytes=2**20)
+
+    def test_split_parts_are_disjoint(self):
+        dataset = ShardedDataset(shards=[0, 1, 2, 3], read_shard_fn=read_range_shard)
+        split = dataset.compose(
+            IterableSplitDataset, reference_names=["train", "valid"], split_ratios=[0.7, 0.3]
+        )
+        train = list(split.get_dataset_by_ref_name("train"))
+        valid = list(split.get_dataset_by_ref_name("valid"))
+        self.assertEqual(sorted(train + valid), list(range(40)))
+        self.assertTrue(train and valid)
+
+
+class TestShardsDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.items = ItemsDataset(
+            items=[{"image": torch.full((3, i + 1), i), "name": f"item_{i}"} for i in range(10)]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertItemsEqual(self, items, expected_items):
+        self.assertEqual(len(items), len(expected_items))
+        for item, expected in zip(items, expected_items):
+            self.assertEqual(item["name"], expected["name"])
+            self.assertTrue(torch.equal(item["image"], expected["image"]))
+
+    def test_random_and_sequential_access(self):
+        for shard_format in ("tar", "binary"):
+            directory = os.path.join(self.tmp_dir.name, shard_format)
+            shards = write_shards(self.items, directory, shard_format, shard_max_items=3, batch_size=4)
+            self.assertEqual(len(shards), 4)
+            dataset = ShardsDataset(directory)
+            self.assertEqual(len(dataset), len(self.items))
+            self.assertItemsEqual([dataset[i] for i in range(10)], list(self.items))
+            indices = [7, 0, 3, 4, 9, 1]
+            self.assertItemsEqual(dataset.__getitems__(indices), self.items.__getitems__(indices))
+            self.assertItemsEqual(list(dataset), list(self.items))
+            streamed = ShardedDataset(shards=[str(p) for p in shards], read_shard_fn=read_shard_items)
+            self.assertItemsEqual(list(streamed), list(self.items))
+
+    def test_tar_shards_are_standard_archives(self):
+        shards = write_shards(self.items, self.tmp_dir.name, "tar", shard_max_bytes=1)
+        self.assertEqual(len(shards), len(self.items))
+        with tarfile.open(shards[2]) as tar:
+            (member,) = tar.getmembers()
+            item = pickle.loads(tar.extractfile(member).read())
+        self.assertItemsEqual([item], [self.items[2]])
+
+
+class TestMemmapTensorDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.items = ItemsDataset(
+            items=[
+                {
+                    "inputs": {"image": torch.full((3, 4, 4), i, dtype=torch.uint8)},
+                    "targets": {"label": torch.arange(4) + i},
+                    "index": i,
+                    "name": f"item_{i}",
+                }
+                for i in range(6)
+            ]
+        )
+        write_memmap_dataset(self.items, self.tmp_dir.name, batch_size=4)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_items_are_zero_copy_views(self):
+        dataset = MemmapTensorDataset(self.tmp_dir.name)
+        self.assertEqual(len(dataset), len(self.items))
+        for item, expected in zip(dataset.__getitems__(range(6)), self.items):
+            self.assertEqual(item["index"], expected["index"])
+            self.assertEqual(item["name"], expected["name"])
+            self.assertTrue(torch.equal(item["inputs"]["image"], expected["inputs"]["image"]))
+            self.assertTrue(torch.equal(item["targets"]["label"], expected["targets"]["label"]))
+        image = dataset[2]["inputs"]["image"]
+        self.assertTrue(np.shares_memory(image.numpy(), dataset.columns["inputs.image"]))
+        # Columns are mapped copy-on-write
+        image.fill_(255)
+        self.assertEqual(int(MemmapTensorDataset(self.tmp_dir.name)[2]["inputs"]["image"].max()), 2)
+
+    def test_strings_are_memory_mapped(self):
+        dataset = MemmapTensorDataset(self.tmp_dir.name)
+        with open(os.path.join(self.tmp_dir.name, "header.json")) as header_file:
+            self.assertNotIn("item_0", header_file.read())
+        names = dataset.strings["name"]
+        self.assertIsInstance(names.data, np.memmap)
+        self.assertEqual(list(names), [f"item_{i}" for i in range(6)])
+
+    def test_workers_loading(self):
+        dataset = MemmapTensorDataset(self.tmp_dir.name)
+        batches = list(torch.utils.data.DataLoader(dataset, batch_size=3, num_workers=2))
+        self.assertEqual(batches[1]["index"].tolist(), [3, 4, 5])
+        self.assertEqual(batches[1]["inputs"]["image"].shape, (3, 3, 4, 4))
+
+
+class TestDatasetExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.items = ItemsDataset(
+            items=[{"image": torch.full((2, 3), i), "name": f"item_{i}"} for i in range(10)]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertExported(self, dataset):
+        self.assertEqual(len(dataset), len(self.items))
+        for item, expected in zip(dataset.__getitems__(range(10)), self.items):
+            self.assertEqual(item["name"], expected["name"])
+            self.assertTrue(torch.equal(item["image"], expected["image"]))
+
+    def test_parallel_export(self):
+        directory = export_dataset(
+            self.items, self.tmp_dir.name, "shards", num_workers=2, items_per_part=3
+        )
+        self.assertExported(ShardsDataset(directory))
+        directory = export_dataset(
+            self.items,
+            os.path.join(self.tmp_dir.name, "memmap"),
+            "memmap",
+            num_workers=2,
+            items_per_part=4,
+        )
+        self.assertExported(MemmapTensorDataset(directory))
+        # The manifest only records the status of the parts
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.assertNotIn("item_0", f.read())
+
+    def test_resume_rewrites_corrupted_parts(self):
+        for storage_format, corrupted_file in (
+            ("shards", "shard-00001.tar"),
+            ("memmap", "image.bin"),
+        ):
+            directory = os.path.join(self.tmp_dir.name, storage_format)
+            export_dataset(self.items, directory, storage_format, items_per_part=4)
+            with open(os.path.join(directory, corrupted_file), "r+b") as f:
+                f.seek(4 * 6 * 8 if storage_format == "memmap" else 1024)
+                f.write(b"corrupted")
+            self.assertEqual(verify_export(directory), [1])
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                part_checksums = json.load(f)["parts"]["0"]["checksums"]
+            export_dataset(self.items, directory, storage_format, items_per_part=4)
+            self.assertEqual(verify_export(directory), [])
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                self.assertEqual(json.load(f)["parts"]["0"]["checksums"], part_checksums)
+            reader = ShardsDataset if storage_format == "shards" else MemmapTensorDataset
+            self.assertExported(reader(directory))
+
+
+class TestCrossDataset(unittest.TestCase):
+    def setUp(self):
+        self.images = ItemsDataset(items=[f"images/{i}.jpg" for i in range(6)])
+        self.labels = ItemsDataset(
+            items=["labels/4.png", "labels/1.png", "labels/0.png", "labels/4.png", "labels/9.png"]
+        )
+        self.stem = lambda path: os.path.splitext(os.path.basename(path))[0]
+
+    def test_inner_join(self):
+        cross = CrossDataset(datasets=[self.images, self.labels], hash_fns=self.stem)
+        self.assertEqual(cross.relative_indices.dtype, np.int32)
+        self.assertEqual(cross.relative_indices.tolist(), [[0, 2], [1, 1], [4, 0]])
+        self.assertEqual(cross[2], ["images/4.jpg", "labels/4.png"])
+        self.assertEqual(
+            cross.__getitems__([1, 0]),
+            [["images/1.jpg", "labels/1.png"], ["images/0.jpg", "labels/0.png"]],
+        )
+
+    def test_left_join(self):
+        cross = CrossDataset(
+            datasets=[self.images, self.labels], hash_fns=self.stem, join="left"
+        )
+        self.assertEqual(len(cross), len(self.images))
+        self.assertEqual(cross[3], ["images/3.jpg", None])
+        self.assertEqual(cross[1:3], [["images/1.jpg", "labels/1.png"], ["images/2.jpg", None]])
+
+    def test_duplicated_keys(self):
+        images = ItemsDataset(items=["a/1.jpg", "a/4.jpg", "b/1.jpg", "a/0.jpg", "b/4.jpg"])
+        cross = CrossDataset(datasets=[images, self.labels], hash_fns=self.stem)
+        # Both datasets are deduplicated on their keys, the first item of a key is joined
+        self.assertEqual(cross.relative_indices.tolist(), [[0, 1], [1, 0], [3, 2]])
+        left = CrossDataset(datasets=[images, self.labels], hash_fns=self.stem, join="left")
+        self.assertEqual(len(left), 3)
+        # Lengths are compared once deduplicated, 5 and 4 items of 3 keys
+        labels = ItemsDataset(items=[f"labels/{i}.png" for i in (4, 1, 0, 4)])
+        CrossDataset(datasets=[images, labels], hash_fns=self.stem, strict_length=True)
+        with self.assertRaises(RuntimeError):
+            CrossDataset(datasets=[images, self.labels], hash_fns=self.stem, strict_length=True)
+
+    def test_object_keys(self):
+        cross = CrossDataset(
+            datasets=[self.images, self.labels],
+            hash_fns=lambda path: (int(self.stem(path)) % 2, self.stem(path)),
+        )
+        self.assertEqual(cross.relative_indices.tolist(), [[0, 2], [1, 1], [4, 0]])
+
+
+if __name__ == "__main__":
+    unittest.main()